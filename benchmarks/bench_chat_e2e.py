@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+End-to-end chat latency benchmark.
+
+Replays a corpus of chat messages through SimpleChatbotView with the Django
+test client against a throwaway test database. The LLM is FakeLLMBackend
+(seeded, log-normal latency). The encoder is the hashing stand-in by default,
+or the real sentence transformer with --encoder model. Reports throughput
+plus p50/p95/p99 of the whole request and of each stage recorded by
+chatbot.timing: classify, encode, search, respond, db, serialize.
+The results are written as JSON so runs can be compared across commits.
+
+Usage:
+    python benchmarks/bench_chat_e2e.py
+    python benchmarks/bench_chat_e2e.py --rounds 5 --llm-ms 300 --output results.json
+    python benchmarks/bench_chat_e2e.py --encoder model
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "restaurant_backend.settings")
+
+import django
+
+django.setup()
+
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from chatbot import engine
+from chatbot.caches import query_embedding_cache
+from chatbot.index_registry import IndexRegistry, MenuColumns, MenuIndex, parse_chunk_text
+from chatbot.llm import FakeLLMBackend, set_llm_backend
+from chatbot.rules import route_stats
+from chatbot.timing import trace
+from menu.models import MenuItem
+from restaurants.models import Restaurant
+from stubs import HashingModel
+
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "chat_corpus.txt"
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "results"
+STAGES = ["classify", "encode", "search", "respond", "db", "serialize"]
+VEG_WORDS = ("paneer", "veg", "dal", "naan", "roti", "jamun", "raita", "mushroom", "palak", "aloo")
+
+
+def load_corpus(path: Path):
+    """Messages from a .txt (one per line, # comments) or .jsonl ("message" field) file."""
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.suffix == ".jsonl":
+                message = json.loads(line).get("message")
+                if message:
+                    messages.append(message)
+            else:
+                messages.append(line)
+    return messages
+
+
+def menu_messages(names, count: int, rng: random.Random):
+    """Templated messages about real menu items."""
+    templates = ["add {qty} {name}", "I want {name}", "do you have {name}?", "remove {name}", "{name}"]
+    out = []
+    for _ in range(count):
+        name = rng.choice(names).lower()
+        out.append(rng.choice(templates).format(name=name, qty=rng.randint(1, 3)))
+    return out
+
+
+def seed_menu(chunks):
+    """Create a restaurant whose menu is the bundled text_chunks.json."""
+    restaurant = Restaurant.objects.create(name="Benchmark Restaurant")
+    items = []
+    for chunk in chunks:
+        parsed = parse_chunk_text(chunk)
+        veg = any(w in parsed["name"].lower() for w in VEG_WORDS)
+        items.append(MenuItem(
+            restaurant=restaurant,
+            name=parsed["name"],
+            category=parsed["category"],
+            price=parsed["price"] or "0",
+            is_vegetarian=veg,
+        ))
+    MenuItem.objects.bulk_create(items)
+    return restaurant
+
+
+def build_index(restaurant, model):
+    """Encode the restaurant's menu in memory the way generate_embeddings does."""
+    items = list(MenuItem.objects.filter(restaurant=restaurant, available=True).order_by("id"))
+    chunks = [f"Category: {i.category}. Item: {i.name}. Price: {i.price}" for i in items]
+    rows = [
+        {"id": i.id, "name": i.name, "category": i.category, "price": i.price,
+         "is_vegetarian": i.is_vegetarian, "is_vegan": i.is_vegan, "ingredients": i.ingredients}
+        for i in items
+    ]
+    embeddings = np.asarray(model.encode(chunks, convert_to_numpy=True), dtype=np.float32)
+    return MenuIndex(
+        restaurant_id=restaurant.id,
+        embeddings=embeddings,
+        text_chunks=chunks,
+        item_ids=[i.id for i in items],
+        columns=MenuColumns.from_items(rows),
+    )
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "count": int(arr.size),
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    chunks = json.loads((ROOT / "text_chunks.json").read_text(encoding="utf-8"))
+
+    if args.encoder == "model":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(engine.MODEL_NAME)
+    else:
+        model = HashingModel(args.encode_ms)
+
+    restaurant = seed_menu(chunks)
+    index = build_index(restaurant, model)
+    engine._embed_model = model
+    engine._index_registry = IndexRegistry(loader=lambda rid: index if rid == restaurant.id else None)
+    llm = FakeLLMBackend(
+        latency_ms=args.llm_ms, latency_sigma=args.llm_sigma, error_rate=args.llm_error_rate, seed=args.seed
+    )
+    set_llm_backend(llm)
+
+    base = [m for m in load_corpus(args.corpus) if llm.classify(m)["intent"] != "CONFIRM_ORDER"]
+    names = [parse_chunk_text(c)["name"] for c in chunks]
+    corpus = base + menu_messages(names, args.menu_messages, rng)
+
+    client = Client()
+    totals = []
+    stages = {name: [] for name in STAGES}
+    statuses = {}
+    route_stats.reset()
+
+    if args.cold_caches:
+        engine._intent_cache.cache_alias = ""  # no shared Django-cache tier either
+
+    start = time.perf_counter()
+    for round_no in range(args.rounds):
+        order = corpus[:]
+        rng.shuffle(order)
+        for n, message in enumerate(order):
+            if args.cold_caches:
+                engine._intent_cache.clear()
+                query_embedding_cache.clear()
+            # A few messages per conversation, like a real session
+            session_id = f"bench-{round_no}-{n // args.session_length}"
+            body = {"restaurant_id": restaurant.id, "session_id": session_id, "message": message}
+            with trace() as t:
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    response = client.post("/api/chatbot/simple/", data=body, content_type="application/json")
+                totals.append((time.perf_counter() - t0) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            durations = t.durations()
+            for name in STAGES:
+                if name in durations:
+                    stages[name].append(durations[name])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "encoder": args.encoder,
+            "encode_ms": args.encode_ms if args.encoder == "hashing" else None,
+            "llm_ms": args.llm_ms,
+            "llm_sigma": args.llm_sigma,
+            "llm_error_rate": args.llm_error_rate,
+            "cold_caches": args.cold_caches,
+            "seed": args.seed,
+            "corpus": str(args.corpus),
+            "messages": len(corpus),
+            "rounds": args.rounds,
+            "menu_items": len(chunks),
+        },
+        "requests": len(totals),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(totals) / elapsed, 2) if elapsed else 0.0,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+        "total_ms": percentiles(totals),
+        "stages_ms": {name: percentiles(values) for name, values in stages.items()},
+        "routes": route_stats.snapshot()["counts"],
+        "llm": llm.stats(),
+    }
+
+
+def print_report(result):
+    meta = result["meta"]
+    print(f"{result['requests']} requests in {result['elapsed_s']}s "
+          f"({result['throughput_rps']} req/s), commit {meta['commit']}")
+    print(f"{'stage':>10} | {'count':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 52)
+    rows = [("total", result["total_ms"])] + list(result["stages_ms"].items())
+    for name, s in rows:
+        if not s.get("count"):
+            print(f"{name:>10} | {0:>6} | {'-':>8} | {'-':>8} | {'-':>8}")
+            continue
+        print(f"{name:>10} | {s['count']:>6} | {s['p50']:>8.2f} | {s['p95']:>8.2f} | {s['p99']:>8.2f}")
+    print(f"routes: {result['routes']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end chat latency benchmark")
+    parser.add_argument('--corpus', type=Path, default=DEFAULT_CORPUS, help='.txt or .jsonl message corpus')
+    parser.add_argument('--menu-messages', type=int, default=40, help='Extra templated messages about menu items')
+    parser.add_argument('--rounds', type=int, default=3, help='Passes over the (shuffled) corpus')
+    parser.add_argument('--session-length', type=int, default=5, help='Messages per chat session')
+    parser.add_argument('--encoder', choices=['hashing', 'model'], default='hashing')
+    parser.add_argument('--encode-ms', type=float, default=15.0, help='Per-call cost of the hashing encoder')
+    parser.add_argument('--llm-ms', type=float, default=250.0, help='Median fake LLM latency')
+    parser.add_argument('--llm-sigma', type=float, default=0.3)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--cold-caches', action='store_true', help='Clear intent/query caches before every message')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='JSON output path (default: benchmarks/results/chat_e2e_<commit>.json)')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        result = run(args)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+    print_report(result)
+    output = args.output or DEFAULT_OUTPUT_DIR / f"chat_e2e_{result['meta']['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Saved {output}")
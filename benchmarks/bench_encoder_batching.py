@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark query encoding under concurrency: every client thread calling
+model.encode() directly against all of them going through BatchingEncoder.
+
+By default it loads the real sentence transformer. --simulated swaps in a
+model with a fixed per-call overhead plus a per-item cost, serialized by a
+lock like torch's shared thread pool, so it runs without torch or a download.
+
+Usage:
+    python benchmarks/bench_encoder_batching.py
+    python benchmarks/bench_encoder_batching.py --simulated --clients 1 8 32
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chatbot.encoder import BatchingEncoder
+
+
+MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+QUERIES = [
+    "something spicy", "paneer", "butter naan", "veg biryani", "dessert",
+    "cold drinks", "chicken tikka", "dal makhani", "gulab jamun", "lassi",
+    "masala dosa", "soup", "starters", "cheap vegan food", "noodles",
+]
+
+
+class SimulatedModel:
+    """encode() costs call_ms + item_ms per text; calls run one at a time."""
+
+    def __init__(self, call_ms: float, item_ms: float, dim: int = 768):
+        self.call = call_ms / 1000.0
+        self.item = item_ms / 1000.0
+        self.dim = dim
+        self._lock = threading.Lock()
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        with self._lock:
+            time.sleep(self.call + self.item * len(batch))
+        vectors = np.ones((len(batch), self.dim), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+def run_clients(encoder, clients: int, per_client: int):
+    """Return (throughput q/s, per-request latencies in ms)."""
+    latencies = []
+    latencies_lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def client(offset: int):
+        local = []
+        barrier.wait()
+        for i in range(per_client):
+            text = QUERIES[(offset + i) % len(QUERIES)]
+            start = time.perf_counter()
+            encoder.encode([text], convert_to_numpy=True)
+            local.append((time.perf_counter() - start) * 1000)
+        with latencies_lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return (clients * per_client) / elapsed, latencies
+
+
+def percentile(values, pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def run(model, clients_list, per_client: int, batch_size: int, max_wait_ms: float):
+    model.encode(["warm up"], convert_to_numpy=True)
+
+    print(f"{'clients':>7} | {'mode':>8} | {'q/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'mean batch':>10}")
+    print("-" * 64)
+    for clients in clients_list:
+        qps, lat = run_clients(model, clients, per_client)
+        print(f"{clients:>7} | {'direct':>8} | {qps:>8.1f} | {statistics.median(lat):>8.2f} | "
+              f"{percentile(lat, 95):>8.2f} | {'-':>10}")
+
+        encoder = BatchingEncoder(model, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+        qps, lat = run_clients(encoder, clients, per_client)
+        mean_batch = encoder.stats()["mean_batch_size"]
+        encoder.close()
+        print(f"{clients:>7} | {'batched':>8} | {qps:>8.1f} | {statistics.median(lat):>8.2f} | "
+              f"{percentile(lat, 95):>8.2f} | {mean_batch:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched query encoding")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=50, help='Encodes per client thread')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--simulated', action='store_true', help='Use a timing model instead of the transformer')
+    parser.add_argument('--call-ms', type=float, default=8.0, help='Simulated per-call overhead')
+    parser.add_argument('--item-ms', type=float, default=0.5, help='Simulated per-text cost')
+    args = parser.parse_args()
+
+    if args.simulated:
+        model = SimulatedModel(args.call_ms, args.item_ms)
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME)
+
+    run(model, args.clients, args.requests, args.batch_size, args.max_wait_ms)
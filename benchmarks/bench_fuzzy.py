@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark fuzzy name scoring over a page of rerank candidates: the old
+SequenceMatcher word-pair loop against chatbot.fuzzy (bigram Dice), both
+per name (fuzzy_score) and vectorized over the name vocabulary
+(MenuReranker.fuzzy_scores).
+
+Also prints how often the two scorers agree on the 0.6 bonus threshold.
+
+Usage:
+    python benchmarks/bench_fuzzy.py
+    python benchmarks/bench_fuzzy.py --items 3000 --candidates 150
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_rerank import time_per_call
+from chatbot.fuzzy import fuzzy_score
+from chatbot.rerank import MenuFeatures, MenuReranker
+from chatbot.rerank_reference import QUERIES, legacy_fuzzy_match_score, synthetic_menu
+
+
+TYPO_QUERIES = ["panner tika", "chiken biriyani", "butter nan", "mashroom soup", "gobhi manchurian"]
+THRESHOLD = 0.6
+
+
+def run(items: int, candidates: int, repeats: int):
+    ids, metadatas = synthetic_menu(items)
+    features = MenuFeatures(ids, metadatas)
+    rng = np.random.default_rng(0)
+
+    print(f"{candidates} candidates from a {items}-item menu\n")
+    print(f"{'query':<30} | {'difflib ms':>10} | {'dice ms':>8} | {'vector ms':>9} | speedup | agree")
+    print("-" * 84)
+    totals = [0.0, 0.0, 0.0]
+    queries = QUERIES + TYPO_QUERIES
+    for query in queries:
+        picks = rng.choice(items, size=min(candidates, items), replace=False)
+        names = [features.metadatas[p]["name"] for p in picks]
+        query_lower = query.lower()
+        contains = np.array([query_lower in n.lower() for n in names])
+
+        legacy_ms = time_per_call(lambda: [legacy_fuzzy_match_score(query, n) for n in names], repeats)
+        dice_ms = time_per_call(lambda: [fuzzy_score(query, n) for n in names], repeats)
+        # Fresh reranker each call: no cached word scores
+        vector_ms = time_per_call(lambda: MenuReranker(features).fuzzy_scores(query_lower, picks, contains), repeats)
+
+        old = np.array([legacy_fuzzy_match_score(query, n) for n in names])
+        new = MenuReranker(features).fuzzy_scores(query_lower, picks, contains)
+        assert np.allclose(new, [fuzzy_score(query, n) for n in names]), f"vectorized mismatch for {query!r}"
+        agree = float(np.mean((old > THRESHOLD) == (new > THRESHOLD)))
+
+        totals[0] += legacy_ms
+        totals[1] += dice_ms
+        totals[2] += vector_ms
+        print(
+            f"{query:<30} | {legacy_ms:>10.3f} | {dice_ms:>8.3f} | {vector_ms:>9.3f} | "
+            f"{legacy_ms / vector_ms:>6.1f}x | {agree:>5.0%}"
+        )
+
+    print("-" * 84)
+    n = len(queries)
+    print(
+        f"{'mean':<30} | {totals[0] / n:>10.3f} | {totals[1] / n:>8.3f} | {totals[2] / n:>9.3f} | "
+        f"{totals[0] / totals[2]:>6.1f}x |"
+    )
+    print(f"\nagree: share of candidates on the same side of the {THRESHOLD} fuzzy bonus threshold")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy name scoring")
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--candidates', type=int, default=150)
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    run(args.items, args.candidates, args.repeats)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark the query keyword work in menu_search: the old
+enhance_query loops, the per-keyword substring tests for the rerank boosts
+and the 'ingredient in query' tests, against chatbot.automaton.KeywordAutomaton.
+
+KeywordAutomaton.scan() is timed twice: forced onto the Aho-Corasick
+automaton, and as shipped, which keeps substring loops below
+AUTOMATON_MIN_KEYWORDS keywords. Every variant produces the expanded query
+text, the triggered boost keywords and the menu ingredients named in the
+query, and is checked against the old code. The loops' cost grows with the
+ingredient vocabulary; the automaton's barely does. Use the crossover to
+set CHATBOT_AUTOMATON_MIN_KEYWORDS. The expansion table is read from
+menu_search.py's source (importing the module needs chromadb).
+
+Usage:
+    python benchmarks/bench_keywords.py
+    python benchmarks/bench_keywords.py --ingredients 0 100 500 --repeats 5000
+"""
+
+import argparse
+import ast
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path if running standalone
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from chatbot.automaton import AUTOMATON_MIN_KEYWORDS, KeywordAutomaton
+from chatbot.rerank import BOOST_KEYWORDS
+
+
+FOOD_TERMS = ['paneer', 'chicken', 'rice', 'noodles', 'dosa', 'idli',
+              'pasta', 'burger', 'sandwich', 'tea', 'coffee']
+FOOD_TERM_SET = frozenset(FOOD_TERMS)
+BOOST_KEYWORD_SET = frozenset(BOOST_KEYWORDS)
+
+INGREDIENTS = ["onion", "tomato", "garlic", "ginger", "cream", "butter", "paneer", "chicken", "rice",
+               "flour", "chilli", "coriander", "cumin", "egg", "potato", "cashew", "yogurt", "lentils"]
+MODIFIERS = ["chopped", "fresh", "roasted", "green", "red", "dried", "ground", "fried", "sliced", "whole"]
+
+QUERIES = [
+    "paneer",
+    "spicy chicken biryani",
+    "cheap veg snacks for the evening",
+    "something sweet and creamy for dessert after dinner",
+    "non-veg grilled starters",
+    "vegan breakfast dosa",
+    "egg fried rice",
+    "mild lunch thali with extra rice and butter naan",
+    "chickentikka",
+    "south indian",
+]
+
+
+def query_expansions():
+    """The query_expansions dict literal from ImprovedMenuSearchSystem._init_query_system."""
+    tree = ast.parse((ROOT / "menu_search.py").read_text())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Attribute):
+            if node.targets[0].attr == "query_expansions":
+                return ast.literal_eval(node.value)
+    raise SystemExit("query_expansions not found in menu_search.py")
+
+
+def legacy(query, expansions, ingredients):
+    """Old enhance_query, the boost keyword tests and the 'ingredient in query' tests."""
+    query_lower = query.lower()
+    words = query_lower.split()
+    enhanced_terms = [query_lower]
+    for word in words:
+        if word in expansions:
+            enhanced_terms.append(expansions[word])
+    for term in FOOD_TERMS:
+        if term in query_lower and term not in words:
+            enhanced_terms.append(term)
+    triggered = {keyword for keyword in BOOST_KEYWORDS if keyword in query_lower}
+    found = {ing for ing in ingredients if ing in query_lower}
+    return ' '.join(enhanced_terms), triggered, found
+
+
+def scanned(query, expansions, ingredients: frozenset, automaton):
+    """The same from one KeywordAutomaton.scan(), as menu_search and MenuReranker now do it."""
+    query_lower = query.lower()
+    hits = automaton.scan(query_lower)
+    enhanced_terms = [query_lower]
+    for word in hits.words:
+        if word in expansions:
+            enhanced_terms.append(expansions[word])
+    present = hits.among(FOOD_TERM_SET)
+    for term in FOOD_TERMS:
+        if term in present and term not in hits.words:
+            enhanced_terms.append(term)
+    triggered = hits.among(BOOST_KEYWORD_SET)
+    found = hits.among(ingredients)
+    return ' '.join(enhanced_terms), triggered, found
+
+
+def ingredient_vocabulary(size: int):
+    """size distinct ingredient labels, like a menu's ingredient lists."""
+    labels = list(INGREDIENTS)
+    i = 0
+    while len(labels) < size:
+        labels.append(f"{MODIFIERS[i % len(MODIFIERS)]} {INGREDIENTS[(i // len(MODIFIERS)) % len(INGREDIENTS)]}{i // 400 or ''}")
+        i += 1
+    return labels[:size]
+
+
+def time_loop(fn, repeats: int) -> float:
+    """Mean wall time of fn() in microseconds."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeats
+
+
+def run(sizes, repeats: int):
+    expansions = query_expansions()
+    print(f"scan() uses the automaton from {AUTOMATON_MIN_KEYWORDS} keywords\n")
+    print(
+        f"{'ingredients':>11} | {'keywords':>8} | {'build ms':>8} | {'loops us/q':>10} | "
+        f"{'automaton us/q':>14} | {'scan() us/q':>11} | path"
+    )
+    print("-" * 90)
+    for size in sizes:
+        ingredients = ingredient_vocabulary(size)
+        ingredient_set = frozenset(ingredients)
+        keywords = list(expansions) + FOOD_TERMS + BOOST_KEYWORDS + ingredients
+        start = time.perf_counter()
+        forced = KeywordAutomaton(keywords, min_keywords=0)
+        build_ms = (time.perf_counter() - start) * 1000
+        shipped = KeywordAutomaton(keywords)
+
+        old_us = forced_us = shipped_us = 0.0
+        for query in QUERIES:
+            expected = legacy(query, expansions, ingredients)
+            for automaton in (forced, shipped):
+                got = scanned(query, expansions, ingredient_set, automaton)
+                assert got == expected, f"{'automaton' if automaton.use_automaton else 'loops'} differ for {query!r}"
+            old_us += time_loop(lambda: legacy(query, expansions, ingredients), repeats)
+            forced_us += time_loop(lambda: scanned(query, expansions, ingredient_set, forced), repeats)
+            shipped_us += time_loop(lambda: scanned(query, expansions, ingredient_set, shipped), repeats)
+        n = len(QUERIES)
+        print(
+            f"{size:>11} | {len(forced):>8} | {build_ms:>8.2f} | {old_us / n:>10.2f} | "
+            f"{forced_us / n:>14.2f} | {shipped_us / n:>11.2f} | "
+            f"{'automaton' if shipped.use_automaton else 'loops'}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark query keyword matching")
+    parser.add_argument('--ingredients', type=int, nargs='+', default=[0, 10, 20, 50, 100, 300, 1000],
+                        help='Distinct menu ingredient labels')
+    parser.add_argument('--repeats', type=int, default=2000)
+    args = parser.parse_args()
+
+    run(args.ingredients, args.repeats)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark menu_search reranking: the old per-candidate Python loop
+(_rerank_results + _calculate_boost + fuzzy_match_score, kept in
+chatbot/rerank_reference.py) against chatbot.rerank.MenuReranker over
+precomputed MenuFeatures.
+
+Uses a synthetic menu with Chroma-shaped metadata (list fields as JSON
+strings) and random distances, so no model or database is needed.
+The candidate count defaults to top_k * 3 = 150. Timings use the old
+SequenceMatcher fuzzy scorer; the equality check swaps in chatbot.fuzzy's.
+
+Usage:
+    python benchmarks/bench_rerank.py
+    python benchmarks/bench_rerank.py --items 3000 --candidates 150 --top-k 50
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chatbot.fuzzy import fuzzy_score
+from chatbot.rerank import MenuFeatures, MenuReranker
+from chatbot.rerank_reference import QUERIES, chroma_results, legacy_rerank, synthetic_menu
+
+
+def time_per_call(fn, repeats: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(items: int, candidates: int, top_k: int, repeats: int):
+    ids, metadatas = synthetic_menu(items)
+    start = time.perf_counter()
+    features = MenuFeatures(ids, metadatas)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"features for {items} items built in {build_ms:.1f} ms; {candidates} candidates, top_k={top_k}\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'query':<30} | {'legacy ms':>9} | {'cold ms':>8} | {'warm ms':>8} | speedup")
+    print("-" * 74)
+    totals = [0.0, 0.0, 0.0]
+    warm = MenuReranker(features)
+    for query in QUERIES:
+        picks = rng.choice(items, size=min(candidates, items), replace=False).tolist()
+        distances = np.sort(rng.uniform(0.2, 0.9, size=len(picks))).tolist()
+        picked_ids = [ids[p] for p in picks]
+
+        legacy_ms = time_per_call(
+            lambda: legacy_rerank(query, chroma_results(ids, metadatas, picks, distances), None, top_k), repeats
+        )
+        cold_ms = time_per_call(
+            lambda: MenuReranker(features).rerank(query, picked_ids, distances, top_k), repeats
+        )
+        warm_ms = time_per_call(lambda: warm.rerank(query, picked_ids, distances, top_k), repeats)
+
+        # Same items, same order, same scores (given the same fuzzy scorer)
+        expected = legacy_rerank(
+            query, chroma_results(ids, metadatas, picks, distances), None, top_k, fuzzy=fuzzy_score
+        )
+        got = warm.rerank(query, picked_ids, distances, top_k)
+        assert [r["id"] for r in expected] == [r["id"] for r in got], f"ranking mismatch for {query!r}"
+        assert np.allclose([r["score"] for r in expected], [r["score"] for r in got]), f"score mismatch for {query!r}"
+
+        totals[0] += legacy_ms
+        totals[1] += cold_ms
+        totals[2] += warm_ms
+        print(f"{query:<30} | {legacy_ms:>9.3f} | {cold_ms:>8.3f} | {warm_ms:>8.3f} | {legacy_ms / warm_ms:>6.1f}x")
+
+    print("-" * 74)
+    n = len(QUERIES)
+    print(
+        f"{'mean':<30} | {totals[0] / n:>9.3f} | {totals[1] / n:>8.3f} | {totals[2] / n:>8.3f} | "
+        f"{totals[0] / totals[2]:>6.1f}x"
+    )
+    print("\ncold: fresh MenuReranker (empty fuzzy word-score cache); warm: reused across queries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark menu_search reranking")
+    parser.add_argument('--items', type=int, default=1000, help='Menu size the features are built for')
+    parser.add_argument('--candidates', type=int, default=150, help='Chroma hits to rerank (top_k * 3)')
+    parser.add_argument('--top-k', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    run(args.items, args.candidates, args.top_k, args.repeats)
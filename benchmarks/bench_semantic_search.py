@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark menu-index scoring: the old torch `util.cos_sim` + full argsort path
+against MenuIndex.search (pre-normalized float32 matmul + argpartition).
+
+Uses random 768-d vectors, so no model or database is needed.
+
+Usage:
+    python benchmarks/bench_semantic_search.py
+    python benchmarks/bench_semantic_search.py --rows 50 5000 500000 --top-k 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chatbot.index_registry import MenuIndex
+
+
+DIM = 768
+
+
+def legacy_search(query: np.ndarray, embeddings: np.ndarray, top_k: int):
+    """The pre-change semantic_search scoring path."""
+    try:
+        from sentence_transformers import util
+    except ImportError:
+        # Same work without torch: re-normalize everything, full descending sort
+        norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query)
+        scores = (embeddings @ query) / norms
+        return np.argsort(-scores)[:top_k]
+    scores = util.cos_sim(query, embeddings)[0]
+    return scores.argsort(descending=True)[:top_k].tolist()
+
+
+def time_per_call(fn, repeats: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(rows_list, top_k: int, batch: int, repeats: int):
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8} | {'legacy ms/q':>12} | {'matmul ms/q':>12} | {f'batch{batch} ms/q':>13} | speedup")
+    print("-" * 68)
+
+    for rows in rows_list:
+        raw = rng.standard_normal((rows, DIM), dtype=np.float32)
+        index = MenuIndex(restaurant_id=None, embeddings=raw, text_chunks=[""] * rows)
+        queries = rng.standard_normal((batch, DIM), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        q = queries[0]
+
+        reps = max(3, repeats // max(1, rows // 5000))
+        legacy_ms = time_per_call(lambda: legacy_search(q, raw, top_k), reps)
+        new_ms = time_per_call(lambda: index.search(q, top_k), reps)
+        batch_ms = time_per_call(lambda: index.search(queries, top_k), reps) / batch
+
+        # Both paths must agree on the ranking
+        expected = list(legacy_search(q, raw, top_k))
+        got = index.search(q, top_k)[0][0].tolist()
+        assert expected == got, f"ranking mismatch at {rows} rows: {expected} vs {got}"
+
+        print(
+            f"{rows:>8} | {legacy_ms:>12.3f} | {new_ms:>12.3f} | {batch_ms:>13.3f} | "
+            f"{legacy_ms / new_ms:>6.1f}x"
+        )
+        del raw, index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark semantic search scoring")
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 5000, 500000])
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=16, help='Queries per batched call')
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    run(args.rows, args.top_k, args.batch, args.repeats)
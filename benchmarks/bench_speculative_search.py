@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark parse_message with and without the speculative raw-message search
+(CHATBOT_SPECULATIVE_SEARCH).
+
+Runs the real engine code paths offline. The LLM is a FakeLLMBackend with a
+log-normal latency that returns the labelled intent for each corpus message.
+The encoder is a hashing model with a fixed per-call cost. The index is built
+from the root text_chunks.json with the same hashing model.
+
+Usage:
+    python benchmarks/bench_speculative_search.py
+    python benchmarks/bench_speculative_search.py --llm-ms 300 --encode-ms 20 --repeats 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from chatbot import engine
+from chatbot.caches import query_embedding_cache
+from chatbot.index_registry import IndexRegistry, MenuIndex
+from chatbot.llm import FakeLLMBackend, set_llm_backend
+from chatbot.speculation import speculation_stats
+from stubs import HashingModel
+
+
+# (message, intent the LLM returns, item_name the LLM returns)
+CORPUS = [
+    ("I want butter naan", "ADD_ITEM", "butter naan"),
+    ("get me some naan bread", "ADD_ITEM", "naan bread"),
+    ("I'd like to order butter chicken", "ADD_ITEM", "butter chicken"),
+    ("paner tika", "ADD_ITEM", "paner tika"),
+    ("paneer tikka please", "ADD_ITEM", "paneer tikka"),
+    ("gulab jamun", "ADD_ITEM", "gulab jamun"),
+    ("I want 2 butter naan and 1 paneer", "ADD_ITEM", "butter naan"),
+    ("something spicy", "SEARCH_ITEM", "spicy"),
+    ("show me breads", "SEARCH_ITEM", "breads"),
+    ("vegetarian options", "SEARCH_ITEM", "vegetarian"),
+    ("what do you have", "SEARCH_ITEM", "dishes"),
+    ("show me your dishes", "SEARCH_ITEM", "dishes"),
+    ("dal makhani", "SEARCH_ITEM", "dal makhani"),
+    ("do you have any desserts", "SEARCH_ITEM", "desserts"),
+    ("masala dosa", "SEARCH_ITEM", "masala dosa"),
+    ("what can I order", "HELP", None),
+    ("tell me about your paneer dishes", "HELP", None),
+    ("which curries are not too spicy", "HELP", None),
+    ("what's in my cart", "SHOW_CART", None),
+    ("I'm done, place it", "CONFIRM_ORDER", None),
+]
+LABELS = {message: (intent, item) for message, intent, item in CORPUS}
+
+
+class LabelledFakeLLM(FakeLLMBackend):
+    """FakeLLMBackend that answers with the corpus labels."""
+
+    def classify(self, message):
+        intent, item = LABELS.get(message, ("HELP", None))
+        return {"intent": intent, "item_name": item, "quantity": 1}
+
+
+def install_stubs(encode_ms: float):
+    model = HashingModel(encode_ms)
+    chunks = json.loads((ROOT / "text_chunks.json").read_text(encoding="utf-8"))
+    index = MenuIndex(restaurant_id=1, embeddings=model.encode(chunks), text_chunks=chunks)
+
+    engine._embed_model = model
+    engine._index_registry = IndexRegistry(loader=lambda rid: index)
+    # Tests the sequential path; batching would only add its wait window
+    engine.ENCODER_BATCHING = False
+
+
+def run_mode(speculative: bool, repeats: int, llm_ms: float, llm_sigma: float, seed: int):
+    # Fresh seeded backend per mode so both modes see the same LLM latencies
+    set_llm_backend(LabelledFakeLLM(latency_ms=llm_ms, latency_sigma=llm_sigma, seed=seed))
+    engine.SPECULATIVE_SEARCH = speculative
+    latencies = []
+    for _ in range(repeats):
+        for message, _, _ in CORPUS:
+            # Every message is "new": no cached intents or query vectors
+            engine._intent_cache.clear()
+            query_embedding_cache.clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                engine.parse_message(message, restaurant_id=1)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(label, latencies):
+    p50 = statistics.median(latencies)
+    p95 = float(np.percentile(latencies, 95))
+    print(f"{label:>12} | {p50:>8.1f} | {p95:>8.1f} | {statistics.mean(latencies):>8.1f}")
+    return p50, p95
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark speculative search during LLM classification")
+    parser.add_argument('--llm-ms', type=float, default=250.0, help='Median fake LLM latency')
+    parser.add_argument('--llm-sigma', type=float, default=0.3, help='Log-normal sigma of the LLM latency')
+    parser.add_argument('--encode-ms', type=float, default=15.0, help='Per-call encoder cost')
+    parser.add_argument('--repeats', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    install_stubs(args.encode_ms)
+
+    print(f"{'mode':>12} | {'p50 ms':>8} | {'p95 ms':>8} | {'mean ms':>8}")
+    print("-" * 46)
+    base = summarize("sequential", run_mode(False, args.repeats, args.llm_ms, args.llm_sigma, args.seed))
+    speculation_stats.reset()
+    spec = summarize("speculative", run_mode(True, args.repeats, args.llm_ms, args.llm_sigma, args.seed))
+
+    stats = speculation_stats.snapshot()
+    print(f"\nspeculations: {stats['started']}, reused: {stats['reused']} "
+          f"({stats['reuse_rate']:.0%}), wasted: {stats['wasted']}")
+    print(f"p50 {base[0] - spec[0]:+.1f} ms saved, p95 {base[1] - spec[1]:+.1f} ms saved")
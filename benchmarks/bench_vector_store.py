@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark menu_search's vector store backends: ChromaVectorStore against
+NumpyVectorStore (chatbot/vector_store.py).
+
+For each menu size this reports the time to write the store, the time to
+open it cold, and the per-query latency with and without a where clause
+like the ones build_where produces. The NumPy store's results are checked
+against a brute-force scan. When chromadb is installed, Chroma's top-k is
+compared with it as recall@k (HNSW is approximate). Without chromadb only
+the NumPy columns are filled.
+
+Uses random unit vectors and the synthetic menu from
+chatbot.rerank_reference, so no model is needed.
+
+Usage:
+    python benchmarks/bench_vector_store.py
+    python benchmarks/bench_vector_store.py --rows 200 1000 5000 --dim 768 --n-results 15
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path if running standalone
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_rerank import time_per_call
+from chatbot.rerank_reference import synthetic_menu
+from chatbot.vector_store import make_vector_store
+
+
+WHERE = {"$and": [{"is_vegetarian": {"$eq": True}}, {"price": {"$lte": 250.0}}]}
+
+
+def brute_force(embeddings, metadatas, query, n_results, where):
+    keep = [
+        i for i, m in enumerate(metadatas)
+        if where is None or (m["is_vegetarian"] is True and m["price"] <= 250.0)
+    ]
+    distances = ((embeddings[keep] - query) ** 2).sum(axis=1)
+    return [keep[i] for i in np.argsort(distances, kind="stable")[:n_results]]
+
+
+def measure(backend, directory, ids, embeddings, metadatas, queries, n_results, repeats):
+    """(write ms, cold open ms, query ms, filtered query ms, results) for one backend."""
+    store = make_vector_store(directory, backend)
+    start = time.perf_counter()
+    store.reset()
+    store.add(ids=ids, embeddings=embeddings, metadatas=metadatas)
+    write_ms = (time.perf_counter() - start) * 1000
+    store.close()
+
+    start = time.perf_counter()
+    store = make_vector_store(directory, backend)
+    assert store.open()
+    open_ms = (time.perf_counter() - start) * 1000
+
+    q = [queries[0].tolist()]
+    query_ms = time_per_call(lambda: store.query(query_embeddings=q, n_results=n_results), repeats)
+    where_ms = time_per_call(lambda: store.query(query_embeddings=q, n_results=n_results, where=WHERE), repeats)
+    results = [
+        (store.query(query_embeddings=[v.tolist()], n_results=n_results)["ids"][0],
+         store.query(query_embeddings=[v.tolist()], n_results=n_results, where=WHERE)["ids"][0])
+        for v in queries
+    ]
+    store.close()
+    return write_ms, open_ms, query_ms, where_ms, results
+
+
+def run(rows_list, dim: int, n_results: int, repeats: int):
+    try:
+        import chromadb  # noqa: F401
+        backends = ["numpy", "chroma"]
+    except ImportError:
+        backends = ["numpy"]
+        print("chromadb not installed: NumPy store only\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>6} | {'backend':>7} | {'write ms':>9} | {'open ms':>8} | {'query ms':>8} | {'where ms':>8} | check")
+    print("-" * 76)
+    for rows in rows_list:
+        ids, metadatas = synthetic_menu(rows)
+        embeddings = rng.standard_normal((rows, dim), dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        queries = embeddings[rng.choice(rows, size=10, replace=False)] + rng.normal(0, 0.05, (10, dim)).astype(np.float32)
+
+        expected = [
+            ([ids[i] for i in brute_force(embeddings, metadatas, v, n_results, None)],
+             [ids[i] for i in brute_force(embeddings, metadatas, v, n_results, WHERE)])
+            for v in queries
+        ]
+        for backend in backends:
+            directory = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+            try:
+                write_ms, open_ms, query_ms, where_ms, results = measure(
+                    backend, directory, ids, embeddings, metadatas, queries, n_results, repeats
+                )
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+            if backend == "numpy":
+                assert results == expected, f"NumPy store disagrees with brute force at {rows} rows"
+                check = "exact"
+            else:
+                found = sum(len(set(got) & set(want)) for pair, pairs in zip(results, expected) for got, want in zip(pair, pairs))
+                total = sum(len(want) for pairs in expected for want in pairs)
+                check = f"recall {found / max(total, 1):.2f}"
+            print(
+                f"{rows:>6} | {backend:>7} | {write_ms:>9.1f} | {open_ms:>8.2f} | {query_ms:>8.3f} | "
+                f"{where_ms:>8.3f} | {check}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument('--rows', type=int, nargs='+', default=[200, 1000, 5000])
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--n-results', type=int, default=15, help='top_k * 3 in menu_search')
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    run(args.rows, args.dim, args.n_results, args.repeats)
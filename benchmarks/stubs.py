@@ -0,0 +1,36 @@
+"""
+Offline stand-ins shared by the benchmarks.
+"""
+
+import time
+import zlib
+
+import numpy as np
+
+
+DIM = 768
+
+
+class HashingModel:
+    """
+    Character-trigram hashing encoder with SentenceTransformer's encode()
+    signature. Each call costs encode_ms, roughly one short mpnet query on CPU.
+    """
+
+    def __init__(self, encode_ms: float = 0.0, dim: int = DIM):
+        self.cost = encode_ms / 1000.0
+        self.dim = dim
+
+    def vector(self, text: str) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        t = f"  {text.lower()}  "
+        for i in range(len(t) - 2):
+            v[zlib.crc32(t[i:i + 3].encode()) % self.dim] += 1.0
+        return v
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        if self.cost:
+            time.sleep(self.cost)
+        if isinstance(texts, str):
+            return self.vector(texts)
+        return np.vstack([self.vector(t) for t in texts]) if texts else np.empty((0, self.dim), dtype=np.float32)
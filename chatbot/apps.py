@@ -1,6 +1,23 @@
+import logging
+import os
+
 from django.apps import AppConfig
 
 
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
+
+    def ready(self):
+        from chatbot import signals  # noqa: F401 (registers MenuItem receivers)
+
+        # The RAG stack loads lazily on the first chat request. Web workers can
+        # opt in to loading it at startup instead; CLI commands never pay for it.
+        if os.getenv("CHATBOT_WARM_RAG_ON_STARTUP", "False") == "True":
+            from chatbot.engine import warm_rag
+            try:
+                warm_rag()
+            except Exception as e:
+                logging.getLogger(__name__).warning(
+                    "Could not warm RAG system (%s); chatbot will load it on first request.", e
+                )
@@ -0,0 +1,138 @@
+# chatbot/automaton.py
+"""
+Aho-Corasick keyword matching for query expansion and rerank boosts.
+
+menu_search tested dozens of keywords against every query one by one:
+'keyword in query_lower' for the price, diet, spice, cooking-style and
+meal-time tables, 'word in query_expansions' for every query word and
+another substring test for each food term, plus one test per menu
+ingredient. KeywordAutomaton answers all of those questions from one
+object:
+
+    keyword in hits   the keyword occurs anywhere ('keyword in query')
+    hits.among(set)   those of a set of keywords that occur
+    hits.words        query tokens that are keywords, in query order
+                      ('token in vocabulary for token in query.split()')
+
+Each 'in' test is a fast C substring search, so for the fixed tables alone
+(~60 keywords) the plain loops beat a pure-Python automaton, which pays
+one dict lookup per query character. Their cost grows with the number of
+keywords, though, and once a menu adds a few dozen distinct ingredients
+the single left-to-right automaton pass is cheaper. Below
+AUTOMATON_MIN_KEYWORDS keywords (benchmarks/bench_keywords.py measures the
+crossover) scan() only splits the query into tokens and KeywordHits answers
+each question with the same substring test the old code made; from there on
+it runs the automaton. Both give the same answers.
+
+The automaton's failure links are folded into a full transition table (one
+dict per state over the keywords' alphabet), so scanning costs one dict
+lookup per character whatever the number of keywords. Only keywords
+without whitespace can be whole-token hits, as with query.split().
+"""
+import os
+from collections import deque
+from typing import AbstractSet, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Keyword count from which scan() uses the automaton instead of substring loops
+AUTOMATON_MIN_KEYWORDS = int(os.getenv("CHATBOT_AUTOMATON_MIN_KEYWORDS", "70"))
+
+
+class KeywordHits:
+    """
+    What scan() found in one text. 'keyword in hits' and among() answer
+    substring questions for the automaton's keywords; words lists the text's
+    tokens that are keywords, in order.
+    """
+
+    __slots__ = ("text", "words", "_found")
+
+    def __init__(self, text: str, words: List[str], found: Optional[Set[str]] = None):
+        self.text = text
+        self.words = words
+        self._found = found  # None: answer by substring tests on text
+
+    def __contains__(self, keyword: str) -> bool:
+        if self._found is None:
+            return keyword in self.text
+        return keyword in self._found
+
+    def among(self, keywords: AbstractSet[str]) -> Set[str]:
+        """The given keywords occurring in the text."""
+        if self._found is None:
+            text = self.text
+            return {keyword for keyword in keywords if keyword in text}
+        return {keyword for keyword in self._found if keyword in keywords}
+
+
+class KeywordAutomaton:
+    """Multi-pattern matcher over a fixed keyword set (lowercase input expected)."""
+
+    def __init__(self, keywords: Iterable[str], min_keywords: int = AUTOMATON_MIN_KEYWORDS):
+        self.keywords: List[str] = list(dict.fromkeys(k for k in keywords if k))
+        self.tokens: Set[str] = {k for k in self.keywords if not any(c.isspace() for c in k)}
+        self.use_automaton = len(self.keywords) >= min_keywords
+        if self.use_automaton:
+            self._build()
+
+    def _build(self):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(keyword_id)
+
+        # Breadth-first: failure links, inherited outputs, and the full
+        # transition table (a state's missing edges are its failure state's)
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+                delta[state][ch] = nxt
+                queue.append(nxt)
+        self._delta = delta
+        self._outputs: List[Tuple[Tuple[str, int], ...]] = [
+            tuple((self.keywords[k], len(self.keywords[k])) for k in out) for out in outputs
+        ]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def scan(self, text: str) -> KeywordHits:
+        """Keyword occurrences in text: one automaton pass, or lazy substring tests below min_keywords."""
+        if not self.use_automaton:
+            tokens = self.tokens
+            return KeywordHits(text, [word for word in text.split() if word in tokens])
+
+        found: Set[str] = set()
+        words: List[Tuple[int, str]] = []
+        delta = self._delta
+        outputs = self._outputs
+        tokens = self.tokens
+        last = len(text) - 1
+        state = 0
+        for end, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for keyword, length in outputs[state]:
+                    found.add(keyword)
+                    if keyword not in tokens:
+                        continue
+                    start = end - length + 1
+                    if (start == 0 or text[start - 1].isspace()) and (end == last or text[end + 1].isspace()):
+                        words.append((start, keyword))
+        # Whole-token hits in text order (several keywords can end at the same character)
+        return KeywordHits(text, [keyword for _, keyword in sorted(words)], found)
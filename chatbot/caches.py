@@ -0,0 +1,254 @@
+# chatbot/caches.py
+"""
+In-process caches for the chatbot hot path.
+
+IntentCache memoizes classify_intent_with_llm() results by normalized message
+text. It keeps a local LRU with a TTL and, when Django is configured, also
+reads/writes the Django cache backend so results are shared across gunicorn
+workers (set REDIS_URL to get a shared backend).
+
+QueryEmbeddingCache memoizes query text -> unit-normalized embedding so the
+same search term isn't re-encoded several times within one message. A single
+process-wide instance is shared by chatbot/engine.py and menu_search.py.
+"""
+import copy
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .rules import normalize_command
+
+
+INTENT_CACHE_SIZE = int(os.getenv("CHATBOT_INTENT_CACHE_SIZE", "2048"))
+INTENT_CACHE_TTL = int(os.getenv("CHATBOT_INTENT_CACHE_TTL", "3600"))
+# Django cache alias for the shared tier; empty string disables it
+INTENT_CACHE_ALIAS = os.getenv("CHATBOT_INTENT_CACHE_ALIAS", "default")
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("CHATBOT_QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+QUERY_EMBEDDING_CACHE_MAX_MB = int(os.getenv("CHATBOT_QUERY_EMBEDDING_CACHE_MAX_MB", "32"))
+
+
+class IntentCache:
+    """LRU + TTL cache of parsed intents keyed by normalized message."""
+
+    def __init__(
+        self,
+        max_entries: int = INTENT_CACHE_SIZE,
+        ttl: float = INTENT_CACHE_TTL,
+        cache_alias: Optional[str] = INTENT_CACHE_ALIAS,
+        namespace: str = "chatbot:intent:v1",
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _key(self, message: str) -> str:
+        return normalize_command(message)
+
+    def _shared_key(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{digest}"
+
+    def _shared_backend(self):
+        """Django cache for the shared tier, or None outside Django."""
+        if not self.cache_alias:
+            return None
+        try:
+            from django.conf import settings
+            if not settings.configured:
+                return None
+            from django.core.cache import caches
+            return caches[self.cache_alias]
+        except Exception:
+            return None
+
+    def get(self, message: str) -> Optional[Dict[str, any]]:
+        key = self._key(message)
+        if not key:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self.expirations += 1
+
+        backend = self._shared_backend()
+        if backend is not None:
+            try:
+                value = backend.get(self._shared_key(key))
+            except Exception:
+                value = None
+            if value is not None:
+                self._store_local(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return copy.deepcopy(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, message: str, value: Dict[str, any]):
+        key = self._key(message)
+        if not key:
+            return
+        value = copy.deepcopy(value)
+        self._store_local(key, value)
+
+        backend = self._shared_backend()
+        if backend is not None:
+            try:
+                backend.set(self._shared_key(key), value, timeout=self.ttl)
+            except Exception:
+                pass  # a cache outage must never break chat
+
+    def _store_local(self, key: str, value: Dict[str, any]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": ((self.hits + self.shared_hits) / lookups) if lookups else 0.0,
+            }
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of (model name, normalized query) -> unit-normalized float32
+    vector. Limited by entry count and total bytes. Cached vectors are
+    read-only so callers can't corrupt shared entries.
+    """
+
+    _space_re = re.compile(r"\s+")
+
+    def __init__(
+        self,
+        max_entries: int = QUERY_EMBEDDING_CACHE_SIZE,
+        max_bytes: int = QUERY_EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def normalize(self, text: str) -> str:
+        return self._space_re.sub(" ", (text or "").strip().lower())
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, self.normalize(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector: np.ndarray) -> np.ndarray:
+        """Normalize and store a vector; returns the cached (read-only) copy."""
+        key = (model_name, self.normalize(text))
+        vector = np.array(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector = vector / norm
+        vector.setflags(write=False)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.nbytes
+            self._entries[key] = vector
+            self._total_bytes += vector.nbytes
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.nbytes
+                self.evictions += 1
+        return vector
+
+    def encode(self, model, text: str, model_name: str) -> np.ndarray:
+        """Return the cached embedding for text, encoding it with model on a miss."""
+        vector = self.get(model_name, text)
+        if vector is not None:
+            return vector
+        return self.put(model_name, text, model.encode(self.normalize(text), convert_to_numpy=True))
+
+    def encode_many(self, model, texts: List[str], model_name: str) -> np.ndarray:
+        """Embeddings for several texts (one row each), encoding all misses in one batch."""
+        vectors = [self.get(model_name, t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            unique = list(dict.fromkeys(self.normalize(texts[i]) for i in missing))
+            encoded = model.encode(unique, convert_to_numpy=True)
+            fresh = {t: self.put(model_name, t, v) for t, v in zip(unique, encoded)}
+            for i in missing:
+                vectors[i] = fresh[self.normalize(texts[i])]
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Shared by chatbot/engine.py and menu_search.ImprovedMenuSearchSystem
+query_embedding_cache = QueryEmbeddingCache()
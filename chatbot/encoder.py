@@ -0,0 +1,122 @@
+# chatbot/encoder.py
+"""
+Micro-batching front-end for SentenceTransformer.encode.
+
+Under load many request threads each encode a single short query. Per-call
+overhead dominates and the threads fight over torch's intra-op thread pool.
+BatchingEncoder funnels those calls through one worker thread that waits up
+to max_wait_ms for more requests, then encodes them as a single batch.
+Each caller gets its own Future back.
+
+Enable it for the chatbot with CHATBOT_ENCODER_BATCHING=True.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Union
+
+import numpy as np
+
+
+ENCODER_BATCHING = os.getenv("CHATBOT_ENCODER_BATCHING", "False") == "True"
+ENCODER_BATCH_SIZE = int(os.getenv("CHATBOT_ENCODER_BATCH_SIZE", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("CHATBOT_ENCODER_MAX_WAIT_MS", "5"))
+
+
+class BatchingEncoder:
+    """
+    Wraps a model with an encode(list[str], convert_to_numpy=True) method.
+    Exposes the same encode() signature, so it can stand in for the model.
+    """
+
+    def __init__(self, model, max_batch_size: int = ENCODER_BATCH_SIZE, max_wait_ms: float = ENCODER_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="batching-encoder", daemon=True)
+                self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue one text for encoding; the Future resolves to its vector."""
+        if self._closed:
+            raise RuntimeError("BatchingEncoder is closed")
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, texts: Union[str, List[str]], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Blocking encode with SentenceTransformer.encode's calling convention."""
+        if isinstance(texts, str):
+            return self.submit(texts).result()
+        futures = [self.submit(t) for t in texts]
+        return np.vstack([f.result() for f in futures]) if futures else np.empty((0, 0), dtype=np.float32)
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until full or max_wait passes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            stopping = None in batch  # close() sentinel
+            batch = [item for item in batch if item is not None]
+            if batch:
+                self._encode_batch(batch)
+            if stopping:
+                return
+
+    def _encode_batch(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.model.encode(texts, convert_to_numpy=True, batch_size=len(texts))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def close(self):
+        """Stop the worker after it drains queued requests."""
+        self._closed = True
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -143,33 +143,56 @@
 # chatbot/engine.py (AI-powered version)
 import os
 import json
-import numpy as np
+import logging
 from dataclasses import dataclass
 from typing import Optional, List, Dict
-from pathlib import Path
 import re
+import threading
+import asyncio
 
+from asgiref.sync import sync_to_async
 from dotenv import load_dotenv
-from groq import Groq
-from sentence_transformers import SentenceTransformer, util
+
+# groq / sentence_transformers (and torch) are imported lazily in the loaders
+# below so importing this module (URLconf, manage.py commands, tests) stays cheap.
+
+from .caches import IntentCache, query_embedding_cache
+from .encoder import ENCODER_BATCHING, BatchingEncoder
+from .llm import get_llm_backend
+from .index_registry import IndexRegistry, SearchFilters, parse_chunk_text  # noqa: F401 (re-exported)
+from .lexical import HYBRID_SEARCH
+from .name_index import is_alias, name_index_registry
+from .query_parser import ParsedQuery, parser_for_index
+from .spelling import spelling_registry
+from .rules import match_rules, normalize_command, route_stats
+from .speculation import SPECULATIVE_SEARCH, SpeculativeSearch, speculation_stats
+from .timing import stage
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ============================================
 # Configuration
 # ============================================
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-EMBEDDINGS_PATH = Path("menu_embeddings.npy")
-CHUNKS_PATH = Path("text_chunks.json")
 MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
 
+# Confidence assigned to a successfully parsed LLM response; only these are cached
+LLM_CONFIDENCE = 0.9
+
 # ============================================
 # Global state (loaded once)
 # ============================================
 _embed_model = None
-_embeddings = None
-_text_chunks = None
-_groq_client = None
+_encoder = None  # BatchingEncoder in front of _embed_model (CHATBOT_ENCODER_BATCHING)
+_load_lock = threading.Lock()
+
+# Per-restaurant embeddings + chunks, loaded on first search
+_index_registry = IndexRegistry()
+
+# Normalized message -> parsed LLM intent
+_intent_cache = IntentCache()
 
 
 # Common restaurant typos / aliases
@@ -242,10 +265,11 @@ def build_search_items_reply(
     return "\n".join(lines)
 
 
-def normalize_search_term(term: str) -> str:
+def normalize_search_term(term: str, restaurant_id: Optional[int] = None) -> str:
     """
     Normalize common user typos / variants for menu search.
-    E.g. 'desert' -> 'dessert' in restaurant context.
+    E.g. 'desert' -> 'dessert', and with a restaurant_id misspelt words are
+    corrected against that restaurant's menu ('panner' -> 'paneer').
     """
     if not term:
         return term
@@ -261,113 +285,310 @@ def normalize_search_term(term: str) -> str:
     # 3) Collapse multiple spaces
     t = re.sub(r"\s+", " ", t).strip()
 
-    # 4) Desert → dessert (handle phrases, not just exact word)
-    #    e.g. "desert", "in desert", "what desert" → "dessert"
-    if "desert" in t and "dessert" not in t:
-        t = "dessert"
+    # 4) Apply explicit typo map word by word ("what desert" → "what dessert")
+    t = " ".join(COMMON_TYPO_MAP.get(w, w) for w in t.split())
 
-    # 5) Apply explicit typo map if we still want it
-    t = COMMON_TYPO_MAP.get(t, t)
+    # 5) Correct remaining typos against the menu vocabulary (SymSpell index)
+    t = spelling_registry.correct(restaurant_id, t)
 
-    print(f"[RAG] normalize_search_term: '{original}' -> '{t}'")
+    logger.debug("normalize_search_term: %r -> %r", original, t)
     return t
 
 
 
-def load_rag_system():
-    """Load embeddings, chunks, and models (called once on startup)."""
-    global _embed_model, _embeddings, _text_chunks, _groq_client
+def menu_item_availability_changed(restaurant_id: Optional[int], item_id: int, available: bool):
+    """Reflect a MenuItem's availability in loaded indexes (called from chatbot.signals)."""
+    _index_registry.set_item_available(restaurant_id, item_id, available)
+
+
+def correct_item_name(name: str, restaurant_id: Optional[int]) -> str:
+    """
+    Item name with misspelt words fixed against the menu; unchanged if nothing
+    to fix. Name-index aliases ("coke", "nan") are left for name_key().
+    """
+    words = normalize_command(name).split()
+    corrected = [word if is_alias(word) else spelling_registry.correct(restaurant_id, word) for word in words]
+    return name if corrected == words else " ".join(corrected)
+
+
+def lookup_item_name(name: str, restaurant_id: Optional[int]):
+    """
+    Exact or alias name-index hit for an ADD/REMOVE item name. The name as
+    given is tried first; spelling correction runs only when that misses, so
+    a real word that isn't on the menu isn't turned into a nearby dish.
+    Returns ((item_id, item name) or None, the name to search with).
+    """
+    exact = name_index_registry.lookup(restaurant_id, name)
+    if exact:
+        return exact, name
+    corrected = correct_item_name(name, restaurant_id)
+    if corrected != name:
+        exact = name_index_registry.lookup(restaurant_id, corrected)
+    return exact, corrected
+
+
+def get_embed_model():
+    """Load the sentence transformer on first use."""
+    global _embed_model
     
     if _embed_model is not None:
-        return  # already loaded
-    
-    print("[RAG] Loading embedding model and data...")
+        return _embed_model
     
-    # Load sentence transformer
-    _embed_model = SentenceTransformer(MODEL_NAME)
-    
-    # Load embeddings
-    if EMBEDDINGS_PATH.exists():
-        _embeddings = np.load(EMBEDDINGS_PATH)
-        print(f"[RAG] Loaded embeddings: {_embeddings.shape}")
-    else:
-        raise FileNotFoundError(f"Embeddings not found at {EMBEDDINGS_PATH}")
+    with _load_lock:
+        if _embed_model is None:
+            logger.info("Loading embedding model %s", MODEL_NAME)
+            from sentence_transformers import SentenceTransformer
+            _embed_model = SentenceTransformer(MODEL_NAME)
+    return _embed_model
+
+
+def get_encoder():
+    """
+    Encoder used for query embeddings: the shared BatchingEncoder when
+    CHATBOT_ENCODER_BATCHING=True, otherwise the model itself.
+    """
+    global _encoder
     
-    # Load text chunks
-    if CHUNKS_PATH.exists():
-        with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
-            _text_chunks = json.load(f)
-        print(f"[RAG] Loaded {len(_text_chunks)} text chunks")
-    else:
-        raise FileNotFoundError(f"Text chunks not found at {CHUNKS_PATH}")
+    if not ENCODER_BATCHING:
+        return get_embed_model()
+    if _encoder is not None:
+        return _encoder
     
-    # Initialize Groq client
-    if GROQ_API_KEY:
-        _groq_client = Groq(api_key=GROQ_API_KEY)
-        print("[RAG] Groq client initialized")
-    else:
-        print("[RAG] Warning: GROQ_API_KEY not set. LLM features disabled.")
+    model = get_embed_model()
+    with _load_lock:
+        if _encoder is None:
+            _encoder = BatchingEncoder(model)
+    return _encoder
 
 
+def get_encoder_stats() -> Dict[str, any]:
+    """Batch counters for the micro-batching encoder (empty when it's disabled)."""
+    return _encoder.stats() if _encoder is not None else {}
 
-def reload_rag_system():
+
+def load_rag_system():
     """
-    Force reload of embeddings and chunks from disk.
-    Use this after regenerating menu_embeddings.npy / text_chunks.json.
+    Load the embedding model and LLM backend.
+    Menu indexes are loaded per restaurant on first search.
     """
-    global _embed_model, _embeddings, _text_chunks
-    _embed_model = None
-    _embeddings = None
-    _text_chunks = None
-    load_rag_system()
-    
-def semantic_search(query: str, top_k: int = 5) -> List[Dict[str, any]]:
+    get_embed_model()
+    get_llm_backend()
+
+
+def warm_rag(restaurant_ids: Optional[List[Optional[int]]] = None) -> Dict[str, any]:
     """
-    Search for menu items using semantic similarity.
-    Returns list of dicts with 'text', 'score', 'parsed' info.
+    Eagerly load everything a chat request needs, so the first request on a
+    worker doesn't pay for it. Called by `manage.py warm_rag` and, when
+    CHATBOT_WARM_RAG_ON_STARTUP is set, by ChatbotConfig.ready().
     """
-    if _embed_model is None:
-        load_rag_system()
-    
-    query_emb = _embed_model.encode(query, convert_to_numpy=True)
-    scores = util.cos_sim(query_emb, _embeddings)[0]
-    
-    # Get top_k results
-    top_indices = scores.argsort(descending=True)[:top_k].tolist()
+    load_rag_system()
+    llm = get_llm_backend()
+    # Run one encode so torch allocates its buffers now rather than mid-request
+    query_embedding_cache.encode(get_encoder(), "menu", MODEL_NAME)
     
-    results = []
-    for idx in top_indices:
-        text = _text_chunks[idx]
-        score = float(scores[idx])
-        
-        # Parse the text chunk: "Category: X. Item: Y. Price: Z"
-        parsed = parse_chunk_text(text)
-        
-        results.append({
-            "text": text,
-            "score": score,
-            "parsed": parsed
-        })
+    loaded = []
+    for restaurant_id in restaurant_ids or []:
+        if _index_registry.get(restaurant_id) is not None:
+            loaded.append(restaurant_id)
+        load_menu_lookups(restaurant_id)
     
-    return results
+    return {
+        "model": MODEL_NAME,
+        "llm": llm.name if llm else None,
+        "indexes": loaded,
+    }
 
 
-def parse_chunk_text(chunk: str) -> Dict[str, str]:
+def load_menu_lookups(restaurant_id: Optional[int]):
     """
-    Parse chunk like 'Category: Breads. Item: Butter Naan. Price: 50'
-    Returns dict with 'category', 'name', 'price'
+    Load the restaurant's name and spelling indexes, which read MenuItem rows
+    on first use. After this, resolving a message needs no database access.
     """
-    parts = {}
-    for segment in chunk.split(". "):
-        if ": " in segment:
-            key, value = segment.split(": ", 1)
-            parts[key.lower()] = value
+    if restaurant_id is not None:
+        name_index_registry.get(restaurant_id)
+        spelling_registry.get(restaurant_id)
+
+
+def reload_rag_system(reload_model: bool = False):
+    """
+    Force reload of embeddings and chunks from disk on next search.
+    Workers already pick up regenerated indexes via their manifest; this is
+    for forcing it immediately. The encoder stays resident unless
+    reload_model=True.
+    """
+    global _embed_model, _encoder
+    _index_registry.clear()
+    name_index_registry.clear()
+    spelling_registry.clear()
+    if reload_model:
+        if _encoder is not None:
+            _encoder.close()
+            _encoder = None
+        _embed_model = None
+        query_embedding_cache.clear()
+        get_embed_model()
+
+
+def get_route_stats() -> Dict[str, any]:
+    """How many messages were resolved by the local rules, the intent cache or the LLM."""
+    return route_stats.snapshot()
+
+
+def get_intent_cache_stats() -> Dict[str, any]:
+    """Hit/miss counters for the LLM intent cache."""
+    return _intent_cache.stats()
+
+
+def get_query_embedding_cache_stats() -> Dict[str, any]:
+    """Hit/miss counters for the shared query-embedding cache."""
+    return query_embedding_cache.stats()
+
+
+def get_index_stats() -> Dict[str, int]:
+    """Size / hit-rate counters for the per-restaurant index LRU."""
+    return _index_registry.stats()
+
+
+def get_name_index_stats() -> Dict[str, int]:
+    """Exact-name lookups answered without a search."""
+    return name_index_registry.stats()
+
+
+def get_spelling_stats() -> Dict[str, int]:
+    """Search terms and item names changed by the menu spelling index."""
+    return spelling_registry.stats()
+
+
+def get_speculation_stats() -> Dict[str, any]:
+    """How often the speculative raw-message search was reused."""
+    return speculation_stats.snapshot()
+
+
+def semantic_search(
+    query: str,
+    top_k: int = 5,
+    restaurant_id: Optional[int] = None,
+    filters: Optional[SearchFilters] = None,
+    parse_constraints: bool = False,
+) -> List[Dict[str, any]]:
+    """
+    Search one restaurant's menu items using semantic similarity.
+    filters (veg/vegan, price range, categories) are applied before top-k.
+    With parse_constraints, price/diet/category phrases in the query
+    ("veg starters under 150") become filters too and only the rest of the
+    query is embedded (see query_parser).
+    Returns list of dicts with 'item_id', 'text', 'score', 'parsed' info;
+    'parsed' holds name/category/price/veg flags from the index columns.
+    """
+    if parse_constraints:
+        parsed = parse_search_constraints(query, restaurant_id)
+        if parsed is not None:
+            query, filters = parsed.embed_text, merge_filters(filters, parsed.filters)
+    return semantic_search_batch([query], top_k=top_k, restaurant_id=restaurant_id, filters=filters)[0]
+
+
+def parse_search_constraints(query: str, restaurant_id: Optional[int] = None) -> Optional[ParsedQuery]:
+    """
+    Split a search into embeddable text and filters using the restaurant's
+    categories; None when it has no price/diet/category phrase.
+    """
+    index = _index_registry.get(restaurant_id)
+    if index is None or not len(index):
+        return None
+    parsed = parser_for_index(index).parse(query)
+    if not parsed.matched:
+        return None
+    logger.debug("Parsed search constraints: %r -> %r %s", query, parsed.embed_text, parsed.filters)
+    return parsed
+
+
+def merge_filters(a: Optional[SearchFilters], b: Optional[SearchFilters]) -> Optional[SearchFilters]:
+    """
+    Filters satisfying both a and b. Category lists are intersected: a pair
+    of labels overlaps when one contains the other, and the narrower one is
+    kept. Contradictory constraints (disjoint categories, vegetarian and
+    non-vegetarian) give a filter that matches nothing.
+    """
+    if not a:
+        return b
+    if not b:
+        return a
+    categories = a.categories or b.categories
+    if a.categories and b.categories:
+        categories = tuple(dict.fromkeys(
+            y if x.lower() in y.lower() else x
+            for x in a.categories
+            for y in b.categories
+            if x.lower() in y.lower() or y.lower() in x.lower()
+        ))
+    vegetarian = a.vegetarian or b.vegetarian
+    vegan = a.vegan or b.vegan
+    non_vegetarian = a.non_vegetarian or b.non_vegetarian
+    return SearchFilters(
+        vegetarian=vegetarian,
+        vegan=vegan,
+        non_vegetarian=non_vegetarian,
+        min_price=max((p for p in (a.min_price, b.min_price) if p is not None), default=None),
+        max_price=min((p for p in (a.max_price, b.max_price) if p is not None), default=None),
+        categories=categories,
+        available_only=a.available_only or b.available_only,
+        match_nothing=(
+            a.match_nothing or b.match_nothing
+            or (bool(a.categories) and bool(b.categories) and not categories)
+            or (non_vegetarian and (vegetarian or vegan))
+        ),
+    )
+
+
+def semantic_search_batch(
+    queries: List[str],
+    top_k: int = 5,
+    restaurant_id: Optional[int] = None,
+    filters: Optional[SearchFilters] = None,
+) -> List[List[Dict[str, any]]]:
+    """
+    semantic_search() for several queries at once: one encode call for the
+    uncached queries and one matrix product against the restaurant's index.
+    With CHATBOT_HYBRID_SEARCH (default on) the dense ranking is fused with
+    the index's BM25 keyword ranking (MenuIndex.hybrid_search).
+    Returns one result list per query.
+    """
+    index = _index_registry.get(restaurant_id)
+    if index is None or not len(index):
+        logger.warning("No embeddings index for restaurant %s", restaurant_id)
+        return [[] for _ in queries]
+    if not queries:
+        return []
     
-    return {
-        "category": parts.get("category", ""),
-        "name": parts.get("item", ""),
-        "price": parts.get("price", "")
-    }
+    # Unavailable items are always excluded; filters add their constraints
+    mask = (filters or SearchFilters()).mask(index.columns)
+    if mask is not None and not mask.any():
+        return [[] for _ in queries]
+    
+    with stage("encode"):
+        query_embs = query_embedding_cache.encode_many(get_encoder(), queries, MODEL_NAME)
+    
+    with stage("search"):
+        if HYBRID_SEARCH:
+            ranked = index.hybrid_search(query_embs, queries, top_k, mask=mask)
+        else:
+            top_indices, top_scores = index.search(query_embs, top_k, mask=mask)
+            ranked = [list(zip(i.tolist(), s.tolist())) for i, s in zip(top_indices, top_scores)]
+        
+        batch_results = []
+        for hits in ranked:
+            results = []
+            for idx, score in hits:
+                parsed = index.columns.row(idx)
+                results.append({
+                    "item_id": parsed["item_id"],
+                    "text": index.text_chunks[idx],
+                    "score": score,
+                    "parsed": parsed
+                })
+            batch_results.append(results)
+    
+    return batch_results
 
 
 @dataclass
@@ -385,17 +606,85 @@ class ChatbotResult:
 
 def classify_intent_with_llm(message: str) -> Dict[str, any]:
     """
-    Use Groq LLM to classify user intent and extract entities.
+    Use the LLM backend (Groq by default, see chatbot/llm.py) to classify user intent and extract entities.
+    Repeated messages are answered from the intent cache.
     Returns dict with: intent, item_name, quantity, confidence
     """
-    if _groq_client is None:
-        load_rag_system()
+    with stage("classify"):
+        cached = _intent_cache.get(message)
+        if cached is not None:
+            route_stats.record("cache")
+            return cached
+
+        route_stats.record("llm")
+        result = _classify_intent_uncached(message)
+        # Don't cache fallbacks from LLM/JSON errors; the next attempt may succeed
+        if result.get("confidence") == LLM_CONFIDENCE:
+            _intent_cache.set(message, result)
+        return result
+
+
+async def aclassify_intent_with_llm(message: str) -> Dict[str, any]:
+    """
+    classify_intent_with_llm() for async views: awaits the LLM backend instead of
+    holding a thread for the whole LLM round trip.
+    """
+    with stage("classify"):
+        cached = await asyncio.to_thread(_intent_cache.get, message)
+        if cached is not None:
+            route_stats.record("cache")
+            return cached
+
+        route_stats.record("llm")
+        result = await _aclassify_intent_uncached(message)
+        if result.get("confidence") == LLM_CONFIDENCE:
+            await asyncio.to_thread(_intent_cache.set, message, result)
+        return result
+
+
+def _classify_intent_uncached(message: str) -> Dict[str, any]:
+    """Build the classification prompt and call the LLM backend."""
+    llm = get_llm_backend()
     
-    if not _groq_client:
+    if not llm:
         # Fallback to rule-based if no LLM
         return {"intent": "HELP", "confidence": 0.5}
     
-    prompt = f"""You are an intelligent restaurant ordering assistant. Your task is to analyze the user's message and extract their intent and any relevant details.
+    try:
+        response_text = llm.complete(
+            [{"role": "user", "content": _classification_prompt(message)}],
+            temperature=0.2,
+            max_tokens=250
+        )
+    except Exception as e:
+        logger.warning("LLM classification error: %s", e)
+        return {"intent": "HELP", "confidence": 0.3}
+    
+    return _parse_classification(response_text)
+
+
+async def _aclassify_intent_uncached(message: str) -> Dict[str, any]:
+    """Async twin of _classify_intent_uncached()."""
+    llm = get_llm_backend()
+    
+    if not llm:
+        return {"intent": "HELP", "confidence": 0.5}
+    
+    try:
+        response_text = await llm.acomplete(
+            [{"role": "user", "content": _classification_prompt(message)}],
+            temperature=0.2,
+            max_tokens=250
+        )
+    except Exception as e:
+        logger.warning("LLM classification error: %s", e)
+        return {"intent": "HELP", "confidence": 0.3}
+    
+    return _parse_classification(response_text)
+
+
+def _classification_prompt(message: str) -> str:
+    return f"""You are an intelligent restaurant ordering assistant. Your task is to analyze the user's message and extract their intent and any relevant details.
 
 AVAILABLE INTENTS:
 1. ADD_ITEM - User wants to add food to their cart (e.g., "I want...", "add...", "get me...", "I'll have...")
@@ -485,16 +774,12 @@ Input: "what can you do?"
 Output: {{"intent": "HELP", "item_name": null, "quantity": 1}}
 
 NOW ANALYZE THE USER MESSAGE AND RESPOND WITH JSON ONLY:"""
-    
+
+
+def _parse_classification(response_text: str) -> Dict[str, any]:
+    """Turn the LLM's reply into the intent dict."""
     try:
-        response = _groq_client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=250
-        )
-        
-        response_text = response.choices[0].message.content.strip()
+        response_text = response_text.strip()
         
         # Clean JSON response - handle markdown code blocks
         if response_text.startswith("```json"):
@@ -517,18 +802,20 @@ NOW ANALYZE THE USER MESSAGE AND RESPOND WITH JSON ONLY:"""
             result["quantity"] = 1
         
         # Set confidence based on intent clarity
-        result["confidence"] = 0.9
+        result["confidence"] = LLM_CONFIDENCE
         
-        print(f"[RAG] LLM parsed intent: {result['intent']}, item: {result.get('item_name')}, qty: {result.get('quantity')}")
+        logger.debug(
+            "LLM parsed intent: %s, item: %s, qty: %s",
+            result["intent"], result.get("item_name"), result.get("quantity"),
+        )
         
         return result
         
     except json.JSONDecodeError as e:
-        print(f"[RAG] JSON parsing error: {e}")
-        print(f"[RAG] Raw response: {response_text}")
+        logger.warning("JSON parsing error: %s; raw response: %r", e, response_text)
         return {"intent": "HELP", "confidence": 0.3}
     except Exception as e:
-        print(f"[RAG] LLM classification error: {e}")
+        logger.warning("LLM classification error: %s", e)
         return {"intent": "HELP", "confidence": 0.3}
 
 
@@ -537,10 +824,44 @@ def generate_conversational_response(user_query: str, retrieved_items: List[Dict
     Generate natural conversational responses using LLM with retrieved menu context.
     Similar to qa_menu.py's ask_llm function.
     """
-    if not _groq_client:
+    llm = get_llm_backend()
+    if not llm:
         # Fallback to simple response if no LLM
         return "I found some items that might interest you."
     
+    try:
+        with stage("respond"):
+            return llm.complete(
+                _conversation_messages(user_query, retrieved_items),
+                temperature=0.6,
+                max_tokens=350
+            )
+        
+    except Exception as e:
+        logger.warning("Conversational response error: %s", e)
+        return _conversation_fallback(retrieved_items)
+
+
+async def agenerate_conversational_response(user_query: str, retrieved_items: List[Dict[str, any]]) -> str:
+    """Async twin of generate_conversational_response()."""
+    llm = get_llm_backend()
+    if not llm:
+        return "I found some items that might interest you."
+    
+    try:
+        with stage("respond"):
+            return await llm.acomplete(
+                _conversation_messages(user_query, retrieved_items),
+                temperature=0.6,
+                max_tokens=350
+            )
+        
+    except Exception as e:
+        logger.warning("Conversational response error: %s", e)
+        return _conversation_fallback(retrieved_items)
+
+
+def _conversation_messages(user_query: str, retrieved_items: List[Dict[str, any]]) -> List[Dict[str, str]]:
     # Build context string from retrieved items
     context_lines = []
     for item in retrieved_items:
@@ -568,35 +889,28 @@ def generate_conversational_response(user_query: str, retrieved_items: List[Dict
         "Provide a natural, friendly response based on the menu information above."
     )
     
-    try:
-        response = _groq_client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.6,
-            max_tokens=350
-        )
-        
-        return response.choices[0].message.content.strip()
-        
-    except Exception as e:
-        print(f"[RAG] Conversational response error: {e}")
-        # Fallback to listing items
-        item_names = [item["parsed"]["name"] for item in retrieved_items if item.get("parsed", {}).get("name")]
-        if item_names:
-            return f"I found these items: {', '.join(item_names)}."
-        return "I found some items that might interest you."
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
 
-def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
+def _conversation_fallback(retrieved_items: List[Dict[str, any]]) -> str:
+    """Plain item list used when the LLM call fails."""
+    item_names = [item["parsed"]["name"] for item in retrieved_items if item.get("parsed", {}).get("name")]
+    if item_names:
+        return f"I found these items: {', '.join(item_names)}."
+    return "I found some items that might interest you."
+
+
+def parse_message(message: str, restaurant_menu_items=None, restaurant_id: Optional[int] = None) -> ChatbotResult:
     """
     Main entry point: parse user message using AI.
     
     Args:
         message: User's input text
         restaurant_menu_items: Optional QuerySet of MenuItem objects for name matching
+        restaurant_id: Restaurant whose menu index is searched
     
     Returns:
         ChatbotResult with intent and extracted info
@@ -604,14 +918,127 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
     text = (message or "").strip()
     
     if not text:
+        return _empty_message_help()
+    
+    # Deterministic commands are resolved locally; everything else goes to the LLM
+    llm_result = _match_rules(text)
+    if llm_result:
+        return _resolve(text, llm_result, restaurant_id)
+    
+    speculation = _start_speculation(text, restaurant_id)
+    try:
+        llm_result = classify_intent_with_llm(text)
+        return _resolve(text, llm_result, restaurant_id, speculation)
+    finally:
+        if speculation:
+            speculation.finish()
+
+
+def _resolve(text, llm_result, restaurant_id, speculation=None) -> ChatbotResult:
+    search = speculation.search if speculation else semantic_search
+    result = resolve_intent(text, llm_result, restaurant_id, search=search)
+    if result is not None:
+        return result
+    
+    search_results = conversational_context(text, restaurant_id, search=search)
+    if search_results:
         return ChatbotResult(
             intent="HELP",
-            reply="Please type something like 'menu', 'add butter naan', or 'show cart'.",
-            confidence=1.0
+            reply=generate_conversational_response(text, search_results),
+            confidence=0.6
         )
+    return _default_help()
+
+
+def _start_speculation(text: str, restaurant_id: Optional[int]) -> Optional[SpeculativeSearch]:
+    """Search the raw message in the background while the LLM runs (CHATBOT_SPECULATIVE_SEARCH)."""
+    if not SPECULATIVE_SEARCH:
+        return None
+    return SpeculativeSearch(semantic_search, text, restaurant_id)
+
+
+async def aparse_message(message: str, restaurant_id: Optional[int] = None) -> ChatbotResult:
+    """
+    parse_message() for async views. The LLM calls are awaited (AsyncGroq);
+    encoding and index search run in worker threads so the event loop keeps
+    serving other requests. The menu lookups that read the database are
+    loaded first, on the thread-sensitive executor like any other ORM call.
+    """
+    text = (message or "").strip()
+    
+    if not text:
+        return _empty_message_help()
+    
+    # ORM reads go through sync_to_async; the worker threads below only search
+    await sync_to_async(load_menu_lookups, thread_sensitive=True)(restaurant_id)
     
-    # Use LLM to classify intent
-    llm_result = classify_intent_with_llm(text)
+    speculation = None
+    llm_result = _match_rules(text)
+    if not llm_result:
+        speculation = _start_speculation(text, restaurant_id)
+    try:
+        if not llm_result:
+            llm_result = await aclassify_intent_with_llm(text)
+        search = speculation.search if speculation else semantic_search
+        
+        result = await asyncio.to_thread(resolve_intent, text, llm_result, restaurant_id, search)
+        if result is not None:
+            return result
+        
+        search_results = await asyncio.to_thread(conversational_context, text, restaurant_id, search)
+        if search_results:
+            return ChatbotResult(
+                intent="HELP",
+                reply=await agenerate_conversational_response(text, search_results),
+                confidence=0.6
+            )
+        return _default_help()
+    finally:
+        if speculation:
+            speculation.finish()
+
+
+def _match_rules(text: str) -> Optional[Dict[str, any]]:
+    with stage("rules"):
+        result = match_rules(text)
+    if result:
+        route_stats.record("rules", result["rule"])
+    return result
+
+
+def _empty_message_help() -> ChatbotResult:
+    return ChatbotResult(
+        intent="HELP",
+        reply="Please type something like 'menu', 'add butter naan', or 'show cart'.",
+        confidence=1.0
+    )
+
+
+def _default_help() -> ChatbotResult:
+    return ChatbotResult(
+        intent="HELP",
+        reply=(
+            "I can help you with:\n"
+            "• 'menu' - see available dishes\n"
+            "• 'add butter naan' or 'add 2 paneer tikka'\n"
+            "• 'cart' - view your order\n"
+            "• 'remove [item]'\n"
+            "• 'clear' or 'confirm'\n\n"
+            "You can also ask me questions about our menu!"
+        ),
+        confidence=0.5
+    )
+
+
+def resolve_intent(
+    text: str, llm_result: Dict[str, any], restaurant_id: Optional[int] = None, search=semantic_search
+) -> Optional[ChatbotResult]:
+    """
+    Turn a classified intent into a ChatbotResult, matching item names against
+    the restaurant's menu index with search (semantic_search, or a speculative
+    search's lookup). Returns None when the message should fall through to the
+    conversational HELP answer.
+    """
     intent = llm_result.get("intent", "HELP")
     item_name_raw = llm_result.get("item_name")
     quantity = llm_result.get("quantity", 1)
@@ -690,13 +1117,25 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
     #     )
 
     if intent == "SEARCH_ITEM" and item_name_raw:
-        print(f"[RAG] Search Item triggered for: {item_name_raw}")
-
-        # ✅ normalize common typos like 'desert' -> 'dessert'
-        normalized_term = normalize_search_term(item_name_raw)
-        print(f"[RAG] Normalized search term: {normalized_term}")
-
-        search_results = semantic_search(normalized_term, top_k=5)
+        logger.debug("Search Item triggered for: %s", item_name_raw)
+
+        # ✅ normalize punctuation and common typos like 'desert' -> 'dessert'
+        search_term = normalize_search_term(item_name_raw)
+
+        # "veg starters under 150": price/diet/category become filters, parsed
+        # once from the words as typed. Menu spelling correction only touches
+        # the remaining text: it would turn "max" into "mix" or "momos" into
+        # the Combos category. A plain term searches without options so a
+        # speculative search can serve it.
+        parsed = parse_search_constraints(search_term, restaurant_id)
+        if parsed is not None:
+            parsed.text = spelling_registry.correct(restaurant_id, parsed.text)
+            normalized_term = parsed.embed_text
+            search_results = search(normalized_term, top_k=5, restaurant_id=restaurant_id, filters=parsed.filters)
+        else:
+            normalized_term = spelling_registry.correct(restaurant_id, search_term)
+            search_results = search(normalized_term, top_k=5, restaurant_id=restaurant_id)
+        logger.debug("Normalized search term: %s", normalized_term)
 
         if not search_results:
             return ChatbotResult(
@@ -706,7 +1145,9 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
             )
 
         best_score = search_results[0]["score"]
-        if best_score < 0.4:
+        # Constraints alone ("veg under 100"): every filtered item is a match
+        constraints_only = parsed is not None and not parsed.text
+        if best_score < 0.4 and not constraints_only:
             return ChatbotResult(
                 intent="SEARCH_ITEM",
                 reply=f"Sorry, we don't have '{item_name_raw}' on our menu. Would you like to see what we do have? Just type 'menu'.",
@@ -769,7 +1210,20 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
     
 
     if intent == "ADD_ITEM" and item_name_raw:
-        search_results = semantic_search(item_name_raw, top_k=3)
+        # Exact name / alias: no encoding or search needed
+        exact, item_name_raw = lookup_item_name(item_name_raw, restaurant_id)
+        if exact:
+            item_id, matched_name = exact
+            return ChatbotResult(
+                intent="ADD_ITEM",
+                reply=f"Adding {quantity} × {matched_name} to your cart...",
+                item_id=item_id,
+                item_name=matched_name,
+                quantity=quantity,
+                confidence=1.0,
+            )
+
+        search_results = search(item_name_raw, top_k=3, restaurant_id=restaurant_id)
 
         if not search_results:
             return ChatbotResult(
@@ -787,6 +1241,7 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
             return ChatbotResult(
                 intent="ADD_ITEM",
                 reply=f"Adding {quantity} × {matched_name} to your cart...",
+                item_id=best_match["item_id"],
                 item_name=matched_name,
                 quantity=quantity,
                 confidence=1.0,
@@ -810,6 +1265,7 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
         return ChatbotResult(
             intent="ADD_ITEM",
             reply=f"Adding {quantity} × {matched_name} to your cart...",
+            item_id=best_match["item_id"],
             item_name=matched_name,
             quantity=quantity,
             confidence=match_score
@@ -819,57 +1275,45 @@ def parse_message(message: str, restaurant_menu_items=None) -> ChatbotResult:
     # Intent: REMOVE_ITEM
     # ============================================
     if intent == "REMOVE_ITEM" and item_name_raw:
+        exact, item_name_raw = lookup_item_name(item_name_raw, restaurant_id)
+        if exact:
+            item_id, matched_name = exact
+            return ChatbotResult(
+                intent="REMOVE_ITEM",
+                reply=f"Removing {quantity} × {matched_name} from cart...",
+                item_id=item_id,
+                item_name=matched_name,
+                quantity=quantity,
+                confidence=1.0
+            )
+
         # Use semantic search for removal too
-        search_results = semantic_search(item_name_raw, top_k=1)
+        search_results = search(item_name_raw, top_k=1, restaurant_id=restaurant_id)
         
         if search_results:
             matched_name = search_results[0]["parsed"]["name"]
             return ChatbotResult(
                 intent="REMOVE_ITEM",
                 reply=f"Removing {quantity} × {matched_name} from cart...",
+                item_id=search_results[0]["item_id"],
                 item_name=matched_name,
                 quantity=quantity,
                 confidence=search_results[0]["score"]
             )
     
-    # ============================================
-    # Default: HELP (with smart conversational handling)
-    # ============================================
-    
-    # If the message seems like a menu question but wasn't classified correctly,
-    # try to give a conversational answer
-    if len(text.split()) > 2:  # More than 2 words suggests a real question
-        search_results = semantic_search(text, top_k=5)
-        if search_results and search_results[0]["score"] >= 0.3:
-            # There's some relevant context, generate conversational response
-            conversational_reply = generate_conversational_response(text, search_results)
-            return ChatbotResult(
-                intent="HELP",
-                reply=conversational_reply,
-                confidence=0.6
-            )
-    
-    # Default help message
-    return ChatbotResult(
-        intent="HELP",
-        reply=(
-            "I can help you with:\n"
-            "• 'menu' - see available dishes\n"
-            "• 'add butter naan' or 'add 2 paneer tikka'\n"
-            "• 'cart' - view your order\n"
-            "• 'remove [item]'\n"
-            "• 'clear' or 'confirm'\n\n"
-            "You can also ask me questions about our menu!"
-        ),
-        confidence=0.5
-    )
+    return None
 
 
-# ============================================
-# Initialize on module import
-# ============================================
-try:
-    load_rag_system()
-except Exception as e:
-    print(f"[RAG] Warning: Could not load RAG system: {e}")
-    print("[RAG] Chatbot will use fallback mode.")
\ No newline at end of file
+def conversational_context(
+    text: str, restaurant_id: Optional[int] = None, search=semantic_search
+) -> List[Dict[str, any]]:
+    """
+    Menu items to ground a conversational answer for an unclassified message,
+    or [] when the plain help text is the better reply.
+    """
+    # More than 2 words suggests a real question about the menu
+    if len(text.split()) > 2:
+        search_results = search(text, top_k=5, restaurant_id=restaurant_id)
+        if search_results and search_results[0]["score"] >= 0.3:
+            return search_results
+    return []
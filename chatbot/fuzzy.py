@@ -0,0 +1,86 @@
+# chatbot/fuzzy.py
+"""
+Fuzzy word matching for item names: Dice similarity of character bigrams.
+
+menu_search scored names with difflib.SequenceMatcher on every (query
+word, name word) pair of every candidate. That is pure-Python work
+quadratic in the word lengths, run a few hundred times per search.
+
+Here each word is reduced to its set of character bigrams, padded with a
+space on both sides so first and last letters count:
+
+    "paneer" -> { p, pa, an, ne, ee, er, r }
+    dice(a, b) = 2 * |bigrams(a) & bigrams(b)| / (|bigrams(a)| + |bigrams(b)|)
+
+Like SequenceMatcher.ratio() this is 1.0 for identical words and 0.0 for
+words with nothing in common. Typos land in the same range:
+paneer/panner 0.86, biryani/biriyani 0.82.
+
+FuzzyMatcher keeps an inverted index from bigram to vocabulary words
+(CSR arrays). Scoring one query word against a whole menu vocabulary is
+one bincount over that word's postings.
+"""
+from typing import Dict, FrozenSet, List, Sequence
+
+import numpy as np
+
+
+def bigrams(word: str) -> FrozenSet[str]:
+    """Character bigrams of word, padded with a space on both sides."""
+    padded = f" {word} "
+    return frozenset(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+def dice(a: str, b: str) -> float:
+    """Bigram Dice similarity of two words, 0-1."""
+    if a == b:
+        return 1.0
+    grams_a, grams_b = bigrams(a), bigrams(b)
+    return 2.0 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def fuzzy_score(query: str, text: str) -> float:
+    """1.0 if query is a substring of text, else the best dice() over their word pairs."""
+    query_lower = query.lower()
+    text_lower = text.lower()
+    if query_lower in text_lower:
+        return 1.0
+    text_words = text_lower.split()
+    return max((dice(q, t) for q in query_lower.split() for t in text_words), default=0.0)
+
+
+class FuzzyMatcher:
+    """Scores a word against every word of a fixed vocabulary at once."""
+
+    def __init__(self, words: Sequence[str]):
+        self.words = list(words)
+        gram_ids: Dict[str, int] = {}
+        pairs: List[tuple] = []
+        sizes = np.empty(len(self.words), dtype=np.float64)
+        for word_id, word in enumerate(self.words):
+            grams = bigrams(word)
+            sizes[word_id] = len(grams)
+            for gram in grams:
+                pairs.append((gram_ids.setdefault(gram, len(gram_ids)), word_id))
+
+        pairs_arr = np.asarray(pairs, dtype=np.int32).reshape(-1, 2)
+        order = np.argsort(pairs_arr[:, 0], kind="stable")
+        self.postings = pairs_arr[order, 1]
+        self.offsets = np.zeros(len(gram_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs_arr[:, 0], minlength=len(gram_ids)), out=self.offsets[1:])
+        self.gram_ids = gram_ids
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.words)
+
+    def scores(self, word: str) -> np.ndarray:
+        """dice(word, w) for every vocabulary word w, as one array."""
+        n = len(self.words)
+        grams = bigrams(word)
+        ids = [self.gram_ids[g] for g in grams if g in self.gram_ids]
+        if not ids or not n:
+            return np.zeros(n)
+        hits = np.concatenate([self.postings[self.offsets[i]:self.offsets[i + 1]] for i in ids])
+        overlap = np.bincount(hits, minlength=n)
+        return 2.0 * overlap / (len(grams) + self.sizes)
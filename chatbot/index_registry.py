@@ -0,0 +1,796 @@
+# chatbot/index_registry.py
+"""
+Per-restaurant embedding index registry.
+
+Every restaurant gets its own artifact directory written by
+`python manage.py generate_embeddings`:
+
+    <EMBEDDINGS_DIR>/<restaurant_id>/menu_embeddings.npy
+    <EMBEDDINGS_DIR>/<restaurant_id>/text_chunks.json
+    <EMBEDDINGS_DIR>/<restaurant_id>/embedding_metadata.json
+    <EMBEDDINGS_DIR>/<restaurant_id>/menu_columns.npz
+    <EMBEDDINGS_DIR>/<restaurant_id>/manifest.json
+
+menu_columns.npz holds per-row item metadata (MenuItem id, name, category,
+price, veg flags, ingredients, availability) as arrays in index order, so
+search results carry the MenuItem id and fields without re-parsing text
+chunks, and SearchFilters (veg/vegan, price range, categories, available)
+become a boolean mask applied to the scores before top-k. Each loaded
+index also builds a BM25 keyword index from those columns (see lexical.py)
+for hybrid search.
+
+Optionally, `quantize_embeddings` adds a reduced-precision copy of the vectors
+(menu_embeddings.f16.npy, or menu_embeddings.i8.npy + per-vector scales).
+Workers open those with mmap_mode='r', so every gunicorn worker on a host
+shares one copy through the page cache instead of holding its own float32 heap copy.
+
+Indexes are loaded lazily the first time a restaurant is searched and kept in
+a size-bounded LRU, so a worker serving hundreds of restaurants only holds the
+hot ones in memory.
+
+Every artifact is written atomically (temp file + os.replace) and manifest.json
+is written last with an incremented version. Workers stat the manifest at most
+every CHATBOT_INDEX_CHECK_INTERVAL seconds and swap in a freshly loaded index
+when it changes. The encoder model is untouched, so no restart is needed.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .lexical import (
+    FULL_COVERAGE,
+    LEXICAL_SCORE_CAP,
+    BM25Index,
+    reciprocal_rank_fusion,
+    tokenize,
+    top_positive,
+)
+
+if TYPE_CHECKING:
+    from .query_parser import QueryParser  # imports SearchFilters from here
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# Configuration
+# ============================================
+EMBEDDINGS_DIR = Path(os.getenv("CHATBOT_EMBEDDINGS_DIR", "embeddings"))
+
+EMBEDDINGS_FILENAME = "menu_embeddings.npy"
+F16_EMBEDDINGS_FILENAME = "menu_embeddings.f16.npy"
+I8_EMBEDDINGS_FILENAME = "menu_embeddings.i8.npy"
+I8_SCALES_FILENAME = "menu_embeddings.i8scales.npy"
+CHUNKS_FILENAME = "text_chunks.json"
+METADATA_FILENAME = "embedding_metadata.json"
+COLUMNS_FILENAME = "menu_columns.npz"
+MANIFEST_FILENAME = "manifest.json"
+
+# Single-index artifacts in the project root (pre per-restaurant layout)
+LEGACY_EMBEDDINGS_PATH = Path(EMBEDDINGS_FILENAME)
+LEGACY_CHUNKS_PATH = Path(CHUNKS_FILENAME)
+LEGACY_METADATA_PATH = Path(METADATA_FILENAME)
+
+INDEX_CACHE_MAX_BYTES = int(os.getenv("CHATBOT_INDEX_CACHE_MAX_MB", "512")) * 1024 * 1024
+INDEX_CACHE_MAX_ENTRIES = int(os.getenv("CHATBOT_INDEX_CACHE_MAX_ENTRIES", "256"))
+
+# Which vector file to serve: "auto" prefers float16, then int8, then float32
+EMBEDDINGS_STORE = os.getenv("CHATBOT_EMBEDDINGS_STORE", "auto")
+STORE_DTYPES = ("float32", "float16", "int8")
+
+# Seconds between manifest checks for an already-loaded index (0 = every search)
+INDEX_CHECK_INTERVAL = float(os.getenv("CHATBOT_INDEX_CHECK_INTERVAL", "5"))
+
+# Rows converted to float32 at a time when scoring a reduced-precision store
+SCORE_CHUNK_ROWS = 16384
+
+
+def index_dir(restaurant_id: int, base_dir: Optional[Path] = None) -> Path:
+    """Directory holding the artifacts for one restaurant."""
+    return Path(base_dir or EMBEDDINGS_DIR) / str(restaurant_id)
+
+
+def atomic_save_npy(path: Path, array: np.ndarray):
+    """np.save via a temp file + os.replace so readers never see a partial file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path: Path, data, **dump_kwargs):
+    """json.dump via a temp file + os.replace."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, **dump_kwargs)
+    os.replace(tmp, path)
+
+
+def read_manifest(directory: Path) -> Dict[str, any]:
+    path = Path(directory) / MANIFEST_FILENAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(directory: Path, **fields) -> int:
+    """
+    Bump the index version for a directory. Call after every other artifact
+    is in place; workers reload when they see the manifest change.
+    Returns the new version.
+    """
+    version = int(read_manifest(directory).get("version", 0)) + 1
+    manifest = {
+        "version": version,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        **fields,
+    }
+    atomic_write_json(Path(directory) / MANIFEST_FILENAME, manifest, indent=2)
+    return version
+
+
+def artifact_fingerprint(directory: Path) -> Optional[int]:
+    """
+    Cheap change marker for an index directory: the manifest's mtime, or the
+    embeddings file's mtime for directories without a manifest (legacy layout).
+    """
+    for name in (MANIFEST_FILENAME, EMBEDDINGS_FILENAME):
+        try:
+            return os.stat(Path(directory) / name).st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """float32 copy of matrix with every row scaled to unit length."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(embeddings: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Unit-normalize and convert embeddings to a reduced-precision store.
+    float16 -> (float16 rows, None)
+    int8    -> (int8 rows, float32 per-row scales); row ≈ int8_row * scale
+    """
+    normalized = normalize_rows(embeddings)
+    if dtype == "float16":
+        return normalized.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(normalized).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(normalized / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Unsupported store dtype: {dtype}")
+
+
+def remove_quantized_stores(directory: Path):
+    """Delete reduced-precision files so a regenerated float32 index isn't shadowed."""
+    for name in (F16_EMBEDDINGS_FILENAME, I8_EMBEDDINGS_FILENAME, I8_SCALES_FILENAME):
+        path = Path(directory) / name
+        if path.exists():
+            path.unlink()
+
+
+def write_quantized_store(directory: Path, dtype: str, embeddings: Optional[np.ndarray] = None) -> Path:
+    """
+    Write the reduced-precision vector file for an index directory.
+    Reads the float32 menu_embeddings.npy unless embeddings are passed in.
+    """
+    directory = Path(directory)
+    if embeddings is None:
+        embeddings = np.load(directory / EMBEDDINGS_FILENAME)
+    quantized, scales = quantize(embeddings, dtype)
+
+    if dtype == "float16":
+        path = directory / F16_EMBEDDINGS_FILENAME
+    else:
+        path = directory / I8_EMBEDDINGS_FILENAME
+        atomic_save_npy(directory / I8_SCALES_FILENAME, scales)
+    atomic_save_npy(path, quantized)
+    return path
+
+
+def recall_at_k(reference: "MenuIndex", candidate: "MenuIndex", queries: np.ndarray, k: int = 5) -> float:
+    """Mean overlap of candidate's top-k with reference's top-k over queries."""
+    expected, _ = reference.search(queries, k)
+    got, _ = candidate.search(queries, k)
+    overlap = [len(set(e) & set(g)) for e, g in zip(expected.tolist(), got.tolist())]
+    return float(np.mean(overlap)) / min(k, len(reference)) if overlap else 1.0
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best top_k columns of each row of a (queries x items) score matrix.
+    Uses argpartition (O(n)) and only sorts the k survivors.
+    Returns (indices, scores), both shaped (queries, k), best first.
+    """
+    n = scores.shape[1]
+    k = min(top_k, n)
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.intp), empty.astype(scores.dtype)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(candidates, order, axis=1),
+        np.take_along_axis(candidate_scores, order, axis=1),
+    )
+
+
+def parse_chunk_text(chunk: str) -> Dict[str, str]:
+    """
+    Parse chunk like 'Category: Breads. Item: Butter Naan. Price: 50'
+    Returns dict with 'category', 'name', 'price'
+    """
+    parts = {}
+    for segment in chunk.split(". "):
+        if ": " in segment:
+            key, value = segment.split(": ", 1)
+            parts[key.lower()] = value
+    
+    return {
+        "category": parts.get("category", ""),
+        "name": parts.get("item", ""),
+        "price": parts.get("price", "")
+    }
+
+
+@dataclass
+class MenuColumns:
+    """Per-item metadata as arrays aligned with the embedding rows."""
+    item_ids: np.ndarray       # int64, -1 when unknown
+    names: np.ndarray          # str
+    categories: np.ndarray     # str
+    prices: np.ndarray         # float64, nan when unknown
+    is_vegetarian: np.ndarray  # bool
+    is_vegan: np.ndarray       # bool
+    ingredients: Optional[np.ndarray] = None  # str, comma-separated
+    available: Optional[np.ndarray] = None    # bool
+    # Derived: lowercased distinct categories and each row's index into them
+    category_labels: np.ndarray = field(init=False, repr=False)
+    category_codes: np.ndarray = field(init=False, repr=False)
+
+    FIELDS = ("item_ids", "names", "categories", "prices", "is_vegetarian", "is_vegan", "ingredients", "available")
+
+    def __post_init__(self):
+        # Older menu_columns.npz files lack the later columns
+        if self.ingredients is None:
+            self.ingredients = np.full(len(self.item_ids), "", dtype=str)
+        if self.available is None:
+            self.available = np.ones(len(self.item_ids), dtype=bool)
+        self.category_labels, codes = np.unique(np.char.lower(self.categories.astype(str)), return_inverse=True)
+        self.category_codes = codes.astype(np.int32).reshape(-1)
+
+    @classmethod
+    def from_items(cls, items: List[Dict[str, any]]) -> "MenuColumns":
+        """Build from dicts with id, name, category, price, is_vegetarian, is_vegan, ingredients."""
+        return cls(
+            item_ids=np.array([i.get("id") or -1 for i in items], dtype=np.int64),
+            names=np.array([i.get("name") or "" for i in items], dtype=str),
+            categories=np.array([i.get("category") or "" for i in items], dtype=str),
+            prices=np.array(
+                [float(i["price"]) if i.get("price") not in (None, "") else np.nan for i in items],
+                dtype=np.float64,
+            ),
+            is_vegetarian=np.array([bool(i.get("is_vegetarian")) for i in items], dtype=bool),
+            is_vegan=np.array([bool(i.get("is_vegan")) for i in items], dtype=bool),
+            ingredients=np.array([", ".join(i.get("ingredients") or []) for i in items], dtype=str),
+            available=np.array([bool(i.get("available", True)) for i in items], dtype=bool),
+        )
+
+    @classmethod
+    def from_chunks(cls, text_chunks: List[str], item_ids: List[int]) -> "MenuColumns":
+        """Fallback for indexes written before menu_columns.npz existed."""
+        items = []
+        for i, chunk in enumerate(text_chunks):
+            parsed = parse_chunk_text(chunk)
+            try:
+                price = float(parsed["price"])
+            except ValueError:
+                price = None
+            items.append({
+                "id": item_ids[i] if i < len(item_ids) else None,
+                "name": parsed["name"],
+                "category": parsed["category"],
+                "price": price,
+            })
+        return cls.from_items(items)
+
+    @classmethod
+    def load(cls, path: Path) -> "MenuColumns":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in cls.FIELDS if name in data.files})
+
+    def save(self, path: Path):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **{name: getattr(self, name) for name in self.FIELDS})
+        os.replace(tmp, path)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.FIELDS)
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def row(self, i: int) -> Dict[str, any]:
+        """Fields for one item, in the shape search results expose as 'parsed'."""
+        price = self.prices[i]
+        item_id = int(self.item_ids[i])
+        return {
+            "item_id": item_id if item_id >= 0 else None,
+            "name": str(self.names[i]),
+            "category": str(self.categories[i]),
+            "price": "" if np.isnan(price) else f"{price:.2f}",
+            "is_vegetarian": bool(self.is_vegetarian[i]),
+            "is_vegan": bool(self.is_vegan[i]),
+        }
+
+
+@dataclass
+class SearchFilters:
+    """
+    Hard constraints on search results. mask() turns them into one boolean
+    array over the index rows, applied before top-k so a filtered search
+    still returns a full page.
+    """
+    vegetarian: bool = False
+    vegan: bool = False
+    non_vegetarian: bool = False
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    categories: Tuple[str, ...] = ()  # case-insensitive substrings of the category
+    available_only: bool = True
+    match_nothing: bool = False  # contradictory constraints (see engine.merge_filters)
+
+    def __bool__(self):
+        return bool(
+            self.vegetarian or self.vegan or self.non_vegetarian or self.categories
+            or self.min_price is not None or self.max_price is not None or self.match_nothing
+        )
+
+    def mask(self, columns: MenuColumns) -> Optional[np.ndarray]:
+        """Rows satisfying every constraint, or None when all rows do."""
+        if self.match_nothing:
+            return np.zeros(len(columns), dtype=bool)
+        mask = columns.available.copy() if self.available_only and not columns.available.all() else None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if self.vegan:
+            narrow(columns.is_vegan)
+        elif self.vegetarian:
+            narrow(columns.is_vegetarian | columns.is_vegan)
+        elif self.non_vegetarian:
+            narrow(~(columns.is_vegetarian | columns.is_vegan))
+        # NaN prices fail both comparisons, so unpriced items drop out of price-bounded searches
+        if self.min_price is not None:
+            narrow(columns.prices >= self.min_price)
+        if self.max_price is not None:
+            narrow(columns.prices <= self.max_price)
+        if self.categories:
+            labels = columns.category_labels.astype(str)
+            wanted = np.zeros(len(labels), dtype=bool)
+            for category in self.categories:
+                wanted |= np.char.find(labels, category.lower()) >= 0
+            narrow(wanted[columns.category_codes])
+        return mask
+
+
+@dataclass
+class MenuIndex:
+    """
+    Embeddings + text chunks for a single restaurant's menu.
+    Embeddings are unit-length rows, so cosine similarity is a matrix product
+    at query time. float32 input is normalized on load; float16/int8 stores
+    are already normalized by quantize() and are typically memory-mapped.
+    """
+    restaurant_id: Optional[int]
+    embeddings: np.ndarray
+    text_chunks: List[str]
+    item_ids: List[int] = field(default_factory=list)
+    columns: Optional[MenuColumns] = None
+    source: Optional[Path] = None
+    nbytes: int = 0
+    scales: Optional[np.ndarray] = None  # per-row scales for int8 stores
+    version: Optional[int] = None  # manifest version the index was loaded from
+    fingerprint: Optional[int] = None  # artifact_fingerprint() at load time
+    checked_at: float = field(default_factory=time.monotonic)
+    lexical: Optional[BM25Index] = None  # built from columns
+    query_parser: Optional["QueryParser"] = field(default=None, repr=False)  # set by parser_for_index()
+
+    def __post_init__(self):
+        if len(self.text_chunks) != len(self.embeddings):
+            raise ValueError(
+                f"Index for restaurant {self.restaurant_id} has "
+                f"{len(self.embeddings)} vectors but {len(self.text_chunks)} chunks"
+            )
+        if self.embeddings.dtype not in (np.float16, np.int8):
+            self.embeddings = normalize_rows(self.embeddings)
+        if self.columns is None:
+            self.columns = MenuColumns.from_chunks(self.text_chunks, self.item_ids)
+        if len(self.columns) != len(self.text_chunks):
+            raise ValueError(
+                f"Index for restaurant {self.restaurant_id} has "
+                f"{len(self.columns)} metadata rows but {len(self.text_chunks)} chunks"
+            )
+        if self.lexical is None:
+            self.lexical = BM25Index.from_columns(self.columns)
+        if not self.nbytes:
+            # Memory-mapped stores live in the shared page cache, not this worker's heap
+            self.nbytes = (
+                (0 if isinstance(self.embeddings, np.memmap) else self.embeddings.nbytes)
+                + self.columns.nbytes
+                + self.lexical.nbytes
+                + sum(sys.getsizeof(c) for c in self.text_chunks)
+            )
+            if self.scales is not None:
+                self.nbytes += self.scales.nbytes
+
+    def __len__(self):
+        return len(self.text_chunks)
+
+    def search(
+        self, query_vectors: np.ndarray, top_k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine top-k for a batch of unit-length query vectors (queries x dim),
+        over the rows where mask (a SearchFilters.mask()) is True.
+        Returns (indices, scores) shaped (queries, k).
+        """
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if query_vectors.ndim == 1:
+            query_vectors = query_vectors.reshape(1, -1)
+        scores = self._masked_scores(query_vectors, mask)
+        if mask is not None:
+            top_k = min(top_k, int(mask.sum()))
+        return top_k_rows(scores, top_k)
+
+    def _masked_scores(self, query_vectors: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+        scores = self.score(query_vectors)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        return scores
+
+    def set_available(self, item_id: int, available: bool) -> bool:
+        """Flag a MenuItem's rows (un)available in place; False if it isn't indexed."""
+        rows = self.columns.item_ids == item_id
+        if not rows.any():
+            return False
+        self.columns.available[rows] = available
+        return True
+
+    def hybrid_search(
+        self, query_vectors: np.ndarray, queries: List[str], top_k: int, mask: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Dense + BM25 search for a batch of queries. The top candidates of each
+        ranking are fused with RRF, which picks the top_k. The reported score
+        stays on the cosine scale the callers' thresholds expect: an item whose
+        name is exactly the query, or the only item whose name contains every
+        query term, gets max(cosine, name coverage * LEXICAL_SCORE_CAP) so it
+        isn't rejected for a weak embedding match. Any other item keeps its
+        cosine score, so a term shared by several names ("paneer") still
+        leaves resolve_intent asking which one was meant.
+        Rows outside mask are excluded from both rankings.
+        Returns one [(row, score)] list per query, best score first.
+        """
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if query_vectors.ndim == 1:
+            query_vectors = query_vectors.reshape(1, -1)
+        dense = self._masked_scores(query_vectors, mask)
+        depth = max(top_k * 4, 20)
+        if mask is not None:
+            depth = min(depth, int(mask.sum()))
+        dense_top, _ = top_k_rows(dense, depth)
+
+        results = []
+        for row_scores, dense_rows, query in zip(dense, dense_top, queries):
+            bm25, coverage = self.lexical.score(query)
+            if mask is not None:
+                bm25[~mask] = 0.0
+                coverage[~mask] = 0.0
+            lexical_rows = top_positive(bm25, depth)
+            if not len(lexical_rows):
+                rows = dense_rows[:top_k].tolist()
+                results.append([(r, float(row_scores[r])) for r in rows])
+                continue
+            fused = reciprocal_rank_fusion([dense_rows.tolist(), lexical_rows.tolist()])[:top_k]
+            query_terms = set(tokenize(query))
+            full_names = np.flatnonzero(coverage >= FULL_COVERAGE)
+            hits = []
+            for r, _ in fused:
+                score = float(row_scores[r])
+                if (len(full_names) == 1 and r == full_names[0]) or set(tokenize(self.columns.names[r])) == query_terms:
+                    score = max(score, float(coverage[r]) * LEXICAL_SCORE_CAP)
+                hits.append((r, score))
+            hits.sort(key=lambda hit: -hit[1])
+            results.append(hits)
+        return results
+
+    def score(self, query_vectors: np.ndarray) -> np.ndarray:
+        """Cosine scores (queries x items) for unit-length float32 query rows."""
+        if self.embeddings.dtype == np.float32:
+            return query_vectors @ self.embeddings.T
+
+        # Reduced-precision store: widen a block at a time so memory stays bounded
+        n = len(self.embeddings)
+        scores = np.empty((len(query_vectors), n), dtype=np.float32)
+        for start in range(0, n, SCORE_CHUNK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SCORE_CHUNK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = query_vectors @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+
+def _load_vectors(directory: Path, embeddings_path: Path):
+    """
+    Open the vector store selected by CHATBOT_EMBEDDINGS_STORE.
+    Reduced-precision files are memory-mapped; float32 is read onto the heap
+    (it gets normalized into a new array anyway).
+    Returns (embeddings, scales).
+    """
+    f16_path = directory / F16_EMBEDDINGS_FILENAME
+    i8_path = directory / I8_EMBEDDINGS_FILENAME
+    i8_scales_path = directory / I8_SCALES_FILENAME
+
+    if EMBEDDINGS_STORE in ("auto", "float16") and f16_path.exists():
+        return np.load(f16_path, mmap_mode="r"), None
+    if EMBEDDINGS_STORE in ("auto", "int8") and i8_path.exists() and i8_scales_path.exists():
+        return np.load(i8_path, mmap_mode="r"), np.load(i8_scales_path)
+    return np.load(embeddings_path), None
+
+
+def _read_index(
+    restaurant_id: Optional[int],
+    embeddings_path: Path,
+    chunks_path: Path,
+    metadata_path: Path,
+) -> MenuIndex:
+    directory = embeddings_path.parent
+    # Fingerprint before reading, so a write racing with this load triggers another reload
+    fingerprint = artifact_fingerprint(directory)
+    version = read_manifest(directory).get("version")
+
+    embeddings, scales = _load_vectors(directory, embeddings_path)
+    with open(chunks_path, "r", encoding="utf-8") as f:
+        text_chunks = json.load(f)
+
+    item_ids: List[int] = []
+    if metadata_path.exists():
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            item_ids = json.load(f).get("item_ids", [])
+
+    columns_path = directory / COLUMNS_FILENAME
+    columns = MenuColumns.load(columns_path) if columns_path.exists() else None
+
+    return MenuIndex(
+        restaurant_id=restaurant_id,
+        embeddings=embeddings,
+        text_chunks=text_chunks,
+        item_ids=item_ids,
+        columns=columns,
+        source=directory,
+        scales=scales,
+        version=version,
+        fingerprint=fingerprint,
+    )
+
+
+def _legacy_index_covers(restaurant_id: Optional[int]) -> bool:
+    """True if the root-level artifacts were built for exactly this restaurant."""
+    if not (LEGACY_EMBEDDINGS_PATH.exists() and LEGACY_CHUNKS_PATH.exists()):
+        return False
+    legacy_restaurant_id = None
+    if LEGACY_METADATA_PATH.exists():
+        with open(LEGACY_METADATA_PATH, "r", encoding="utf-8") as f:
+            legacy_restaurant_id = json.load(f).get("restaurant_id")
+    if legacy_restaurant_id == restaurant_id:
+        return True
+    # Old combined indexes (restaurant_id=None) hold every restaurant's items;
+    # serving one for a single restaurant would leak other menus into its results
+    logger.warning(
+        "Ignoring root-level index built for restaurant %s when loading restaurant %s; "
+        "run generate_embeddings for it",
+        legacy_restaurant_id,
+        restaurant_id,
+    )
+    return False
+
+
+def load_index(restaurant_id: Optional[int]) -> Optional[MenuIndex]:
+    """
+    Load the index for a restaurant from disk.
+    Falls back to the root-level artifacts when they were built for this restaurant.
+    Returns None if no index exists.
+    """
+    if restaurant_id is not None:
+        directory = index_dir(restaurant_id)
+        embeddings_path = directory / EMBEDDINGS_FILENAME
+        chunks_path = directory / CHUNKS_FILENAME
+        if embeddings_path.exists() and chunks_path.exists():
+            return _read_index(
+                restaurant_id, embeddings_path, chunks_path, directory / METADATA_FILENAME
+            )
+
+    if _legacy_index_covers(restaurant_id):
+        return _read_index(
+            restaurant_id, LEGACY_EMBEDDINGS_PATH, LEGACY_CHUNKS_PATH, LEGACY_METADATA_PATH
+        )
+
+    return None
+
+
+class IndexRegistry:
+    """
+    LRU of MenuIndex objects keyed by restaurant_id, bounded by both entry
+    count and total bytes. Thread-safe; loading happens outside the lock so a
+    slow disk read for one restaurant doesn't block searches for others.
+    Loaded indexes are re-validated against their artifacts every
+    check_interval seconds and swapped atomically when they change.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = INDEX_CACHE_MAX_BYTES,
+        max_entries: int = INDEX_CACHE_MAX_ENTRIES,
+        loader: Callable[[Optional[int]], Optional[MenuIndex]] = load_index,
+        check_interval: float = INDEX_CHECK_INTERVAL,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._loader = loader
+        self._indexes: "OrderedDict[Optional[int], MenuIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+
+    def get(self, restaurant_id: Optional[int]) -> Optional[MenuIndex]:
+        now = time.monotonic()
+        with self._lock:
+            index = self._indexes.get(restaurant_id)
+            if index is not None:
+                self._indexes.move_to_end(restaurant_id)
+                self.hits += 1
+                if now - index.checked_at < self.check_interval:
+                    return index
+                # Claim this check so concurrent callers keep using the current index
+                index.checked_at = now
+            else:
+                self.misses += 1
+
+        if index is not None:
+            if not self._is_stale(index):
+                return index
+            return self._reload(restaurant_id, index)
+
+        index = self._loader(restaurant_id)
+        if index is None:
+            return None
+
+        with self._lock:
+            # Another thread may have loaded it meanwhile; keep the first one
+            existing = self._indexes.get(restaurant_id)
+            if existing is not None:
+                self._indexes.move_to_end(restaurant_id)
+                return existing
+            self._indexes[restaurant_id] = index
+            self._total_bytes += index.nbytes
+            self._evict_locked()
+
+        logger.info(
+            "Loaded index for restaurant %s: %d items, %.0f KiB",
+            restaurant_id, len(index), index.nbytes / 1024,
+        )
+        return index
+
+    def _is_stale(self, index: MenuIndex) -> bool:
+        if index.source is None:
+            return False
+        if artifact_fingerprint(index.source) != index.fingerprint:
+            return True
+        # Serving the legacy root index, but a per-restaurant index has since appeared
+        if index.restaurant_id is not None and Path(index.source) != index_dir(index.restaurant_id):
+            return (index_dir(index.restaurant_id) / EMBEDDINGS_FILENAME).exists()
+        return False
+
+    def _reload(self, restaurant_id: Optional[int], current: MenuIndex) -> MenuIndex:
+        """Load fresh vectors + chunks and swap them in; keep serving current on failure."""
+        try:
+            fresh = self._loader(restaurant_id)
+        except Exception as e:
+            logger.warning("Reload of index for restaurant %s failed: %s", restaurant_id, e)
+            return current
+        if fresh is None:
+            return current
+
+        with self._lock:
+            if self._indexes.get(restaurant_id) is current:
+                self._indexes[restaurant_id] = fresh
+                self._total_bytes += fresh.nbytes - current.nbytes
+                self.reloads += 1
+                self._evict_locked()
+
+        logger.info(
+            "Reloaded index for restaurant %s: version %s -> %s, %d items",
+            restaurant_id, current.version, fresh.version, len(fresh),
+        )
+        return fresh
+
+    def _evict_locked(self):
+        # Always keep the most recently inserted index, even if it alone exceeds max_bytes
+        while len(self._indexes) > 1 and (
+            len(self._indexes) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, evicted = self._indexes.popitem(last=False)
+            self._total_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def set_item_available(self, restaurant_id: Optional[int], item_id: int, available: bool):
+        """
+        Update an item's availability in the loaded indexes that hold it (the
+        restaurant's own and a combined legacy one) without reloading.
+        """
+        with self._lock:
+            indexes = [self._indexes.get(restaurant_id), self._indexes.get(None)]
+        for index in indexes:
+            if index is not None:
+                index.set_available(item_id, available)
+
+    def invalidate(self, restaurant_id: Optional[int]):
+        """Drop one restaurant's index so it reloads on next use."""
+        with self._lock:
+            evicted = self._indexes.pop(restaurant_id, None)
+            if evicted is not None:
+                self._total_bytes -= evicted.nbytes
+
+    def clear(self):
+        """Drop every loaded index."""
+        with self._lock:
+            self._indexes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "indexes": len(self._indexes),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+            }
@@ -0,0 +1,167 @@
+# chatbot/lexical.py
+"""
+Keyword (BM25) side of the hybrid menu search.
+
+Sentence embeddings are weak on exact dish names and short tokens ("dal",
+"momos"): cosine scores for them often land under the 0.4/0.6 thresholds in
+resolve_intent and turn into "Did you mean" round trips. BM25Index is an
+in-memory inverted index over each item's name, category and ingredients,
+built next to the vectors in MenuIndex. Its ranking is fused with the dense
+ranking by reciprocal rank fusion (RRF).
+
+Postings are stored CSR-style in flat numpy arrays with the BM25 weight of
+every (term, item) pair precomputed, so scoring a query is one slice-and-add
+per query term. A few thousand items score in well under a millisecond.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+HYBRID_SEARCH = os.getenv("CHATBOT_HYBRID_SEARCH", "True") == "True"
+
+# Reported score for an item whose name is the query, or the only one containing
+# every query term; scaled down by the fraction (idf-weighted) of query terms its
+# name covers
+LEXICAL_SCORE_CAP = float(os.getenv("CHATBOT_LEXICAL_SCORE_CAP", "0.75"))
+# Name coverage at or above this counts as containing every query term
+FULL_COVERAGE = 0.999
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+# Name tokens count this many times towards term frequency and length
+NAME_WEIGHT = 2
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or",
+    "some", "any", "me", "i", "want", "please",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def stem(token: str) -> str:
+    """Fold simple English plurals: 'momos' -> 'momo', 'curries' -> 'curry'."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed word tokens without stopwords."""
+    return [stem(t) for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 over name, category and ingredients of a restaurant's items, with
+    one document per index row. Besides the BM25 score, score() reports how
+    much of the query each item's name covers, which the hybrid search turns
+    into a confidence.
+    """
+
+    def __init__(self, names: Sequence[str], categories: Sequence[str], ingredients: Optional[Sequence[str]] = None):
+        n = len(names)
+        if ingredients is None:
+            ingredients = [""] * n
+        self.size = n
+        self.vocab: Dict[str, int] = {}
+
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[float] = []
+        in_name: List[bool] = []
+        lengths = np.zeros(n, dtype=np.float32)
+
+        for doc, (name, category, ingredient_text) in enumerate(zip(names, categories, ingredients)):
+            counts: Dict[str, float] = {}
+            name_terms = set()
+            for token in tokenize(name):
+                counts[token] = counts.get(token, 0.0) + NAME_WEIGHT
+                name_terms.add(token)
+            for token in tokenize(category) + tokenize(ingredient_text):
+                counts[token] = counts.get(token, 0.0) + 1.0
+            lengths[doc] = sum(counts.values())
+            for token, tf in counts.items():
+                term_ids.append(self.vocab.setdefault(token, len(self.vocab)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+                in_name.append(token in name_terms)
+
+        term_arr = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_arr, kind="stable")
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        self.in_name = np.asarray(in_name, dtype=bool)[order]
+        tf_arr = np.asarray(tfs, dtype=np.float32)[order]
+
+        doc_freq = np.bincount(term_arr, minlength=len(self.vocab)).astype(np.float32)
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=self.offsets[1:])
+        self.idf = np.log1p((n - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        # Terms absent from the menu count as the rarest possible term
+        self.unknown_idf = float(np.log1p((n + 0.5) / 0.5)) if n else 0.0
+
+        avg_length = float(lengths.mean()) if n and lengths.mean() > 0 else 1.0
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[self.doc_ids] / avg_length)
+        self.weights = (
+            np.repeat(self.idf, np.diff(self.offsets)) * tf_arr * (BM25_K1 + 1.0) / (tf_arr + norm)
+        ).astype(np.float32)
+
+    @classmethod
+    def from_columns(cls, columns) -> "BM25Index":
+        return cls(columns.names.tolist(), columns.categories.tolist(), columns.ingredients.tolist())
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.doc_ids, self.in_name, self.offsets, self.idf, self.weights)
+        return sum(a.nbytes for a in arrays) + 100 * len(self.vocab)
+
+    def __len__(self):
+        return self.size
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (bm25, name_coverage) arrays over all items. name_coverage is the
+        idf-weighted fraction of query terms found in the item's name.
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        covered = np.zeros(self.size, dtype=np.float32)
+        total_idf = 0.0
+        for token in set(tokenize(query)):
+            term = self.vocab.get(token)
+            if term is None:
+                total_idf += self.unknown_idf
+                continue
+            total_idf += float(self.idf[term])
+            postings = slice(self.offsets[term], self.offsets[term + 1])
+            docs = self.doc_ids[postings]
+            scores[docs] += self.weights[postings]
+            covered[docs[self.in_name[postings]]] += self.idf[term]
+        if total_idf > 0:
+            covered /= total_idf
+        return scores, covered
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """
+    Fuse several best-first rankings of row indices:
+    score(row) = sum over rankings of 1 / (k + rank). Returns [(row, score)] best first.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda pair: -pair[1])
+
+
+def top_positive(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k strictly positive entries, best first."""
+    hits = np.flatnonzero(scores > 0)
+    if len(hits) > top_k:
+        hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+    return hits[np.argsort(-scores[hits], kind="stable")]
@@ -0,0 +1,328 @@
+# chatbot/llm.py
+"""
+Pluggable LLM backends for the chatbot engine.
+
+classify_intent_with_llm() and generate_conversational_response() talk to
+an LLMBackend instead of a hardcoded Groq client. CHATBOT_LLM_BACKEND picks it:
+
+    groq  (default)  Groq / AsyncGroq chat completions (needs GROQ_API_KEY)
+    fake             FakeLLMBackend: offline, seeded, with configurable
+                     latency, error and timeout rates, for load tests
+
+The fake is tuned with:
+    CHATBOT_LLM_FAKE_LATENCY_MS     median latency (default 300)
+    CHATBOT_LLM_FAKE_LATENCY_SIGMA  log-normal sigma (default 0.4)
+    CHATBOT_LLM_FAKE_ERROR_RATE     fraction of calls raising LLMError (default 0)
+    CHATBOT_LLM_FAKE_MALFORMED_RATE fraction of replies that aren't JSON (default 0)
+    CHATBOT_LLM_FAKE_SEED           RNG seed (default 0)
+CHATBOT_LLM_TIMEOUT (seconds, default 10) applies to every backend.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from .rules import NUMBER_WORDS, match_rules, normalize_command
+
+logger = logging.getLogger(__name__)
+
+
+LLM_BACKEND = os.getenv("CHATBOT_LLM_BACKEND", "groq")
+LLM_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+LLM_TIMEOUT = float(os.getenv("CHATBOT_LLM_TIMEOUT", "10"))
+
+FAKE_LATENCY_MS = float(os.getenv("CHATBOT_LLM_FAKE_LATENCY_MS", "300"))
+FAKE_LATENCY_SIGMA = float(os.getenv("CHATBOT_LLM_FAKE_LATENCY_SIGMA", "0.4"))
+FAKE_ERROR_RATE = float(os.getenv("CHATBOT_LLM_FAKE_ERROR_RATE", "0"))
+FAKE_MALFORMED_RATE = float(os.getenv("CHATBOT_LLM_FAKE_MALFORMED_RATE", "0"))
+FAKE_SEED = int(os.getenv("CHATBOT_LLM_FAKE_SEED", "0"))
+
+Messages = List[Dict[str, str]]
+
+
+class LLMError(Exception):
+    """The backend failed to produce a completion."""
+
+
+class LLMTimeout(LLMError):
+    """The backend didn't answer within the timeout."""
+
+
+class LLMBackend(ABC):
+    """
+    Chat-completion interface used by the engine. complete() and acomplete()
+    return the assistant message text or raise LLMError / LLMTimeout.
+    Subclasses implement complete(); acomplete() defaults to a worker thread.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def complete(self, messages: Messages, temperature: float = 0.2, max_tokens: int = 250,
+                 timeout: Optional[float] = None) -> str:
+        """The assistant reply to messages."""
+
+    async def acomplete(self, messages: Messages, temperature: float = 0.2, max_tokens: int = 250,
+                        timeout: Optional[float] = None) -> str:
+        # Default: run the blocking call in a worker thread
+        return await asyncio.to_thread(self.complete, messages, temperature, max_tokens, timeout)
+
+
+class GroqBackend(LLMBackend):
+    """Groq chat completions; groq is imported on first use."""
+
+    name = "groq"
+
+    def __init__(self, api_key: str, model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+        # Running event loop -> AsyncGroq; its HTTP pool can't be shared across loops
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from groq import Groq
+                    self._client = Groq(api_key=self.api_key)
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        AsyncGroq client for the running event loop. Under uvicorn/daphne that
+        is one client per worker; async views served by the WSGI dev server get
+        a fresh loop, and client, per request.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from groq import AsyncGroq
+            client = AsyncGroq(api_key=self.api_key)
+            self._async_clients[loop] = client
+        return client
+
+    def complete(self, messages, temperature=0.2, max_tokens=250, timeout=None):
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout or self.timeout,
+            )
+        except Exception as e:
+            raise _wrap_error(e) from e
+        return response.choices[0].message.content.strip()
+
+    async def acomplete(self, messages, temperature=0.2, max_tokens=250, timeout=None):
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout or self.timeout,
+            )
+        except Exception as e:
+            raise _wrap_error(e) from e
+        return response.choices[0].message.content.strip()
+
+
+def _wrap_error(e: Exception) -> LLMError:
+    if "Timeout" in type(e).__name__:
+        return LLMTimeout(str(e) or "LLM request timed out")
+    return LLMError(str(e))
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Offline stand-in for Groq. Classification prompts get schema-valid intent
+    JSON from a small keyword parser; other prompts get a short reply built
+    from the menu lines in the prompt. Latency is log-normal, and a seeded RNG
+    decides which calls fail, time out or return malformed JSON, so runs are
+    reproducible.
+    """
+
+    name = "fake"
+
+    _user_message_re = re.compile(r'USER MESSAGE: "(.*)"')
+    _context_line_re = re.compile(r"^- (.+)$", re.MULTILINE)
+    _item_re = re.compile(r"Item: (.+?)(?:\. Price: (\S+))?$")
+    _qty_re = re.compile(r"^(\d+|" + "|".join(NUMBER_WORDS) + r")\s+")
+
+    ADD_PREFIXES = (
+        "add", "i want", "i would like", "id like", "i will have", "ill have",
+        "get me", "give me", "can i get", "can i have", "order",
+    )
+    REMOVE_PREFIXES = ("remove", "delete", "take out", "drop", "cancel")
+    SEARCH_PREFIXES = (
+        "do you have", "what", "which", "show me", "tell me about", "is there",
+        "is", "any", "are there",
+    )
+    FILLER_WORDS = {"some", "the", "a", "an", "please", "to", "order", "me", "your", "you", "have", "do"}
+
+    def __init__(
+        self,
+        latency_ms: float = FAKE_LATENCY_MS,
+        latency_sigma: float = FAKE_LATENCY_SIGMA,
+        error_rate: float = FAKE_ERROR_RATE,
+        malformed_rate: float = FAKE_MALFORMED_RATE,
+        timeout: float = LLM_TIMEOUT,
+        seed: int = FAKE_SEED,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.timeout = timeout
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def _plan(self, timeout: Optional[float]):
+        """Draw (delay seconds, outcome) for one call."""
+        with self._lock:
+            self.calls += 1
+            latency = self._rng.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000.0
+            roll = self._rng.random()
+        limit = timeout or self.timeout
+        if latency > limit:
+            return limit, "timeout"
+        if roll < self.error_rate:
+            return latency, "error"
+        if roll < self.error_rate + self.malformed_rate:
+            return latency, "malformed"
+        return latency, "ok"
+
+    def _finish(self, outcome: str, messages: Messages) -> str:
+        if outcome == "timeout":
+            with self._lock:
+                self.timeouts += 1
+            raise LLMTimeout("fake LLM timed out")
+        if outcome == "error":
+            with self._lock:
+                self.errors += 1
+            raise LLMError("fake LLM error")
+        if outcome == "malformed":
+            return "Sure! Here is what I found:"
+        return self.respond(messages)
+
+    def complete(self, messages, temperature=0.2, max_tokens=250, timeout=None):
+        delay, outcome = self._plan(timeout)
+        time.sleep(delay)
+        return self._finish(outcome, messages)
+
+    async def acomplete(self, messages, temperature=0.2, max_tokens=250, timeout=None):
+        delay, outcome = self._plan(timeout)
+        await asyncio.sleep(delay)
+        return self._finish(outcome, messages)
+
+    def respond(self, messages: Messages) -> str:
+        """The reply a well-behaved LLM would give, without latency or faults."""
+        prompt = messages[-1]["content"]
+        match = self._user_message_re.search(prompt)
+        if match:
+            return json.dumps(self.classify(match.group(1)))
+        items = []
+        for line in self._context_line_re.findall(prompt):
+            m = self._item_re.search(line)
+            if m:
+                items.append(f"{m.group(1)} (₹{m.group(2)})" if m.group(2) else m.group(1))
+        if items:
+            return "We have " + "; ".join(items[:3]) + ". Would you like to add one to your cart?"
+        return "I can help you browse the menu and place an order."
+
+    def classify(self, message: str) -> Dict[str, any]:
+        """Keyword intent parser returning the classification JSON schema."""
+        ruled = match_rules(message)
+        if ruled:
+            return {"intent": ruled["intent"], "item_name": ruled["item_name"], "quantity": ruled["quantity"]}
+
+        text = normalize_command(message)
+        for intent, prefixes in (
+            ("REMOVE_ITEM", self.REMOVE_PREFIXES),
+            ("ADD_ITEM", self.ADD_PREFIXES),
+            ("SEARCH_ITEM", self.SEARCH_PREFIXES),
+        ):
+            for prefix in prefixes:
+                if text == prefix or text.startswith(prefix + " "):
+                    name, quantity = self._item_and_quantity(text[len(prefix):])
+                    if intent == "SEARCH_ITEM":
+                        return {"intent": intent, "item_name": name or "dishes", "quantity": 1}
+                    if name:
+                        return {"intent": intent, "item_name": name, "quantity": quantity}
+
+        if 0 < len(text.split()) <= 3:
+            # Bare dish names ("paneer tikka") are treated as a search
+            return {"intent": "SEARCH_ITEM", "item_name": text, "quantity": 1}
+        return {"intent": "HELP", "item_name": None, "quantity": 1}
+
+    def _item_and_quantity(self, rest: str):
+        rest = rest.strip()
+        quantity = 1
+        m = self._qty_re.match(rest)
+        if m:
+            raw = m.group(1)
+            quantity = int(raw) if raw.isdigit() else NUMBER_WORDS[raw]
+            rest = rest[m.end():]
+        words = [w for w in rest.split() if w not in self.FILLER_WORDS]
+        return " ".join(words) or None, quantity
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "timeouts": self.timeouts}
+
+
+_backend = None
+_backend_initialized = False
+_backend_lock = threading.Lock()
+
+
+def create_llm_backend(kind: str = LLM_BACKEND) -> Optional[LLMBackend]:
+    """Build the backend named by kind; None for groq without GROQ_API_KEY."""
+    if kind == "fake":
+        return FakeLLMBackend()
+    if kind == "groq":
+        api_key = os.getenv("GROQ_API_KEY")
+        return GroqBackend(api_key) if api_key else None
+    raise ValueError(f"Unknown CHATBOT_LLM_BACKEND {kind!r} (expected 'groq' or 'fake')")
+
+
+def get_llm_backend() -> Optional[LLMBackend]:
+    """The process-wide backend (None if LLM features are disabled)."""
+    global _backend, _backend_initialized
+
+    if _backend_initialized:
+        return _backend
+
+    with _backend_lock:
+        if not _backend_initialized:
+            _backend = create_llm_backend()
+            if _backend is None:
+                logger.warning("GROQ_API_KEY not set. LLM features disabled.")
+            else:
+                logger.info("LLM backend: %s", _backend.name)
+            _backend_initialized = True
+    return _backend
+
+
+def set_llm_backend(backend: Optional[LLMBackend]):
+    """Swap the process-wide backend (tests, benchmarks)."""
+    global _backend, _backend_initialized
+    with _backend_lock:
+        _backend = backend
+        _backend_initialized = True
@@ -0,0 +1,67 @@
+# chatbot/management/commands/warm_rag.py
+"""
+Django management command to preload the chatbot's RAG stack.
+
+The engine loads the sentence transformer, Groq client and menu indexes
+lazily on first use. Run this (e.g. from a worker's start script) to pay
+that cost before traffic arrives.
+
+Usage:
+    python manage.py warm_rag
+    python manage.py warm_rag --restaurant-id 1 --restaurant-id 2
+    python manage.py warm_rag --all-restaurants
+"""
+
+import time
+from django.core.management.base import BaseCommand
+
+from chatbot.engine import warm_rag, get_index_stats
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Load the chatbot embedding model, LLM client and menu indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant-id',
+            type=int,
+            action='append',
+            dest='restaurant_ids',
+            default=[],
+            help='Preload the menu index for this restaurant (repeatable)',
+        )
+        parser.add_argument(
+            '--all-restaurants',
+            action='store_true',
+            help='Preload menu indexes for every active restaurant',
+        )
+
+    def handle(self, *args, **options):
+        restaurant_ids = list(options['restaurant_ids'])
+        if options['all_restaurants']:
+            restaurant_ids += list(
+                Restaurant.objects.filter(is_active=True).values_list('id', flat=True)
+            )
+
+        start = time.perf_counter()
+        summary = warm_rag(restaurant_ids)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Model loaded: {summary['model']}"))
+        if summary['llm']:
+            self.stdout.write(self.style.SUCCESS(f"✓ LLM backend ready: {summary['llm']}"))
+        else:
+            self.stdout.write(self.style.WARNING("GROQ_API_KEY not set; LLM features disabled"))
+
+        missing = sorted(set(restaurant_ids) - set(summary['indexes']))
+        if summary['indexes']:
+            self.stdout.write(self.style.SUCCESS(f"✓ Indexes loaded: {summary['indexes']}"))
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"No embeddings for restaurants {missing}; run generate_embeddings"
+            ))
+
+        stats = get_index_stats()
+        self.stdout.write(f"Index cache: {stats['indexes']} indexes, {stats['bytes'] / 1024:.0f} KiB")
+        self.stdout.write(f"Warm-up took {elapsed:.1f}s")
@@ -0,0 +1,218 @@
+# chatbot/name_index.py
+"""
+Exact-name lookup for ADD_ITEM / REMOVE_ITEM.
+
+"add butter naan" used to encode "butter naan", search the whole index,
+compare the best match's name with the request and then look the item up in
+the database again. NameIndex is a per-restaurant dict from a normalized
+name key to MenuItem ids, so an exact name resolves with one dict lookup
+and without encoding or searching anything.
+
+Keys are built by name_key(): lowercase, no punctuation, articles dropped,
+plurals folded ("2 butter naans") and common spelling variants mapped to
+one form ("nan" -> "naan", "biriyani" -> "biryani"); "&" reads as "and".
+Each item is indexed under its full name and, as an alias, the name
+without a trailing "(...)" qualifier ("Dal Makhani (Half)"). A key shared
+by several items is ambiguous and never counts as a hit.
+
+Indexes are built from the database on first use. MenuItem post_save /
+post_delete signals (chatbot/signals.py) update loaded indexes in place.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from .lexical import stem
+from .rules import normalize_command
+
+
+NAME_INDEX_MAX_RESTAURANTS = int(os.getenv("CHATBOT_NAME_INDEX_MAX_RESTAURANTS", "1024"))
+
+# Spelling variant -> canonical word (applied after plural folding)
+WORD_ALIASES = {
+    "nan": "naan",
+    "biriyani": "biryani",
+    "briyani": "biryani",
+    "biriani": "biryani",
+    "panir": "paneer",
+    "paner": "paneer",
+    "tika": "tikka",
+    "chiken": "chicken",
+    "chikan": "chicken",
+    "momoz": "momo",
+    "dhal": "dal",
+    "daal": "dal",
+    "chapathi": "chapati",
+    "coke": "coca cola",
+    "cocacola": "coca cola",
+}
+
+DROP_WORDS = {"a", "an", "the", "some", "of", "please"}
+
+_QUALIFIER_RE = re.compile(r"\s*[\(\[].*?[\)\]]\s*$")
+
+
+def name_key(text: str) -> str:
+    """Normalized lookup key for an item name or a requested name."""
+    words = []
+    for word in normalize_command((text or "").replace("&", " and ")).split():
+        if word in DROP_WORDS:
+            continue
+        word = stem(word)
+        words.append(WORD_ALIASES.get(word, word))
+    return " ".join(words)
+
+
+def is_alias(word: str) -> bool:
+    """True for a spelling variant name_key() maps to a canonical word ("coke", "nans")."""
+    return word in WORD_ALIASES or stem(word) in WORD_ALIASES
+
+
+def name_aliases(name: str) -> Set[str]:
+    """Keys an item is reachable under."""
+    keys = {name_key(name)}
+    unqualified = _QUALIFIER_RE.sub("", name)
+    if unqualified and unqualified != name:
+        keys.add(name_key(unqualified))
+    keys.discard("")
+    return keys
+
+
+class NameIndex:
+    """Name key -> MenuItem ids for one restaurant."""
+
+    def __init__(self, items: Iterable[Tuple[int, str]] = ()):
+        self._ids: Dict[str, Set[int]] = {}
+        self._names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        for item_id, name in items:
+            self._add_locked(item_id, name)
+
+    def _add_locked(self, item_id: int, name: str):
+        self._names[item_id] = name
+        for key in name_aliases(name):
+            self._ids.setdefault(key, set()).add(item_id)
+
+    def _remove_locked(self, item_id: int):
+        name = self._names.pop(item_id, None)
+        if name is None:
+            return
+        for key in name_aliases(name):
+            ids = self._ids.get(key)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._ids[key]
+
+    def upsert(self, item_id: int, name: str):
+        with self._lock:
+            self._remove_locked(item_id)
+            self._add_locked(item_id, name)
+
+    def remove(self, item_id: int):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def lookup(self, text: str) -> Optional[Tuple[int, str]]:
+        """(item_id, item name) when text names exactly one item, else None."""
+        key = name_key(text)
+        with self._lock:
+            ids = self._ids.get(key)
+            if not ids or len(ids) != 1:
+                return None
+            item_id = next(iter(ids))
+            return item_id, self._names[item_id]
+
+    def __len__(self):
+        return len(self._names)
+
+
+def load_name_index(restaurant_id: int) -> NameIndex:
+    """Build a restaurant's NameIndex from its available menu items."""
+    from menu.models import MenuItem
+
+    rows = MenuItem.objects.filter(restaurant_id=restaurant_id, available=True).values_list("id", "name")
+    return NameIndex(rows)
+
+
+class NameIndexRegistry:
+    """LRU of NameIndex objects keyed by restaurant_id; thread-safe."""
+
+    def __init__(self, max_entries: int = NAME_INDEX_MAX_RESTAURANTS, loader=load_name_index):
+        self.max_entries = max_entries
+        self.loader = loader
+        self._entries: "OrderedDict[int, NameIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def get(self, restaurant_id: int) -> NameIndex:
+        with self._lock:
+            index = self._entries.get(restaurant_id)
+            if index is not None:
+                self._entries.move_to_end(restaurant_id)
+                return index
+
+        # Load outside the lock; a concurrent load of the same restaurant is harmless
+        index = self.loader(restaurant_id)
+        with self._lock:
+            self.loads += 1
+            index = self._entries.setdefault(restaurant_id, index)
+            self._entries.move_to_end(restaurant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def lookup(self, restaurant_id: Optional[int], text: str) -> Optional[Tuple[int, str]]:
+        """Exact (item_id, name) match for text in the restaurant's menu, or None."""
+        if restaurant_id is None or not text:
+            return None
+        hit = self.get(restaurant_id).lookup(text)
+        with self._lock:
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return hit
+
+    def _loaded(self, restaurant_id: int) -> Optional[NameIndex]:
+        with self._lock:
+            return self._entries.get(restaurant_id)
+
+    def item_saved(self, restaurant_id: int, item_id: int, name: str, available: bool = True):
+        """Apply a MenuItem save to the restaurant's index, if it is loaded."""
+        index = self._loaded(restaurant_id)
+        if index is None:
+            return
+        if available:
+            index.upsert(item_id, name)
+        else:
+            index.remove(item_id)
+
+    def item_deleted(self, restaurant_id: int, item_id: int):
+        index = self._loaded(restaurant_id)
+        if index is not None:
+            index.remove(item_id)
+
+    def invalidate(self, restaurant_id: int):
+        with self._lock:
+            self._entries.pop(restaurant_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "restaurants": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+            }
+
+
+name_index_registry = NameIndexRegistry()
@@ -0,0 +1,169 @@
+# chatbot/query_parser.py
+"""
+Structured constraints from free-text menu searches.
+
+"veg starters under 150" used to be embedded as-is, so the price and the
+diet only nudged the cosine scores. QueryParser.parse() pulls them out:
+
+    veg starters under 150 -> text "", filters(vegetarian, categories=("Starters",), max_price=150)
+    spicy paneer around 200 -> text "spicy paneer", filters(min_price=160, max_price=240), spice "spicy"
+
+Price bounds, diet and category become SearchFilters (applied as masks
+before top-k, or as a Chroma where clause in menu_search) and are stripped
+from the text that gets embedded. Spice words are reported in
+ParsedQuery.spice but stay in the text: neither store has a spice column,
+so the embedding and the reranker are the only place they count.
+
+Categories are matched against the restaurant's own category labels,
+singular or plural. A label that is also a word of some item name ("rice"
+when the menu has "Jeera Rice" under "Mains") is ambiguous and stays text.
+
+All patterns are compiled once; parsing a query takes a few microseconds.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from .index_registry import SearchFilters
+from .lexical import stem, tokenize
+
+
+_AMOUNT = r"(?:rs\.?\s*|inr\s*|₹\s*)?(\d+(?:\.\d+)?)\s*(?:rs|rupees?|inr|/-)?"
+
+BETWEEN_RE = re.compile(rf"\b(?:between|from)\s+{_AMOUNT}\s*(?:and|to|-)\s*{_AMOUNT}")
+MAX_PRICE_RE = re.compile(
+    rf"\b(?:under|below|less\s+than|cheaper\s+than|within|max(?:imum)?|up\s*to|not\s+more\s+than|at\s+most)\s+{_AMOUNT}"
+)
+MIN_PRICE_RE = re.compile(rf"\b(?:above|over|more\s+than|at\s+least|min(?:imum)?|starting\s+(?:at|from))\s+{_AMOUNT}")
+AROUND_RE = re.compile(rf"\b(?:around|about|approx(?:imately)?|near|roughly)\s+{_AMOUNT}")
+# "around 200" means 200 +/- this fraction
+AROUND_TOLERANCE = 0.2
+
+# Order matters: "non veg" must win over "veg"
+NON_VEG_RE = re.compile(r"\bnon[\s-]?veg(?:etarian)?\b")
+VEGAN_RE = re.compile(r"\bvegan\b")
+VEG_RE = re.compile(r"\b(?:pure\s+)?(?:veg|vegetarian|veggie)\b")
+
+SPICY_RE = re.compile(r"\b(?:extra\s+|very\s+)?(?:spicy|hot|fiery|teekha|tikha)\b")
+MILD_RE = re.compile(r"\b(?:mild|not\s+spicy|less\s+spicy|non[\s-]?spicy)\b")
+
+# Connectors left dangling once a constraint is removed ("paneer dishes with price under 200")
+_CONNECTORS = r"(?:with|and|for|in|at|of|price|priced|costing|items?|dishes?|food|options?|something|anything)"
+DANGLING_RE = re.compile(rf"^(?:{_CONNECTORS}\s+)+|(?:\s+{_CONNECTORS})+$|^{_CONNECTORS}$")
+_SPACE_RE = re.compile(r"\s+")
+
+# Every word the patterns above look for. spelling.COMMON_WORDS includes them,
+# so typo correction never turns "max" into "mix" or "within" into "with".
+QUERY_KEYWORDS = frozenset({
+    "between", "from", "and", "to", "under", "below", "less", "than", "cheaper", "within",
+    "max", "maximum", "up", "upto", "not", "more", "at", "most", "above", "over", "least",
+    "min", "minimum", "starting", "around", "about", "approx", "approximately", "near",
+    "roughly", "rs", "inr", "rupee", "rupees",
+    "non", "nonveg", "veg", "vegetarian", "veggie", "pure", "vegan",
+    "extra", "very", "spicy", "hot", "fiery", "teekha", "tikha", "mild",
+    "with", "for", "in", "of", "price", "priced", "costing", "item", "items", "dish", "dishes",
+    "food", "option", "options", "something", "anything",
+})
+
+
+@dataclass
+class ParsedQuery:
+    raw: str
+    text: str  # what gets embedded
+    filters: SearchFilters = field(default_factory=SearchFilters)
+    spice: Optional[str] = None  # "spicy" / "mild"
+    matched: List[str] = field(default_factory=list)  # stripped constraint phrases
+
+    @property
+    def embed_text(self) -> str:
+        """text, or the stripped phrases when nothing else is left ("veg under 150")."""
+        if self.text:
+            return self.text
+        words = [m for m in self.matched if not any(c.isdigit() for c in m)]
+        return " ".join(words) or self.raw
+
+
+class QueryParser:
+    """Parser bound to one menu's category labels and item-name words."""
+
+    def __init__(self, categories: Iterable[str] = (), name_words: Iterable[str] = ()):
+        name_words = {stem(w) for w in name_words}
+        self.categories: List[Tuple[re.Pattern, str]] = []
+        for label in sorted({c.strip() for c in categories if c and c.strip()}, key=len, reverse=True):
+            words = re.findall(r"[a-z0-9]+", label.lower())
+            if not words or (len(words) == 1 and stem(words[0]) in name_words):
+                continue
+            stems = [re.escape(stem(w)) for w in words]
+            # Each word singular or plural ("starter" / "starters", "curry" / "curries")
+            pattern = r"\b" + r"\s+".join(rf"{s[:-1]}(?:y|ies)" if s.endswith("y") else rf"{s}(?:e?s)?" for s in stems) + r"\b"
+            self.categories.append((re.compile(pattern), label))
+
+    def parse(self, query: str) -> ParsedQuery:
+        text = (query or "").lower()
+        filters = SearchFilters()
+        matched: List[str] = []
+
+        def take(regex: re.Pattern) -> Optional[re.Match]:
+            nonlocal text
+            m = regex.search(text)
+            if m:
+                matched.append(m.group(0).strip())
+                text = text[:m.start()] + " " + text[m.end():]
+            return m
+
+        m = take(BETWEEN_RE)
+        if m:
+            low, high = sorted((float(m.group(1)), float(m.group(2))))
+            filters.min_price, filters.max_price = low, high
+        m = take(MAX_PRICE_RE)
+        if m:
+            filters.max_price = _tighter(filters.max_price, float(m.group(1)), min)
+        m = take(MIN_PRICE_RE)
+        if m:
+            filters.min_price = _tighter(filters.min_price, float(m.group(1)), max)
+        m = take(AROUND_RE)
+        if m:
+            amount = float(m.group(1))
+            filters.min_price = _tighter(filters.min_price, amount * (1 - AROUND_TOLERANCE), max)
+            filters.max_price = _tighter(filters.max_price, amount * (1 + AROUND_TOLERANCE), min)
+
+        # Categories first, longest label first: "veg starters" may be a category
+        categories = []
+        for pattern, label in self.categories:
+            if take(pattern):
+                categories.append(label)
+        filters.categories = tuple(categories)
+
+        if take(NON_VEG_RE):
+            filters.non_vegetarian = True
+        elif take(VEGAN_RE):
+            filters.vegan = True
+        elif take(VEG_RE):
+            filters.vegetarian = True
+
+        # Spice words are reported but left in the text (see module docstring)
+        spice = None
+        if MILD_RE.search(text):
+            spice = "mild"
+        elif SPICY_RE.search(text):
+            spice = "spicy"
+
+        text = _SPACE_RE.sub(" ", text).strip()
+        if matched:
+            text = DANGLING_RE.sub("", text).strip()
+        return ParsedQuery(raw=query, text=text, filters=filters, spice=spice, matched=matched)
+
+
+def _tighter(current: Optional[float], new: float, pick) -> float:
+    return new if current is None else pick(current, new)
+
+
+def parser_for_index(index) -> QueryParser:
+    """The QueryParser for a MenuIndex's categories and item names, built once per index."""
+    parser = index.query_parser
+    if parser is None:
+        columns = index.columns
+        name_words = {token for name in columns.names.tolist() for token in tokenize(name)}
+        parser = QueryParser(set(columns.categories.tolist()), name_words)
+        index.query_parser = parser
+    return parser
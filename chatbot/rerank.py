@@ -0,0 +1,397 @@
+# chatbot/rerank.py
+"""
+Vectorized reranking for menu_search.ImprovedMenuSearchSystem.
+
+The old reranker walked every candidate in Python. For each one it
+json.loads()'d the list fields, looped over about a dozen keyword tables
+and fuzzy-matched every (query word, name word) pair.
+MenuFeatures precomputes everything that depends only on the menu, once,
+when the collection is loaded:
+
+    name tokens       CSR arrays of name-word ids (deduplicated per item),
+                      plus a bigram FuzzyMatcher over the name vocabulary
+    ingredient ids    CSR arrays into the ingredient vocabulary
+    keyword ids       CSR arrays into the search-keyword vocabulary
+    category/cuisine  integer codes into their label vocabularies
+    price, diet flags, spice codes, cooking-style and meal-time hits
+    parsed metadata   the dicts search results return (lists already decoded)
+
+MenuReranker.rerank() then computes each boost as NumPy operations over
+all candidates at once. Substring tests run once per distinct vocabulary
+entry among the candidates, not once per candidate. Which boost keywords
+and which menu ingredients occur in the query comes from a single
+KeywordAutomaton scan (chatbot/automaton.py). The boost factors and
+their order are the same as before, and so are the scores, given the same
+fuzzy_score (chatbot/fuzzy.py).
+"""
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .automaton import KeywordAutomaton, KeywordHits
+from .fuzzy import FuzzyMatcher
+
+LIST_FIELDS = ("ingredients", "search_keywords", "dietary_tags")
+
+PRICE_KEYWORDS = {
+    "cheap": (0, 50),
+    "budget": (0, 60),
+    "affordable": (0, 80),
+    "moderate": (50, 120),
+    "expensive": (120, 500),
+    "premium": (150, 500),
+}
+
+# keyword -> (metadata field, expected value, boost)
+DIETARY_BOOSTS = {
+    "veg": ("is_vegetarian", True, 1.3),
+    "vegetarian": ("is_vegetarian", True, 1.3),
+    "non-veg": ("is_vegetarian", False, 1.3),
+    "non vegetarian": ("is_vegetarian", False, 1.3),
+    "vegan": ("is_vegan", True, 1.4),
+    "egg": ("contains_egg", True, 1.3),
+}
+
+SPICE_KEYWORDS = {
+    "spicy": "hot",
+    "hot": "hot",
+    "mild": "mild",
+    "medium": "medium",
+}
+
+COOKING_STYLES = ("fried", "grilled", "steamed", "baked", "roasted")
+
+MEAL_TIMES = {
+    "breakfast": ["breakfast", "morning", "idli", "dosa", "upma", "poha"],
+    "lunch": ["lunch", "thali", "meal", "rice"],
+    "dinner": ["dinner", "evening", "meal"],
+    "snack": ["snack", "teatime", "evening"],
+}
+
+FUZZY_THRESHOLD = 0.6
+
+# Every fixed keyword the boosts test the query for
+BOOST_KEYWORDS = (
+    list(PRICE_KEYWORDS) + list(DIETARY_BOOSTS) + list(SPICE_KEYWORDS) + list(COOKING_STYLES) + list(MEAL_TIMES)
+)
+_BOOST_KEYWORD_SET = frozenset(BOOST_KEYWORDS)
+
+
+def parse_metadata(metadata: Dict) -> Dict:
+    """Copy of a Chroma metadata dict with the JSON-encoded list fields decoded."""
+    metadata = dict(metadata or {})
+    for name in LIST_FIELDS:
+        if name in metadata and isinstance(metadata[name], str):
+            try:
+                metadata[name] = json.loads(metadata[name])
+            except (TypeError, ValueError):
+                metadata[name] = []
+    return metadata
+
+
+class _Vocabulary:
+    """Distinct strings -> ids, plus per-item id lists stored CSR-style."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets: List[int] = [0]
+        self.values: List[int] = []
+
+    def add_item(self, strings: Sequence[str]):
+        for s in strings:
+            self.values.append(self.ids.setdefault(s, len(self.ids)))
+        self.offsets.append(len(self.values))
+
+    def freeze(self):
+        self.offsets = np.asarray(self.offsets, dtype=np.int64)
+        self.values = np.asarray(self.values, dtype=np.int32)
+        self.label_list = list(self.ids)
+
+    def gather(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(owner position in rows, vocabulary id) for every entry of the given items."""
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        shift = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return owner, self.values[np.arange(total) + shift]
+
+
+class MenuFeatures:
+    """Per-item ranking features for one Chroma collection, aligned by row."""
+
+    def __init__(self, ids: Sequence[str], metadatas: Sequence[Dict]):
+        self.ids = [str(i) for i in ids]
+        self.row_of = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.metadatas = [parse_metadata(m) for m in metadatas]
+        n = len(self.ids)
+
+        self.names = _Vocabulary()
+        self.ingredients = _Vocabulary()
+        self.keywords = _Vocabulary()
+        categories: Dict[str, int] = {}
+        cuisines: Dict[str, int] = {}
+        spices: Dict[str, int] = {}
+        self.category_codes = np.empty(n, dtype=np.int32)
+        self.cuisine_codes = np.empty(n, dtype=np.int32)
+        self.spice_codes = np.empty(n, dtype=np.int32)
+        self.prices = np.empty(n, dtype=np.float64)
+        # field -> expected value -> rows where metadata.get(field) == expected
+        self.flags = {
+            field: {True: np.zeros(n, dtype=bool), False: np.zeros(n, dtype=bool)}
+            for field in ("is_vegetarian", "is_vegan", "contains_egg")
+        }
+        name_lower = []
+        category_lower = []
+
+        for row, metadata in enumerate(self.metadatas):
+            name = metadata.get("name", "").lower()
+            category = metadata.get("category", "").lower()
+            name_lower.append(name)
+            category_lower.append(category)
+            self.names.add_item(list(dict.fromkeys(name.split())))
+            self.ingredients.add_item([str(i).lower() for i in metadata.get("ingredients") or []])
+            self.keywords.add_item([str(k).lower() for k in metadata.get("search_keywords") or []])
+            self.category_codes[row] = categories.setdefault(category, len(categories))
+            self.cuisine_codes[row] = cuisines.setdefault(metadata.get("cuisine_type", "").lower(), len(cuisines))
+            self.spice_codes[row] = spices.setdefault(metadata.get("spice_level", "mild"), len(spices))
+            self.prices[row] = metadata.get("price", 0)
+            for field, by_value in self.flags.items():
+                value = metadata.get(field)
+                for expected, column in by_value.items():
+                    column[row] = value == expected
+
+        for vocabulary in (self.names, self.ingredients, self.keywords):
+            vocabulary.freeze()
+        self.fuzzy = FuzzyMatcher(self.names.label_list)
+        self.category_labels = list(categories)
+        self.cuisine_labels = list(cuisines)
+        self.spice_ids = spices
+        self.name_lower = np.array(name_lower, dtype=str) if n else np.empty(0, dtype=str)
+
+        self.style_hits = {style: np.char.find(self.name_lower, style) >= 0 for style in COOKING_STYLES}
+        category_arr = np.array(category_lower, dtype=str) if n else np.empty(0, dtype=str)
+        self.meal_hits = {}
+        for meal, indicators in MEAL_TIMES.items():
+            hit = np.zeros(n, dtype=bool)
+            for indicator in indicators:
+                hit |= (np.char.find(self.name_lower, indicator) >= 0) | (np.char.find(category_arr, indicator) >= 0)
+            self.meal_hits[meal] = hit
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_for(self, ids: Sequence[str]) -> Optional[np.ndarray]:
+        """Rows of the given ids, or None if any of them is unknown (stale features)."""
+        rows = [self.row_of.get(str(i)) for i in ids]
+        if any(r is None for r in rows):
+            return None
+        return np.asarray(rows, dtype=np.int64)
+
+
+def _labels_matching(labels: Sequence[str], codes: np.ndarray, words: Sequence[str]) -> np.ndarray:
+    """Per code in codes: does any of words occur in that label? Evaluated once per distinct label."""
+    unique, inverse = np.unique(codes, return_inverse=True)
+    hit = np.array([bool(labels[c]) and any(w in labels[c] for w in words) for c in unique.tolist()], dtype=bool)
+    return hit[inverse] if len(unique) else np.zeros(len(codes), dtype=bool)
+
+
+def _counts(vocabulary: _Vocabulary, rows: np.ndarray, predicate) -> np.ndarray:
+    """Per item of rows: how many of its vocabulary entries satisfy predicate(label)."""
+    owner, values = vocabulary.gather(rows)
+    if not len(values):
+        return np.zeros(len(rows), dtype=np.int64)
+    unique, inverse = np.unique(values, return_inverse=True)
+    hit = np.array([predicate(vocabulary.label_list[v]) for v in unique.tolist()], dtype=bool)
+    return np.bincount(owner, weights=hit[inverse], minlength=len(rows)).astype(np.int64)
+
+
+class MenuReranker:
+    """Scores Chroma candidates with the menu_search boost signals, vectorized."""
+
+    def __init__(self, features: MenuFeatures, fuzzy_threshold: float = FUZZY_THRESHOLD, extra_keywords: Sequence[str] = ()):
+        self.features = features
+        self.fuzzy_threshold = fuzzy_threshold
+        # One pass over the query finds every boost keyword and every menu
+        # ingredient it contains; extra_keywords ride along for the caller
+        self.automaton = KeywordAutomaton(BOOST_KEYWORDS + list(extra_keywords) + features.ingredients.label_list)
+        self._word_cache: Dict[str, np.ndarray] = {}
+
+    def _word_scores(self, word: str) -> np.ndarray:
+        scores = self._word_cache.get(word)
+        if scores is None:
+            scores = self.features.fuzzy.scores(word)
+            if len(self._word_cache) >= 1024:
+                self._word_cache.clear()
+            self._word_cache[word] = scores
+        return scores
+
+    def fuzzy_scores(self, query_lower: str, rows: np.ndarray, name_hits: np.ndarray) -> np.ndarray:
+        """
+        chatbot.fuzzy.fuzzy_score for every candidate: 1.0 when the query is
+        a substring of the name, else the best bigram Dice over (query word,
+        name word) pairs. Each query word is scored against the whole name
+        vocabulary once; candidates then take the max over their words.
+        """
+        scores = np.where(name_hits, 1.0, 0.0)
+        query_words = list(dict.fromkeys(query_lower.split()))
+        todo = np.flatnonzero(~name_hits)
+        if not query_words or not len(todo):
+            return scores
+        owner, values = self.features.names.gather(rows[todo])
+        if not len(values):
+            return scores
+        best = np.zeros(len(values))
+        for word in query_words:
+            np.maximum(best, self._word_scores(word)[values], out=best)
+        per_candidate = np.zeros(len(todo))
+        np.maximum.at(per_candidate, owner, best)
+        scores[todo] = per_candidate
+        return scores
+
+    def boosts(self, query: str, rows: np.ndarray, hits: Optional[KeywordHits] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (boost, fuzzy) arrays for the candidate rows. hits is
+        self.automaton's scan of the lowercased query; scanned here when
+        not given.
+        """
+        f = self.features
+        query_lower = query.lower()
+        if hits is None:
+            hits = self.automaton.scan(query_lower)
+        present = hits.among(_BOOST_KEYWORD_SET)
+        query_words = set(query_lower.split())
+        long_words = [w for w in query_words if len(w) > 2]
+        all_words = list(query_words)
+        n = len(rows)
+        boost = np.ones(n)
+
+        names = f.name_lower[rows]
+        # 1-3. Exact name, substring, prefix
+        boost[names == query_lower] *= 2.0
+        contains = np.char.find(names, query_lower) >= 0
+        boost[contains] *= 1.5
+        boost[np.char.startswith(names, query_lower)] *= 1.4
+
+        # 4. Name word overlap
+        known = [f.names.ids[w] for w in query_words if w in f.names.ids]
+        if known:
+            owner, values = f.names.gather(rows)
+            overlap = np.bincount(owner, weights=np.isin(values, known), minlength=n)
+            boost *= 1 + 0.2 * overlap
+
+        # 5. Ingredients: query word inside the ingredient, ingredient inside the query
+        matches = _counts(f.ingredients, rows, lambda ing: any(w in ing for w in long_words))
+        # Every menu ingredient is an automaton keyword, so the scan already names them
+        named = [f.ingredients.ids[ing] for ing in hits.among(f.ingredients.ids.keys()) | {""} if ing in f.ingredients.ids]
+        if named:
+            owner, values = f.ingredients.gather(rows)
+            matches += np.bincount(owner, weights=np.isin(values, named), minlength=n).astype(np.int64)
+        boost *= 1 + 0.15 * np.minimum(matches, 3)
+
+        # 6-7. Category and cuisine relevance
+        boost[_labels_matching(f.category_labels, f.category_codes[rows], all_words)] *= 1.25
+        boost[_labels_matching(f.cuisine_labels, f.cuisine_codes[rows], all_words)] *= 1.2
+
+        # 8. Price preferences: the first listed keyword whose range holds the price
+        prices = f.prices[rows]
+        pending = np.ones(n, dtype=bool)
+        for keyword, (low, high) in PRICE_KEYWORDS.items():
+            if keyword in present:
+                hit = pending & (prices >= low) & (prices <= high)
+                boost[hit] *= 1.4
+                pending &= ~hit
+
+        # 9. Dietary preferences: the first listed keyword whose flag matches
+        pending = np.ones(n, dtype=bool)
+        for keyword, (field, expected, factor) in DIETARY_BOOSTS.items():
+            if keyword in present:
+                hit = pending & f.flags[field][expected][rows]
+                boost[hit] *= factor
+                pending &= ~hit
+
+        # 10. Spice level
+        pending = np.ones(n, dtype=bool)
+        spice = f.spice_codes[rows]
+        for keyword, level in SPICE_KEYWORDS.items():
+            if keyword in present and level in f.spice_ids:
+                hit = pending & (spice == f.spice_ids[level])
+                boost[hit] *= 1.25
+                pending &= ~hit
+
+        # 11. Search keywords
+        keyword_matches = _counts(f.keywords, rows, lambda kw: any(w in kw for w in long_words))
+        boost *= 1 + 0.1 * np.minimum(keyword_matches, 3)
+
+        # 12. Cooking style: once, for any style named in both query and dish
+        pending = np.ones(n, dtype=bool)
+        for style in COOKING_STYLES:
+            if style in present:
+                hit = pending & f.style_hits[style][rows]
+                boost[hit] *= 1.2
+                pending &= ~hit
+
+        # 13. Meal time: the first listed meal keyword the dish fits
+        pending = np.ones(n, dtype=bool)
+        for meal in MEAL_TIMES:
+            if meal in present:
+                hit = pending & f.meal_hits[meal][rows]
+                boost[hit] *= 1.2
+                pending &= ~hit
+
+        # Fuzzy name match bonus
+        fuzzy = self.fuzzy_scores(query_lower, rows, contains)
+        strong = fuzzy > self.fuzzy_threshold
+        boost[strong] *= 1 + fuzzy[strong] * 0.3
+        return boost, fuzzy
+
+    def rerank(
+        self,
+        query: str,
+        ids: Sequence[str],
+        distances: Optional[Sequence[float]],
+        top_k: int,
+        max_price: Optional[float] = None,
+        hits: Optional[KeywordHits] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        Scored results shaped like menu_search's (id, metadata, score,
+        base_similarity, boost_factor, fuzzy_match), best first.
+        None when some id isn't in the features (they need rebuilding).
+        """
+        rows = self.features.rows_for(ids)
+        if rows is None:
+            return None
+        if not len(rows):
+            return []
+
+        keep = np.ones(len(rows), dtype=bool)
+        if max_price:
+            keep &= self.features.prices[rows] <= max_price
+        positions = np.flatnonzero(keep)
+        rows = rows[positions]
+        if distances is not None:
+            d = np.asarray(distances, dtype=np.float64)
+            base = np.ones(len(ids))
+            base[:len(d)] = np.maximum(0.0, 1.0 - d[:len(ids)])
+            base = base[positions]
+        else:
+            base = np.ones(len(rows))
+
+        boost, fuzzy = self.boosts(query, rows, hits)
+        scores = base * boost
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            {
+                "id": self.features.ids[rows[i]],
+                "metadata": dict(self.features.metadatas[rows[i]]),
+                "score": float(scores[i]),
+                "base_similarity": float(base[i]),
+                "boost_factor": float(boost[i]),
+                "fuzzy_match": float(fuzzy[i]),
+            }
+            for i in order.tolist()
+        ]
@@ -0,0 +1,202 @@
+# chatbot/rerank_reference.py
+"""
+Reference data for checking and timing chatbot.rerank.MenuReranker.
+
+legacy_rerank() is menu_search's old per-candidate reranking loop
+(_rerank_results + _calculate_boost + fuzzy_match_score). MenuReranker must
+rank and score like it; RerankerParityTests compare the two and
+benchmarks/bench_rerank.py times them. synthetic_menu() builds a menu with
+Chroma-shaped metadata (list fields as JSON strings), so neither needs a
+model or a database.
+"""
+import json
+import random
+from difflib import SequenceMatcher
+
+
+QUERIES = [
+    "paneer",
+    "spicy chicken biryani",
+    "cheap veg snacks",
+    "grilled fish",
+    "vegan breakfast dosa",
+    "butter naan",
+    "something sweet for dessert",
+    "non-veg starters under 200",
+    "egg fried rice",
+    "mild lunch thali",
+]
+
+DISHES = ["paneer", "chicken", "mutton", "fish", "egg", "veg", "aloo", "dal", "mushroom", "prawn", "gobi", "chana"]
+STYLES = ["butter", "tikka", "masala", "fried", "grilled", "tandoori", "kadai", "steamed", "baked", "roasted", "chilli"]
+BASES = ["curry", "biryani", "rice", "naan", "roll", "dosa", "soup", "noodles", "thali", "kebab", "momo", "sandwich"]
+CATEGORIES = ["Starters", "Main Course", "Breads", "Rice", "Desserts", "Beverages", "Breakfast", "Snacks"]
+CUISINES = ["North Indian", "South Indian", "Chinese", "Continental", ""]
+INGREDIENTS = ["onion", "tomato", "garlic", "ginger", "cream", "butter", "paneer", "chicken", "rice",
+               "flour", "chilli", "coriander", "cumin", "egg", "potato", "cashew", "yogurt", "lentils"]
+KEYWORDS = ["spicy", "creamy", "crispy", "healthy", "popular", "chef special", "tangy", "sweet", "smoky"]
+
+
+def synthetic_menu(items: int, seed: int = 0):
+    rng = random.Random(seed)
+    ids, metadatas = [], []
+    for i in range(items):
+        dish = rng.choice(DISHES)
+        metadata = {
+            "name": f"{rng.choice(STYLES).title()} {dish.title()} {rng.choice(BASES).title()}",
+            "price": float(rng.randrange(30, 450, 5)),
+            "category": rng.choice(CATEGORIES),
+            "is_vegetarian": dish not in ("chicken", "mutton", "fish", "egg", "prawn"),
+            "is_vegan": rng.random() < 0.2,
+            "contains_egg": dish == "egg",
+            "spice_level": rng.choice(["mild", "medium", "hot"]),
+            "ingredients": json.dumps(rng.sample(INGREDIENTS, rng.randint(2, 6))),
+            "search_keywords": json.dumps(rng.sample(KEYWORDS, rng.randint(1, 4))),
+            "dietary_tags": json.dumps([]),
+        }
+        cuisine = rng.choice(CUISINES)
+        if cuisine:
+            metadata["cuisine_type"] = cuisine
+        ids.append(f"item_{i}")
+        metadatas.append(metadata)
+    return ids, metadatas
+
+
+# The pre-change reranker, verbatim apart from self -> module functions
+
+def legacy_fuzzy_match_score(query, text):
+    query_lower = query.lower()
+    text_lower = text.lower()
+    if query_lower in text_lower:
+        return 1.0
+    max_score = 0.0
+    for q_word in query_lower.split():
+        for t_word in text_lower.split():
+            max_score = max(max_score, SequenceMatcher(None, q_word, t_word).ratio())
+    return max_score
+
+
+def legacy_calculate_boost(metadata, query, query_lower, query_words):
+    boost = 1.0
+    name_lower = metadata.get('name', '').lower()
+    if query_lower == name_lower:
+        boost *= 2.0
+    if query_lower in name_lower:
+        boost *= 1.5
+    if name_lower.startswith(query_lower):
+        boost *= 1.4
+    word_overlap = len(query_words & set(name_lower.split()))
+    if word_overlap > 0:
+        boost *= (1 + 0.2 * word_overlap)
+    ingredients = metadata.get('ingredients', [])
+    if ingredients:
+        ingredient_matches = 0
+        for ing in ingredients:
+            ing_lower = ing.lower()
+            if any(word in ing_lower for word in query_words if len(word) > 2):
+                ingredient_matches += 1
+            if ing_lower in query_lower:
+                ingredient_matches += 1
+        if ingredient_matches > 0:
+            boost *= (1 + 0.15 * min(ingredient_matches, 3))
+    category = metadata.get('category', '').lower()
+    if category and any(word in category for word in query_words):
+        boost *= 1.25
+    cuisine = metadata.get('cuisine_type', '').lower()
+    if cuisine and any(word in cuisine for word in query_words):
+        boost *= 1.2
+    price = metadata.get('price', 0)
+    price_keywords = {
+        'cheap': (0, 50), 'budget': (0, 60), 'affordable': (0, 80),
+        'moderate': (50, 120), 'expensive': (120, 500), 'premium': (150, 500)
+    }
+    for keyword, (min_p, max_p) in price_keywords.items():
+        if keyword in query_lower:
+            if min_p <= price <= max_p:
+                boost *= 1.4
+                break
+    dietary_boosts = {
+        'veg': ('is_vegetarian', True, 1.3),
+        'vegetarian': ('is_vegetarian', True, 1.3),
+        'non-veg': ('is_vegetarian', False, 1.3),
+        'non vegetarian': ('is_vegetarian', False, 1.3),
+        'vegan': ('is_vegan', True, 1.4),
+        'egg': ('contains_egg', True, 1.3),
+    }
+    for keyword, (field, expected_value, boost_factor) in dietary_boosts.items():
+        if keyword in query_lower:
+            if metadata.get(field) == expected_value:
+                boost *= boost_factor
+                break
+    spice_level = metadata.get('spice_level', 'mild')
+    spice_keywords = {'spicy': 'hot', 'hot': 'hot', 'mild': 'mild', 'medium': 'medium'}
+    for keyword, expected_level in spice_keywords.items():
+        if keyword in query_lower and spice_level == expected_level:
+            boost *= 1.25
+            break
+    keywords = metadata.get('search_keywords', [])
+    if keywords:
+        keyword_matches = sum(1 for kw in keywords
+                              if any(word in str(kw).lower() for word in query_words if len(word) > 2))
+        if keyword_matches > 0:
+            boost *= (1 + 0.1 * min(keyword_matches, 3))
+    for style in ['fried', 'grilled', 'steamed', 'baked', 'roasted']:
+        if style in query_lower and style in name_lower:
+            boost *= 1.2
+            break
+    meal_times = {
+        'breakfast': ['breakfast', 'morning', 'idli', 'dosa', 'upma', 'poha'],
+        'lunch': ['lunch', 'thali', 'meal', 'rice'],
+        'dinner': ['dinner', 'evening', 'meal'],
+        'snack': ['snack', 'teatime', 'evening']
+    }
+    for meal_keyword, meal_indicators in meal_times.items():
+        if meal_keyword in query_lower:
+            if any(indicator in name_lower or indicator in category for indicator in meal_indicators):
+                boost *= 1.2
+                break
+    return boost
+
+
+def legacy_rerank(query, results, max_price, top_k, fuzzy_threshold=0.6, fuzzy=legacy_fuzzy_match_score):
+    ids_list = results.get('ids', [[]])[0]
+    metas = results.get('metadatas', [[]])[0]
+    distances = results.get('distances', [[]])[0] if 'distances' in results else None
+    if not ids_list:
+        return []
+    query_lower = query.lower()
+    query_words = set(query_lower.split())
+    formatted = []
+    for i, item_id in enumerate(ids_list):
+        metadata = metas[i] if i < len(metas) else {}
+        for field in ['ingredients', 'search_keywords', 'dietary_tags']:
+            if field in metadata and isinstance(metadata[field], str):
+                try:
+                    metadata[field] = json.loads(metadata[field])
+                except Exception:
+                    metadata[field] = []
+        price = metadata.get('price', 0)
+        if max_price and price > max_price:
+            continue
+        base_similarity = 1.0
+        if distances and i < len(distances):
+            base_similarity = max(0, 1.0 - distances[i])
+        boost = legacy_calculate_boost(metadata, query, query_lower, query_words)
+        fuzzy_score = fuzzy(query, metadata.get('name', ''))
+        if fuzzy_score > fuzzy_threshold:
+            boost *= (1 + fuzzy_score * 0.3)
+        formatted.append({
+            'id': item_id, 'metadata': metadata, 'score': base_similarity * boost,
+            'base_similarity': base_similarity, 'boost_factor': boost, 'fuzzy_match': fuzzy_score
+        })
+    formatted.sort(key=lambda x: x['score'], reverse=True)
+    return formatted[:top_k]
+
+
+def chroma_results(ids, metadatas, picks, distances):
+    """Fresh Chroma-shaped query result (Chroma returns new metadata dicts every query)."""
+    return {
+        "ids": [[ids[p] for p in picks]],
+        "metadatas": [[dict(metadatas[p]) for p in picks]],
+        "distances": [distances],
+    }
@@ -0,0 +1,163 @@
+# chatbot/rules.py
+"""
+Rule-based fast path for deterministic chatbot commands.
+
+parse_message() tries these compiled rules before calling the LLM, so plain
+commands like "menu", "cart", "clear", "confirm" and "add 2 butter naan" are
+resolved locally without a Groq round trip. Anything that doesn't match a
+rule falls through to classify_intent_with_llm().
+"""
+import re
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# Whole-message commands (after normalize_command)
+EXACT_COMMANDS = {
+    "SHOW_CART": {
+        "cart", "show cart", "my cart", "view cart", "see cart",
+        "order", "my order", "show order", "show my order", "show my cart",
+        "whats in my cart", "what is in my cart",
+    },
+    "SHOW_MENU": {
+        "menu", "show menu", "see menu", "view menu", "full menu",
+        "the menu", "show me the menu", "show the menu",
+    },
+    "CLEAR_CART": {
+        "clear", "clear cart", "clear my cart", "clear order", "clear my order",
+        "empty cart", "empty my cart", "clear everything", "start over",
+    },
+    "CONFIRM_ORDER": {
+        "confirm", "confirm order", "confirm my order", "place order",
+        "place the order", "place my order", "checkout", "check out",
+    },
+    "HELP": {"help", "hi", "hello", "hey"},
+}
+
+_QTY = r"(?P<qty>\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+# "add 2 butter naan", "add butter naan x 2", "add butter naan"
+ADD_PATTERN = re.compile(rf"^add\s+(?:{_QTY}\s+)?(?P<name>.+?)(?:\s*x\s*(?P<xqty>\d+))?$")
+# "remove 2 butter naan", "remove butter naan", "rm butter naan"
+REMOVE_PATTERN = re.compile(rf"^(?:remove|rm|delete)\s+(?:{_QTY}\s+)?(?P<name>.+?)(?:\s*x\s*(?P<xqty>\d+))?$")
+
+# "add butter naan to my cart", "remove dal fry from the order"
+CART_SUFFIX_PATTERN = re.compile(r"\s+(?:to|from|in|into)\s+(?:(?:my|the)\s+)?(?:cart|order)$")
+
+# Names too vague to resolve without the LLM ("add something spicy"), and
+# whole-cart words: "remove everything" / "delete my order" mean CLEAR_CART
+VAGUE_NAMES = {
+    "something", "anything", "it", "that", "this", "more", "some", "item", "items",
+    "all", "everything", "order", "cart", "my",
+}
+
+# "add 2 naan and 1 dal", "add naan, dal": several items need the LLM
+LIST_SEPARATOR_PATTERN = re.compile(r"[,&]")
+# Quantities that can start another item inside a captured name ("a"/"an" are too common)
+ITEM_QUANTITY_WORDS = {w for w in NUMBER_WORDS if w not in ("a", "an")}
+
+_PUNCT_RE = re.compile(r"[^a-z0-9\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_command(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    t = _PUNCT_RE.sub("", (text or "").lower())
+    return _SPACE_RE.sub(" ", t).strip()
+
+
+def _parse_quantity(match: re.Match) -> int:
+    raw = match.group("xqty") or match.group("qty")
+    if not raw:
+        return 1
+    return int(raw) if raw.isdigit() else NUMBER_WORDS[raw]
+
+
+def _match_item_command(pattern: re.Pattern, intent: str, text: str) -> Optional[Dict[str, any]]:
+    m = pattern.match(CART_SUFFIX_PATTERN.sub("", text))
+    if not m:
+        return None
+    name = m.group("name").strip()
+    if name.startswith("the "):
+        name = name[4:].lstrip()
+    words = name.split()
+    if not words or words[0] in VAGUE_NAMES or name.isdigit():
+        return None
+    if any(w == "and" or w.isdigit() or w in ITEM_QUANTITY_WORDS for w in words):
+        return None
+    quantity = _parse_quantity(m)
+    if quantity < 1:
+        return None
+    return {"intent": intent, "item_name": name, "quantity": quantity}
+
+
+def match_rules(message: str) -> Optional[Dict[str, any]]:
+    """
+    Resolve a message with the local rules.
+    Returns a dict shaped like classify_intent_with_llm()'s result
+    (intent, item_name, quantity, confidence) plus the matching 'rule',
+    or None when the message needs the LLM.
+    """
+    text = normalize_command(message)
+    if not text:
+        return None
+
+    for intent, phrases in EXACT_COMMANDS.items():
+        if text in phrases:
+            return {
+                "intent": intent,
+                "item_name": None,
+                "quantity": 1,
+                "confidence": 1.0,
+                "rule": f"exact:{intent}",
+            }
+
+    if LIST_SEPARATOR_PATTERN.search(message):
+        return None
+
+    for pattern, intent in ((ADD_PATTERN, "ADD_ITEM"), (REMOVE_PATTERN, "REMOVE_ITEM")):
+        result = _match_item_command(pattern, intent, text)
+        if result:
+            result["confidence"] = 1.0
+            result["rule"] = f"pattern:{intent}"
+            return result
+
+    return None
+
+
+class RouteStats:
+    """Thread-safe hit counters for each intent-resolution path."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, path: str, detail: Optional[str] = None):
+        with self._lock:
+            self._counts[path] += 1
+            if detail:
+                self._counts[f"{path}:{detail}"] += 1
+
+    def snapshot(self) -> Dict[str, any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(v for k, v in counts.items() if ":" not in k)
+        llm = counts.get("llm", 0)
+        return {
+            "total": total,
+            "counts": counts,
+            "llm_ratio": (llm / total) if total else 0.0,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+route_stats = RouteStats()
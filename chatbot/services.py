@@ -182,6 +182,7 @@ from restaurants.models import Restaurant
 from menu.models import MenuItem
 from orders.models import Order, OrderItem
 from .engine import ChatbotResult
+from .name_index import name_index_registry
 
 
 def get_or_create_open_order(restaurant: Restaurant, session_id: str) -> Order:
@@ -198,11 +199,34 @@ def get_or_create_open_order(restaurant: Restaurant, session_id: str) -> Order:
     return order
 
 
+def find_menu_item(restaurant: Restaurant, result: ChatbotResult) -> MenuItem:
+    """
+    Resolve the MenuItem for a ChatbotResult.
+    Uses the primary key from semantic search when available and only falls
+    back to name matching for results without an item_id.
+    Raises MenuItem.DoesNotExist if not found.
+    """
+    if result.item_id is not None:
+        menu_item = MenuItem.objects.filter(restaurant=restaurant, id=result.item_id).first()
+        if menu_item is not None:
+            return menu_item
+        # Stale index (item deleted since embeddings were generated): try by name
+
+    return find_menu_item_by_name(restaurant, result.item_name)
+
+
 def find_menu_item_by_name(restaurant: Restaurant, item_name: str) -> MenuItem:
     """
     Find MenuItem by name using fuzzy matching.
     Raises MenuItem.DoesNotExist if not found.
     """
+    # Exact name / alias from the in-memory index: a primary-key fetch
+    exact = name_index_registry.lookup(restaurant.id, item_name)
+    if exact:
+        menu_item = MenuItem.objects.filter(restaurant=restaurant, id=exact[0]).first()
+        if menu_item is not None:
+            return menu_item
+
     # Try exact match first
     try:
         return MenuItem.objects.get(
@@ -312,7 +336,7 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
         
         try:
             # Find the actual MenuItem in the database
-            menu_item = find_menu_item_by_name(restaurant, result.item_name)
+            menu_item = find_menu_item(restaurant, result)
         except MenuItem.DoesNotExist:
             # Suggest alternatives
             similar_items = MenuItem.objects.filter(
@@ -365,8 +389,8 @@ def apply_intent(restaurant: Restaurant, session_id: str, result: ChatbotResult)
             return "Which item would you like to remove?", order
         
         try:
-            # Find menu item by name
-            menu_item = find_menu_item_by_name(restaurant, result.item_name)
+            # Find menu item by id (or name)
+            menu_item = find_menu_item(restaurant, result)
             
             # Find in current cart
             oi = OrderItem.objects.get(
@@ -0,0 +1,58 @@
+# chatbot/signals.py
+"""Keep the chatbot's in-memory menu lookups in sync with MenuItem writes."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from menu.models import MenuItem
+from .name_index import name_index_registry
+from .spelling import spelling_registry
+
+
+@receiver(post_save, sender=MenuItem)
+def _menu_item_saved(sender, instance: MenuItem, **kwargs):
+    restaurant_id, item_id, name, available = instance.restaurant_id, instance.pk, instance.name, instance.available
+
+    def apply():
+        from .engine import menu_item_availability_changed
+
+        name_index_registry.item_saved(restaurant_id, item_id, name, available)
+        spelling_registry.invalidate(restaurant_id)
+        menu_item_availability_changed(restaurant_id, item_id, available)
+
+    # After commit, so a rolled-back import doesn't leave names behind
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=MenuItem)
+def _menu_item_deleted(sender, instance: MenuItem, **kwargs):
+    # Capture now: Django clears instance.pk once the delete finishes
+    restaurant_id, item_id = instance.restaurant_id, instance.pk
+
+    def apply():
+        from .engine import menu_item_availability_changed
+
+        name_index_registry.item_deleted(restaurant_id, item_id)
+        spelling_registry.invalidate(restaurant_id)
+        menu_item_availability_changed(restaurant_id, item_id, False)
+
+    transaction.on_commit(apply)
+
+
+def menu_imported(restaurant_id: int):
+    """
+    Called by the menu importers once a restaurant's menu is replaced.
+    Bulk updates (queryset.update) send no post_save, so the name index is
+    dropped, the spelling vocabulary rebuilt right away and every item's
+    availability copied into the loaded search indexes.
+    """
+    def apply():
+        from .engine import menu_item_availability_changed
+
+        name_index_registry.invalidate(restaurant_id)
+        spelling_registry.rebuild(restaurant_id)
+        rows = MenuItem.objects.filter(restaurant_id=restaurant_id).values_list("id", "available")
+        for item_id, available in rows:
+            menu_item_availability_changed(restaurant_id, item_id, available)
+
+    transaction.on_commit(apply)
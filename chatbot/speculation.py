@@ -0,0 +1,131 @@
+# chatbot/speculation.py
+"""
+Speculative menu search that runs while the LLM classifies intent.
+
+The Groq round trip is the slowest part of parse_message, and the search
+that follows it often uses the raw message (the conversational HELP
+fallback) or an item_name that is nearly the raw message ("paneer tikka").
+When CHATBOT_SPECULATIVE_SEARCH=True, parse_message starts searching the
+raw text on a small thread pool before calling the LLM. A later search
+reuses that result only when its query is the raw text after the search's
+own normalization (case and whitespace), so reused results are exactly
+what a fresh search would return.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .caches import query_embedding_cache
+
+
+SPECULATIVE_SEARCH = os.getenv("CHATBOT_SPECULATIVE_SEARCH", "False") == "True"
+SPECULATIVE_WORKERS = int(os.getenv("CHATBOT_SPECULATIVE_WORKERS", "4"))
+# Speculative searches fetch this many results; later calls slice them
+SPECULATIVE_TOP_K = 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative-search"
+                )
+    return _executor
+
+
+def queries_match(a: str, b: str) -> bool:
+    """True when two search queries normalize to the same search terms."""
+    a, b = query_embedding_cache.normalize(a), query_embedding_cache.normalize(b)
+    return bool(a) and a == b
+
+
+class SpeculationStats:
+    """Counts speculative searches that were reused vs thrown away."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.reused = 0
+        self.wasted = 0
+        self.reuse_hits = 0  # individual searches served from a speculation
+
+    def record_start(self):
+        with self._lock:
+            self.started += 1
+
+    def record_hit(self):
+        with self._lock:
+            self.reuse_hits += 1
+
+    def record_finish(self, reused: bool):
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.wasted += 1
+
+    def snapshot(self) -> Dict[str, any]:
+        with self._lock:
+            finished = self.reused + self.wasted
+            return {
+                "started": self.started,
+                "reused": self.reused,
+                "wasted": self.wasted,
+                "reuse_hits": self.reuse_hits,
+                "reuse_rate": (self.reused / finished) if finished else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.started = self.reused = self.wasted = self.reuse_hits = 0
+
+
+speculation_stats = SpeculationStats()
+
+
+class SpeculativeSearch:
+    """
+    One message's speculative search. Call search() wherever semantic_search
+    would be called, then finish() once the message is resolved.
+    """
+
+    def __init__(self, search_fn: Callable, text: str, restaurant_id: Optional[int] = None):
+        self.search_fn = search_fn
+        self.text = text
+        self.restaurant_id = restaurant_id
+        self.used = False
+        # Run in a copy of the caller's context so its stages land in the request's timing trace
+        context = contextvars.copy_context()
+        self.future = get_executor().submit(context.run, search_fn, text, SPECULATIVE_TOP_K, restaurant_id)
+        speculation_stats.record_start()
+
+    def search(self, query: str, top_k: int = 5, restaurant_id: Optional[int] = None, **options) -> List[Dict[str, any]]:
+        if any(options.values()):
+            # filters / parse_constraints: the speculation ran a plain search
+            return self.search_fn(query, top_k=top_k, restaurant_id=restaurant_id, **options)
+        if (
+            top_k <= SPECULATIVE_TOP_K
+            and restaurant_id == self.restaurant_id
+            and queries_match(query, self.text)
+        ):
+            try:
+                results = self.future.result()
+            except Exception:
+                results = None  # fall back to a normal search below
+            if results is not None:
+                self.used = True
+                speculation_stats.record_hit()
+                return results[:top_k]
+        return self.search_fn(query, top_k=top_k, restaurant_id=restaurant_id)
+
+    def finish(self):
+        if not self.used:
+            self.future.cancel()  # no-op if it already started
+        speculation_stats.record_finish(self.used)
@@ -0,0 +1,235 @@
+# chatbot/spelling.py
+"""
+Typo correction for search terms and item names, SymSpell style.
+
+SpellingIndex precomputes every deletion (up to max_distance characters)
+of each word in a restaurant's menu vocabulary: item names, categories
+and ingredients. A misspelt token is corrected by generating its own
+deletions and looking them up in that dict. Two words within edit distance
+d always share a deletion of at most d characters, so the candidates come
+from a handful of hash lookups instead of a scan of the vocabulary. Only
+those candidates get a real (Damerau-Levenshtein) distance check.
+
+"panner" -> "paneer", "biriyani" -> "biryani", "desert" -> "dessert".
+A token costs a few microseconds.
+
+Words in the vocabulary, everyday English words and short tokens are
+never changed. Tokens of up to 4 letters allow 1 edit and longer ones 2.
+ADD/REMOVE item names are only corrected after the exact name lookup
+misses, and never in name-index alias words ("coke" is not "cake"; see
+engine.lookup_item_name).
+Indexes are built from the database on first use, rebuilt by the menu
+importers (chatbot.signals.menu_imported) and dropped when a MenuItem
+changes.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from .lexical import STOPWORDS
+from .query_parser import QUERY_KEYWORDS
+
+
+SPELLING_CORRECTION = os.getenv("CHATBOT_SPELLING_CORRECTION", "True") == "True"
+SPELLING_MAX_RESTAURANTS = int(os.getenv("CHATBOT_SPELLING_MAX_RESTAURANTS", "1024"))
+
+MAX_EDIT_DISTANCE = 2
+# Only this many leading characters are indexed (SymSpell's prefix trick);
+# keeps the delete dict small for long words at no cost to short ones
+PREFIX_LENGTH = 7
+MIN_WORD_LENGTH = 3
+
+# Menu-domain words every restaurant's vocabulary includes
+DOMAIN_WORDS = {
+    "dessert", "desserts", "starter", "starters", "drink", "drinks", "beverage",
+    "beverages", "veg", "vegetarian", "vegan", "spicy", "sweet", "main", "course",
+    "bread", "breads", "rice", "soup", "soups", "salad", "salads",
+}
+
+# Query words that must stay as typed even when a menu word is one edit away,
+# including QueryParser's price/diet keywords ("max 100" must not become "mix 100")
+COMMON_WORDS = STOPWORDS | QUERY_KEYWORDS | {
+    "add", "remove", "have", "what", "which", "show", "menu", "cart", "order",
+    "something", "anything", "like", "get", "give", "can", "you", "your", "do",
+    "is", "are", "there", "not", "no", "yes", "too", "very", "more", "less",
+    "extra", "without", "only", "under", "below", "above", "than", "cheap",
+    "best", "good", "hot", "cold", "mild", "one", "two", "three", "four", "five",
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """All strings made by removing up to distance characters from word."""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def max_distance_for(token: str) -> int:
+    return 1 if len(token) <= 4 else MAX_EDIT_DISTANCE
+
+
+class SpellingIndex:
+    """Symmetric-delete spelling corrector over one menu vocabulary."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.counts: Dict[str, int] = {}
+        for word in words:
+            if len(word) >= MIN_WORD_LENGTH:
+                self.counts[word] = self.counts.get(word, 0) + 1
+        self._deletes: Dict[str, List[str]] = {}
+        for word in self.counts:
+            for variant in deletes(word[:PREFIX_LENGTH], MAX_EDIT_DISTANCE):
+                self._deletes.setdefault(variant, []).append(word)
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "SpellingIndex":
+        words = []
+        for text in texts:
+            words.extend(_WORD_RE.findall((text or "").lower()))
+        words.extend(DOMAIN_WORDS)
+        return cls(words)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def correct_word(self, token: str) -> str:
+        """Closest vocabulary word to token, or token itself."""
+        if len(token) < MIN_WORD_LENGTH or token in self.counts or token in COMMON_WORDS or not token.isalpha():
+            return token
+        with self._lock:
+            memo = self._memo.get(token)
+        if memo is not None:
+            return memo
+
+        limit = max_distance_for(token)
+        best, best_distance, best_count = token, limit + 1, 0
+        seen = set()
+        for variant in deletes(token[:PREFIX_LENGTH], limit):
+            for word in self._deletes.get(variant, ()):
+                if word in seen:
+                    continue
+                seen.add(word)
+                distance = edit_distance(token, word, limit)
+                if distance > limit:
+                    continue
+                count = self.counts[word]
+                if distance < best_distance or (distance == best_distance and count > best_count):
+                    best, best_distance, best_count = word, distance, count
+
+        with self._lock:
+            self._memo[token] = best
+            if len(self._memo) > 4096:
+                self._memo.popitem(last=False)
+        return best
+
+    def correct(self, text: str) -> str:
+        """Correct every word of an already normalized (lowercase) text."""
+        return " ".join(self.correct_word(token) for token in text.split())
+
+
+def load_spelling_index(restaurant_id: int) -> SpellingIndex:
+    """Vocabulary of a restaurant's available items: names, categories, ingredients."""
+    from menu.models import MenuItem
+
+    texts = []
+    rows = MenuItem.objects.filter(restaurant_id=restaurant_id, available=True).values_list(
+        "name", "category", "ingredients"
+    )
+    for name, category, ingredients in rows:
+        texts.append(name)
+        texts.append(category)
+        if isinstance(ingredients, list):
+            texts.extend(str(i) for i in ingredients)
+    return SpellingIndex.from_texts(texts)
+
+
+class SpellingRegistry:
+    """LRU of SpellingIndex objects keyed by restaurant_id; thread-safe."""
+
+    def __init__(self, max_entries: int = SPELLING_MAX_RESTAURANTS, loader=load_spelling_index):
+        self.max_entries = max_entries
+        self.loader = loader
+        self._entries: "OrderedDict[int, SpellingIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.corrections = 0
+        self.loads = 0
+
+    def _store(self, restaurant_id: int, index: SpellingIndex, replace: bool) -> SpellingIndex:
+        with self._lock:
+            self.loads += 1
+            if replace:
+                self._entries[restaurant_id] = index
+            else:
+                index = self._entries.setdefault(restaurant_id, index)
+            self._entries.move_to_end(restaurant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def get(self, restaurant_id: int) -> SpellingIndex:
+        with self._lock:
+            index = self._entries.get(restaurant_id)
+            if index is not None:
+                self._entries.move_to_end(restaurant_id)
+                return index
+        return self._store(restaurant_id, self.loader(restaurant_id), replace=False)
+
+    def rebuild(self, restaurant_id: int) -> SpellingIndex:
+        """Reload a restaurant's vocabulary now (after a menu import)."""
+        return self._store(restaurant_id, self.loader(restaurant_id), replace=True)
+
+    def correct(self, restaurant_id: Optional[int], text: str) -> str:
+        """text with misspelt words replaced by the restaurant's menu words."""
+        if not SPELLING_CORRECTION or restaurant_id is None or not text:
+            return text
+        corrected = self.get(restaurant_id).correct(text)
+        if corrected != text:
+            with self._lock:
+                self.corrections += 1
+        return corrected
+
+    def invalidate(self, restaurant_id: int):
+        with self._lock:
+            self._entries.pop(restaurant_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"restaurants": len(self._entries), "corrections": self.corrections, "loads": self.loads}
+
+
+spelling_registry = SpellingRegistry()
@@ -11,10 +11,10 @@ import os
 import sys
 from pathlib import Path
 
-# Add parent directory to path if running standalone
-sys.path.insert(0, str(Path(__file__).parent))
+# Add project root to path if running standalone
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from engine import parse_message, load_rag_system
+from chatbot.engine import parse_message, load_rag_system
 
 
 def print_result(query: str, result):
@@ -0,0 +1,1383 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from menu.models import MenuItem
+from orders.models import Order
+from restaurants.models import Restaurant
+
+from . import engine, index_registry, rerank_reference
+from .automaton import KeywordAutomaton
+from .caches import IntentCache, QueryEmbeddingCache, query_embedding_cache
+from .encoder import BatchingEncoder
+from .fuzzy import FuzzyMatcher, bigrams, dice, fuzzy_score
+from .index_registry import IndexRegistry, MenuColumns, MenuIndex, SearchFilters
+from .lexical import BM25Index, reciprocal_rank_fusion, tokenize, top_positive
+from .llm import FakeLLMBackend, LLMBackend, LLMError, LLMTimeout
+from .name_index import NameIndex, NameIndexRegistry, name_index_registry, name_key
+from .query_parser import QueryParser, parser_for_index
+from .rerank import MenuFeatures, MenuReranker
+from .rules import match_rules
+from .signals import menu_imported
+from .spelling import SpellingIndex, edit_distance, max_distance_for, spelling_registry
+from .speculation import SpeculativeSearch, queries_match
+from .timing import stage, trace
+from .vector_store import NumpyVectorStore, VectorStore, make_vector_store
+from .views import AsyncChatbotView, ChatbotMetricsView
+
+
+MENU = [
+    {"id": 1, "name": "Paneer Butter Masala", "category": "Main Course", "price": 260, "is_vegetarian": True},
+    {"id": 2, "name": "Paneer Tikka", "category": "Starters", "price": 240, "is_vegetarian": True},
+    {"id": 3, "name": "Kadai Paneer", "category": "Main Course", "price": 250, "is_vegetarian": True},
+    {"id": 4, "name": "Dal Fry", "category": "Main Course", "price": 180, "is_vegetarian": True, "is_vegan": True},
+    {"id": 5, "name": "Butter Naan", "category": "Breads", "price": 50, "is_vegetarian": True},
+    {"id": 6, "name": "Chicken Biryani", "category": "Rice", "price": 300},
+    {"id": 7, "name": "Gulab Jamun", "category": "Desserts", "price": 90, "is_vegetarian": True},
+]
+DIM = 16
+
+
+def build_index(menu=MENU) -> MenuIndex:
+    """MenuIndex whose item i has the basis vector e_i as its embedding."""
+    columns = MenuColumns.from_items(menu)
+    chunks = [f"Category: {i['category']}. Item: {i['name']}. Price: {i['price']}" for i in menu]
+    return MenuIndex(
+        restaurant_id=1,
+        embeddings=np.eye(len(menu), DIM, dtype=np.float32),
+        text_chunks=chunks,
+        item_ids=[i["id"] for i in menu],
+        columns=columns,
+    )
+
+
+def query_vector(similarities) -> np.ndarray:
+    """Unit vector with the given cosine to item rows {row: cosine}; the rest goes to an unused axis."""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for row, cosine in similarities.items():
+        vector[row] = cosine
+    vector[-1] = np.sqrt(max(0.0, 1.0 - float(vector @ vector)))
+    return vector
+
+
+class FakeEncoder:
+    """Stands in for the sentence transformer: fixed vectors per query text."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, texts, convert_to_numpy=True):
+        return np.vstack([self.vectors[t] for t in texts])
+
+
+class MenuSearchTestCase(SimpleTestCase):
+    """Runs engine searches against build_index() with FakeEncoder query vectors."""
+
+    vectors = {}
+
+    def setUp(self):
+        self.index = build_index()
+        query_embedding_cache.clear()
+        self.addCleanup(query_embedding_cache.clear)
+        for patcher in (
+            mock.patch.object(engine._index_registry, "get", return_value=self.index),
+            mock.patch.object(engine, "get_encoder", return_value=FakeEncoder(self.vectors)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def resolve(self, intent, item_name):
+        return engine.resolve_intent(item_name, {"intent": intent, "item_name": item_name})
+
+
+class HybridSearchTests(MenuSearchTestCase):
+    vectors = {
+        # Every paneer dish is a middling embedding match
+        "paneer": query_vector({0: 0.5, 1: 0.5, 2: 0.5}),
+        "tikka": query_vector({1: 0.3}),
+        "dal fry": query_vector({3: 0.35}),
+        "naan": query_vector({4: 0.2, 6: 0.55}),
+    }
+
+    def test_shared_name_term_keeps_cosine_score(self):
+        hits = self.index.hybrid_search(self.vectors["paneer"], ["paneer"], top_k=3)[0]
+        self.assertEqual(sorted(row for row, _ in hits), [0, 1, 2])
+        for _, score in hits:
+            self.assertAlmostEqual(score, 0.5, places=5)
+
+    def test_ambiguous_one_word_add_asks_for_clarification(self):
+        result = self.resolve("ADD_ITEM", "paneer")
+        self.assertEqual(result.intent, "HELP")
+        self.assertIn("Did you mean", result.reply)
+        for name in ("Paneer Butter Masala", "Paneer Tikka", "Kadai Paneer"):
+            self.assertIn(name, result.reply)
+
+    def test_unique_name_term_is_lifted(self):
+        result = self.resolve("ADD_ITEM", "tikka")
+        self.assertEqual(result.intent, "ADD_ITEM")
+        self.assertEqual(result.item_id, 2)
+
+    def test_exact_name_is_lifted(self):
+        hits = self.index.hybrid_search(self.vectors["dal fry"], ["dal fry"], top_k=3)[0]
+        self.assertEqual(hits[0][0], 3)
+        self.assertGreaterEqual(hits[0][1], 0.6)
+
+    def test_hits_sorted_by_reported_score(self):
+        for query, vector in self.vectors.items():
+            scores = [score for _, score in self.index.hybrid_search(vector, [query], top_k=5)[0]]
+            self.assertEqual(scores, sorted(scores, reverse=True), query)
+
+    def test_mask_excludes_rows_from_both_rankings(self):
+        mask = np.ones(len(self.index), dtype=bool)
+        mask[[0, 2]] = False
+        hits = self.index.hybrid_search(self.vectors["paneer"], ["paneer"], top_k=3, mask=mask)[0]
+        self.assertNotIn(0, [row for row, _ in hits])
+        self.assertNotIn(2, [row for row, _ in hits])
+        # Paneer Tikka is now the only paneer dish left
+        self.assertEqual(hits[0], (1, 0.75))
+
+
+class RuleFastPathTests(SimpleTestCase):
+    def test_exact_commands(self):
+        for message, intent in (
+            ("Menu", "SHOW_MENU"),
+            ("show my cart!", "SHOW_CART"),
+            ("  clear   cart ", "CLEAR_CART"),
+            ("Place order.", "CONFIRM_ORDER"),
+            ("hi", "HELP"),
+        ):
+            result = match_rules(message)
+            self.assertEqual(result["intent"], intent, message)
+            self.assertEqual(result["rule"], f"exact:{intent}")
+
+    def test_item_commands_with_quantities(self):
+        for message, intent, name, quantity in (
+            ("add butter naan", "ADD_ITEM", "butter naan", 1),
+            ("Add 2 Butter Naan", "ADD_ITEM", "butter naan", 2),
+            ("add two paneer tikka", "ADD_ITEM", "paneer tikka", 2),
+            ("add dal fry x 3", "ADD_ITEM", "dal fry", 3),
+            ("rm gulab jamun", "REMOVE_ITEM", "gulab jamun", 1),
+            ("remove 1 chicken biryani", "REMOVE_ITEM", "chicken biryani", 1),
+            ("add butter naan to my cart", "ADD_ITEM", "butter naan", 1),
+            ("add 2 dal fry to cart", "ADD_ITEM", "dal fry", 2),
+            ("remove gulab jamun from my cart", "REMOVE_ITEM", "gulab jamun", 1),
+            ("delete the paneer tikka from the order", "REMOVE_ITEM", "paneer tikka", 1),
+        ):
+            result = match_rules(message)
+            self.assertEqual(
+                (result["intent"], result["item_name"], result["quantity"]), (intent, name, quantity), message
+            )
+
+    def test_vague_or_free_text_falls_through(self):
+        for message in ("add something spicy", "add 0 naan", "add 5", "what's good here?", "", "!!!"):
+            self.assertIsNone(match_rules(message), message)
+
+    def test_whole_cart_removals_go_to_the_llm(self):
+        # Otherwise the item name would be "everything" and remove a random dish
+        for message in ("remove everything", "remove all", "delete all", "delete my order", "remove all items",
+                        "remove everything from my cart", "delete the cart", "add to my cart"):
+            self.assertIsNone(match_rules(message), message)
+
+    def test_multi_item_messages_go_to_the_llm(self):
+        # Otherwise "add 2 naan and 1 dal" adds 2 of an item named "naan and 1 dal"
+        for message in ("add 2 naan and 1 dal", "add naan and dal", "add naan, dal", "add 2 naan & 1 dal",
+                        "add naan 2 dal", "remove naan and two dal", "add one naan one dal"):
+            self.assertIsNone(match_rules(message), message)
+
+    def test_parse_message_skips_llm_for_rules(self):
+        with mock.patch.object(engine, "classify_intent_with_llm", side_effect=AssertionError("LLM called")):
+            self.assertEqual(engine.parse_message("cart").intent, "SHOW_CART")
+            self.assertEqual(engine.parse_message("clear").intent, "CLEAR_CART")
+
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "chatbot-tests"}}
+
+
+class IntentCacheTests(SimpleTestCase):
+    def test_hit_on_normalized_message(self):
+        cache = IntentCache(cache_alias="")
+        cache.set("Add 2 Butter Naan!", {"intent": "ADD_ITEM", "item_name": "butter naan", "quantity": 2})
+        self.assertEqual(cache.get("add 2 butter   naan")["quantity"], 2)
+        self.assertIsNone(cache.get("add 3 butter naan"))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_returns_copies(self):
+        cache = IntentCache(cache_alias="")
+        value = {"intent": "SEARCH_ITEM", "item_name": "dal"}
+        cache.set("dal", value)
+        value["item_name"] = "changed"
+        cache.get("dal")["item_name"] = "changed again"
+        self.assertEqual(cache.get("dal")["item_name"], "dal")
+
+    def test_entries_expire_after_ttl(self):
+        cache = IntentCache(ttl=60, cache_alias="")
+        with mock.patch("chatbot.caches.time.monotonic", return_value=1000.0):
+            cache.set("menu please", {"intent": "SHOW_MENU"})
+        with mock.patch("chatbot.caches.time.monotonic", return_value=1059.0):
+            self.assertIsNotNone(cache.get("menu please"))
+        with mock.patch("chatbot.caches.time.monotonic", return_value=1061.0):
+            self.assertIsNone(cache.get("menu please"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = IntentCache(max_entries=2, cache_alias="")
+        cache.set("a1", {"intent": "HELP"})
+        cache.set("b2", {"intent": "HELP"})
+        cache.get("a1")
+        cache.set("c3", {"intent": "HELP"})
+        self.assertIsNotNone(cache.get("a1"))
+        self.assertIsNone(cache.get("b2"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_shared_tier_serves_other_workers(self):
+        writer, reader = IntentCache(cache_alias="default"), IntentCache(cache_alias="default")
+        writer.set("any offers today", {"intent": "HELP"})
+        self.assertEqual(reader.get("any offers today"), {"intent": "HELP"})
+        self.assertEqual(reader.stats()["shared_hits"], 1)
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.calls.append(texts)
+        single = isinstance(texts, str)
+        vectors = np.array([[len(t), 1.0, 0.0] for t in ([texts] if single else texts)], dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+class QueryEmbeddingCacheTests(SimpleTestCase):
+    def test_vectors_are_unit_length_and_read_only(self):
+        cache = QueryEmbeddingCache()
+        vector = cache.encode(CountingEncoder(), "Dal Fry", "model")
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=6)
+        with self.assertRaises(ValueError):
+            vector[0] = 0.0
+
+    def test_encode_reuses_normalized_text(self):
+        cache, encoder = QueryEmbeddingCache(), CountingEncoder()
+        first = cache.encode(encoder, "Butter  Naan ", "model")
+        second = cache.encode(encoder, "butter naan", "model")
+        self.assertIs(first, second)
+        self.assertEqual(encoder.calls, ["butter naan"])
+        cache.encode(encoder, "butter naan", "other-model")
+        self.assertEqual(len(encoder.calls), 2)
+
+    def test_encode_many_batches_unique_misses(self):
+        cache, encoder = QueryEmbeddingCache(), CountingEncoder()
+        cache.encode(encoder, "naan", "model")
+        vectors = cache.encode_many(encoder, ["naan", "Dal", "dal", "rice"], "model")
+        self.assertEqual(vectors.shape, (4, 3))
+        self.assertEqual(encoder.calls[1:], [["dal", "rice"]])
+        np.testing.assert_array_equal(vectors[1], vectors[2])
+
+    def test_evicts_by_entries_and_bytes(self):
+        cache = QueryEmbeddingCache(max_entries=2)
+        for text in ("a", "bb", "ccc"):
+            cache.encode(CountingEncoder(), text, "model")
+        self.assertIsNone(cache.get("model", "a"))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+        cache = QueryEmbeddingCache(max_bytes=2 * 3 * 4)  # two 3-dim float32 vectors
+        for text in ("a", "bb", "ccc"):
+            cache.encode(CountingEncoder(), text, "model")
+        self.assertEqual((cache.stats()["entries"], cache.stats()["bytes"]), (2, 24))
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get(self, remote_addr="203.0.113.9", user=None, **headers):
+        request = RequestFactory().get("/api/chatbot/metrics/", REMOTE_ADDR=remote_addr, headers=headers)
+        request.user = user or AnonymousUser()
+        return ChatbotMetricsView.as_view()(request)
+
+    def test_denied_by_default_without_token(self):
+        with mock.patch.dict("os.environ", {"CHATBOT_METRICS_TOKEN": "", "CHATBOT_METRICS_ALLOW_LOOPBACK": ""}):
+            self.assertEqual(self.get().status_code, 403)
+            # Behind a same-host reverse proxy every request comes from loopback
+            self.assertEqual(self.get(remote_addr="127.0.0.1").status_code, 403)
+            self.assertEqual(self.get(remote_addr="::1").status_code, 403)
+            self.assertEqual(self.get(user=mock.Mock(is_active=True, is_staff=True)).status_code, 200)
+
+    def test_loopback_only_when_opted_in(self):
+        with mock.patch.dict("os.environ", {"CHATBOT_METRICS_TOKEN": "", "CHATBOT_METRICS_ALLOW_LOOPBACK": "True"}):
+            self.assertEqual(self.get(remote_addr="127.0.0.1").status_code, 200)
+            self.assertEqual(self.get(remote_addr="::1").status_code, 200)
+            self.assertEqual(self.get().status_code, 403)
+
+    def test_token_required_when_configured(self):
+        with mock.patch.dict("os.environ", {"CHATBOT_METRICS_TOKEN": "s3cret", "CHATBOT_METRICS_ALLOW_LOOPBACK": ""}):
+            self.assertEqual(self.get(remote_addr="127.0.0.1").status_code, 401)
+            self.assertEqual(self.get(Authorization="Bearer wrong").status_code, 401)
+            response = self.get(Authorization="Bearer s3cret")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b"chatbot_route_total", response.content)
+
+
+class SpeculativeSearchTests(SimpleTestCase):
+    def test_only_identical_search_terms_match(self):
+        self.assertTrue(queries_match("Paneer  Tikka ", "paneer tikka"))
+        self.assertFalse(queries_match("paneer tikka", "paneer tikka masala"))
+        self.assertFalse(queries_match("chicken tikka", "paneer tikka"))
+        self.assertFalse(queries_match("", ""))
+
+    def test_reuses_speculation_for_the_same_query_only(self):
+        calls = []
+
+        def search(query, top_k=5, restaurant_id=None, **options):
+            calls.append(query)
+            return [{"query": query, "rank": i} for i in range(top_k)]
+
+        speculation = SpeculativeSearch(search, "Paneer Tikka", restaurant_id=1)
+        speculation.future.result()
+        self.assertEqual(len(speculation.search("paneer tikka", top_k=3, restaurant_id=1)), 3)
+        self.assertEqual(speculation.search("paneer tika", top_k=3, restaurant_id=1)[0]["query"], "paneer tika")
+        self.assertEqual(speculation.search("paneer tikka", top_k=3, restaurant_id=2)[0]["query"], "paneer tikka")
+        speculation.finish()
+        self.assertEqual(calls, ["Paneer Tikka", "paneer tika", "paneer tikka"])
+        self.assertTrue(speculation.used)
+
+
+    def test_speculative_stages_land_in_the_request_trace(self):
+        def search(query, top_k=5, restaurant_id=None, **options):
+            with stage("encode"):
+                pass
+            return []
+
+        with trace() as t:
+            speculation = SpeculativeSearch(search, "paneer tikka", restaurant_id=1)
+            speculation.future.result()
+            speculation.finish()
+        self.assertEqual(t.stages["encode"][1], 1)
+
+
+class LLMBackendTests(SimpleTestCase):
+    def test_backend_must_implement_complete(self):
+        with self.assertRaises(TypeError):
+            LLMBackend()
+
+        class Echo(LLMBackend):
+            def complete(self, messages, temperature=0.2, max_tokens=250, timeout=None):
+                return messages[-1]["content"]
+
+        self.assertEqual(asyncio.run(Echo().acomplete([{"role": "user", "content": "hi"}])), "hi")
+
+    def classification_messages(self, message):
+        return [{"role": "user", "content": engine._classification_prompt(message)}]
+
+    def outcomes(self, backend, calls=40):
+        results = []
+        for i in range(calls):
+            try:
+                results.append(backend.complete(self.classification_messages(f"add {i} butter naan")))
+            except LLMError as e:
+                results.append(type(e).__name__)
+        return results
+
+    def test_fake_is_deterministic_for_a_seed(self):
+        def make(seed):
+            return FakeLLMBackend(latency_ms=0, error_rate=0.3, malformed_rate=0.2, seed=seed)
+
+        first = self.outcomes(make(7))
+        self.assertEqual(first, self.outcomes(make(7)))
+        self.assertNotEqual(first, self.outcomes(make(8)))
+        self.assertIn("LLMError", first)
+        self.assertIn("Sure! Here is what I found:", first)
+
+    def test_fake_error_rate_raises_llm_error(self):
+        backend = FakeLLMBackend(latency_ms=0, error_rate=1.0)
+        with self.assertRaisesRegex(LLMError, "fake LLM error"):
+            backend.complete(self.classification_messages("add naan"))
+        with self.assertRaises(LLMError):
+            asyncio.run(backend.acomplete(self.classification_messages("add naan")))
+        self.assertEqual(backend.stats(), {"calls": 2, "errors": 2, "timeouts": 0})
+        # The engine falls back to HELP and doesn't cache the failure
+        with mock.patch.object(engine, "get_llm_backend", return_value=backend), self.assertLogs("chatbot.engine", "WARNING"):
+            self.assertEqual(engine._classify_intent_uncached("add naan"), {"intent": "HELP", "confidence": 0.3})
+
+    def test_fake_latency_over_the_timeout_raises_llm_timeout(self):
+        backend = FakeLLMBackend(latency_ms=10_000, latency_sigma=0, timeout=0.001)
+        with self.assertRaises(LLMTimeout):
+            backend.complete(self.classification_messages("add naan"))
+        self.assertEqual(backend.stats()["timeouts"], 1)
+
+    def test_fake_classification_matches_the_engine_schema(self):
+        intents = {"ADD_ITEM", "REMOVE_ITEM", "SEARCH_ITEM", "SHOW_CART", "SHOW_MENU", "CLEAR_CART", "CONFIRM_ORDER", "HELP"}
+        backend = FakeLLMBackend(latency_ms=0)
+        for message, intent, name, quantity in (
+            ("I would like two paneer tikka", "ADD_ITEM", "paneer tikka", 2),
+            ("please take out the dal fry", None, None, None),
+            ("do you have biryani", "SEARCH_ITEM", "biryani", 1),
+            ("show my cart", "SHOW_CART", None, 1),
+            ("what a lovely day it has been today", None, None, None),
+        ):
+            raw = backend.complete(self.classification_messages(message))
+            result = engine._parse_classification(raw)
+            self.assertEqual(set(json.loads(raw)), {"intent", "item_name", "quantity"}, message)
+            self.assertIn(result["intent"], intents, message)
+            self.assertIsInstance(result["quantity"], int)
+            self.assertGreaterEqual(result["quantity"], 1)
+            self.assertEqual(result["confidence"], engine.LLM_CONFIDENCE)
+            if intent is not None:
+                self.assertEqual((result["intent"], result["item_name"], result["quantity"]), (intent, name, quantity))
+            if result["intent"] in ("ADD_ITEM", "REMOVE_ITEM", "SEARCH_ITEM"):
+                self.assertTrue(result["item_name"], message)
+
+
+class BM25Tests(SimpleTestCase):
+    def setUp(self):
+        self.index = BM25Index(
+            [i["name"] for i in MENU], [i["category"] for i in MENU],
+            ["paneer, cream", "paneer, yogurt", "paneer, capsicum", "lentils", "flour, butter", "rice, chicken", "milk"],
+        )
+
+    def test_name_matches_outrank_ingredient_matches(self):
+        index = BM25Index(["Butter Naan", "Garlic Naan"], ["Breads", "Breads"], ["flour", "flour, butter"])
+        scores, coverage = index.score("butter")
+        self.assertGreater(scores[0], scores[1])
+        self.assertGreater(scores[1], 0)
+        self.assertEqual(coverage.tolist(), [1.0, 0.0])
+
+    def test_only_matching_items_score(self):
+        scores, _ = self.index.score("cream")
+        self.assertEqual(np.flatnonzero(scores).tolist(), [0])
+        scores, _ = self.index.score("desserts")
+        self.assertEqual(np.flatnonzero(scores).tolist(), [6])
+
+    def test_name_coverage_is_idf_weighted(self):
+        _, coverage = self.index.score("paneer tikka")
+        self.assertAlmostEqual(float(coverage[1]), 1.0, places=5)
+        # "tikka" is rarer than "paneer", so it carries most of the weight
+        self.assertLess(coverage[0], 0.5)
+        self.assertEqual(coverage[3], 0.0)
+
+    def test_unknown_terms_lower_coverage(self):
+        _, coverage = self.index.score("paneer tikka xyz")
+        self.assertLess(coverage[1], 1.0)
+
+    def test_tokenize_stems_plurals_and_drops_stopwords(self):
+        self.assertEqual(tokenize("Some Momos and the Curries"), ["momo", "curry"])
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[3, 1, 2], [1, 4]], k=60)
+        self.assertEqual([row for row, _ in fused], [1, 3, 4, 2])
+        self.assertAlmostEqual(fused[0][1], 1 / 62 + 1 / 61)
+
+    def test_top_positive(self):
+        self.assertEqual(top_positive(np.array([0.0, 2.0, 0.5, 3.0, 0.0]), 2).tolist(), [3, 1])
+        self.assertEqual(top_positive(np.zeros(3), 2).tolist(), [])
+
+
+class NameIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = NameIndex([(1, "Butter Naan"), (2, "Dal Makhani (Half)"), (3, "Chicken Biryani"),
+                                (4, "Mac & Cheese"), (5, "Garlic Naan"), (6, "Garlic Naan (Large)")])
+
+    def test_name_keys_fold_case_plurals_and_spellings(self):
+        self.assertEqual(name_key("2 Butter Naans!"), "2 butter naan")
+        self.assertEqual(name_key("the chiken biriyani"), "chicken biryani")
+        self.assertEqual(name_key("Mac & Cheese"), "mac and cheese")
+
+    def test_exact_and_alias_lookups(self):
+        self.assertEqual(self.index.lookup("butter nan"), (1, "Butter Naan"))
+        self.assertEqual(self.index.lookup("dal makhani"), (2, "Dal Makhani (Half)"))
+        self.assertEqual(self.index.lookup("Dal Makhani (Half)"), (2, "Dal Makhani (Half)"))
+        self.assertEqual(self.index.lookup("mac and cheese"), (4, "Mac & Cheese"))
+        self.assertIsNone(self.index.lookup("naan"))
+
+    def test_shared_key_is_ambiguous(self):
+        # "Garlic Naan (Large)" is also reachable as "garlic naan"
+        self.assertIsNone(self.index.lookup("garlic naan"))
+        self.assertEqual(self.index.lookup("garlic naan large"), (6, "Garlic Naan (Large)"))
+        self.index.remove(6)
+        self.assertEqual(self.index.lookup("garlic naan"), (5, "Garlic Naan"))
+
+    def test_upsert_replaces_old_keys(self):
+        self.index.upsert(1, "Butter Garlic Naan")
+        self.assertIsNone(self.index.lookup("butter naan"))
+        self.assertEqual(self.index.lookup("butter garlic naan"), (1, "Butter Garlic Naan"))
+        self.assertEqual(len(self.index), 6)
+
+    def test_registry_only_updates_loaded_indexes(self):
+        loads = []
+        registry = NameIndexRegistry(loader=lambda rid: loads.append(rid) or NameIndex([(1, "Butter Naan")]))
+        registry.item_saved(7, 2, "Jeera Rice")
+        self.assertEqual(loads, [])
+        self.assertEqual(registry.lookup(7, "butter naan"), (1, "Butter Naan"))
+        registry.item_saved(7, 2, "Jeera Rice")
+        registry.item_saved(7, 1, "Butter Naan", available=False)
+        self.assertEqual(registry.lookup(7, "jeera rice"), (2, "Jeera Rice"))
+        self.assertIsNone(registry.lookup(7, "butter naan"))
+        self.assertIsNone(registry.lookup(None, "jeera rice"))
+        self.assertEqual(loads, [7])
+
+
+class MenuItemSignalTests(TestCase):
+    def setUp(self):
+        name_index_registry.clear()
+        spelling_registry.clear()
+        self.addCleanup(name_index_registry.clear)
+        self.addCleanup(spelling_registry.clear)
+        self.restaurant = Restaurant.objects.create(name="Test Kitchen", phone="123")
+        self.naan = MenuItem.objects.create(restaurant=self.restaurant, name="Butter Naan", price=50)
+
+    def lookup(self, text):
+        return name_index_registry.lookup(self.restaurant.id, text)
+
+    def test_saves_and_deletes_update_the_loaded_name_index(self):
+        self.assertEqual(self.lookup("butter naan"), (self.naan.id, "Butter Naan"))
+        loads = name_index_registry.stats()["loads"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rice = MenuItem.objects.create(restaurant=self.restaurant, name="Jeera Rice", price=120)
+        self.assertEqual(self.lookup("jeera rice"), (rice.id, "Jeera Rice"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.naan.name = "Garlic Naan"
+            self.naan.save()
+        self.assertIsNone(self.lookup("butter naan"))
+        self.assertEqual(self.lookup("garlic naan"), (self.naan.id, "Garlic Naan"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.naan.available = False
+            self.naan.save()
+        self.assertIsNone(self.lookup("garlic naan"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rice.delete()
+        self.assertIsNone(self.lookup("jeera rice"))
+        # Updated in place, never reloaded from the database
+        self.assertEqual(name_index_registry.stats()["loads"], loads)
+
+    def test_nothing_changes_before_commit(self):
+        self.lookup("butter naan")
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            MenuItem.objects.create(restaurant=self.restaurant, name="Jeera Rice", price=120)
+        self.assertIsNone(self.lookup("jeera rice"))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_menu_import_refreshes_search_index_availability(self):
+        rice = MenuItem.objects.create(restaurant=self.restaurant, name="Jeera Rice", price=120)
+        index = build_index([
+            {"id": self.naan.id, "name": "Butter Naan", "category": "Breads", "price": 50},
+            {"id": rice.id, "name": "Jeera Rice", "category": "Rice", "price": 120},
+        ])
+        registry = IndexRegistry(loader=lambda restaurant_id: index)
+        with self.assertLogs("chatbot.index_registry", "INFO"):
+            registry.get(self.restaurant.id)
+        with mock.patch.object(engine, "_index_registry", registry), self.captureOnCommitCallbacks(execute=True):
+            # What the importers do: a bulk deactivate (no post_save), then re-enable what's still listed
+            MenuItem.objects.filter(restaurant=self.restaurant).update(available=False)
+            MenuItem.objects.filter(pk=rice.pk).update(available=True)
+            menu_imported(self.restaurant.id)
+        self.assertEqual(index.columns.available.tolist(), [False, True])
+        self.assertEqual(SearchFilters().mask(index.columns).tolist(), [False, True])
+
+    def test_menu_changes_drop_the_spelling_vocabulary(self):
+        self.assertEqual(spelling_registry.correct(self.restaurant.id, "buter naan"), "butter naan")
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(restaurant=self.restaurant, name="Paneer Tikka", price=240)
+        self.assertEqual(spelling_registry.stats()["restaurants"], 0)
+        self.assertEqual(spelling_registry.correct(self.restaurant.id, "paner tika"), "paneer tikka")
+
+
+class SpellingIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SpellingIndex.from_texts(
+            [i["name"] for i in MENU] + [i["category"] for i in MENU] + ["mushroom", "manchurian", "gobi"]
+        )
+
+    def test_edit_distance_counts_transpositions_once(self):
+        self.assertEqual(edit_distance("paneer", "panner", 2), 1)
+        self.assertEqual(edit_distance("tikka", "tikak", 2), 1)
+        self.assertEqual(edit_distance("naan", "nan", 2), 1)
+        self.assertEqual(edit_distance("biryani", "biriyani", 2), 1)
+        self.assertEqual(edit_distance("dal", "rice", 1), 2)  # limit + 1
+
+    def test_corrects_misspelt_menu_words(self):
+        for typo, expected in (
+            ("panner tika", "paneer tikka"),
+            ("chiken biriyani", "chicken biryani"),
+            ("buter nan", "butter naan"),
+            ("mashroom", "mushroom"),
+            ("desert", "dessert"),
+        ):
+            self.assertEqual(self.index.correct(typo), expected, typo)
+
+    def test_leaves_known_common_and_far_words_alone(self):
+        for text in ("paneer tikka", "add something spicy", "pizza", "ab", "7up", "xyzzyq"):
+            self.assertEqual(self.index.correct(text), text, text)
+
+    def test_query_parser_keywords_are_kept(self):
+        # "mix", "rice" and "combos" are one or two edits from max / priced / above
+        index = SpellingIndex.from_texts(["Mix Veg", "Jeera Rice", "Combos", "Breads", "Mixed Grill"])
+        for text in ("breads max 100", "items within 100", "starters priced under 150", "upto 200",
+                     "maximum 300 rupees", "above 150", "around 200", "between 100 and 200"):
+            self.assertEqual(index.correct(text), text, text)
+
+    def test_short_tokens_allow_one_edit(self):
+        self.assertEqual(self.index.correct_word("gobhi"), "gobi")
+        self.assertEqual(self.index.correct_word("gbi"), "gobi")
+        self.assertEqual(self.index.correct_word("gxbx"), "gxbx")
+
+    def test_candidates_match_a_vocabulary_scan(self):
+        vocabulary = list(self.index.counts)
+        for token in ("panner", "tika", "masla", "naaan", "biryni", "jamn", "frie", "chikn"):
+            limit = max_distance_for(token)
+            best = min(
+                (edit_distance(token, word, limit), -self.index.counts[word]) for word in vocabulary
+            )
+            expected = {word for word in vocabulary
+                        if (edit_distance(token, word, limit), -self.index.counts[word]) == best}
+            if best[0] > limit:
+                expected = {token}
+            self.assertIn(self.index.correct_word(token), expected, token)
+
+    def test_correct_item_name_keeps_the_original_when_nothing_changes(self):
+        with mock.patch.object(spelling_registry, "get", return_value=self.index):
+            self.assertEqual(engine.correct_item_name("Paneer Tikka!", restaurant_id=1), "Paneer Tikka!")
+            self.assertEqual(engine.correct_item_name("Panner Tikka", restaurant_id=1), "paneer tikka")
+
+    def test_alias_words_are_not_corrected_into_other_dishes(self):
+        # "coke" is one edit from "cake" but is the name index's alias for "coca cola"
+        cakes = [(1, "Chocolate Cake"), (2, "Plum Cake")]
+        spelling = SpellingIndex.from_texts(name for _, name in cakes + [(3, "Coca Cola")])
+        self.assertEqual(spelling.correct_word("coke"), "cake")
+        with mock.patch.object(spelling_registry, "get", return_value=spelling):
+            self.assertEqual(engine.correct_item_name("coke", restaurant_id=1), "coke")
+            self.assertEqual(engine.correct_item_name("2 coke", restaurant_id=1), "2 coke")
+            with mock.patch.object(name_index_registry, "get", return_value=NameIndex(cakes + [(3, "Coca Cola")])):
+                self.assertEqual(engine.lookup_item_name("coke", restaurant_id=1), ((3, "Coca Cola"), "coke"))
+                self.assertEqual(engine.lookup_item_name("choclate cake", restaurant_id=1),
+                                 ((1, "Chocolate Cake"), "chocolate cake"))
+            # Without Coca Cola on the menu, "coke" still isn't turned into a cake
+            with mock.patch.object(name_index_registry, "get", return_value=NameIndex(cakes)):
+                self.assertEqual(engine.lookup_item_name("coke", restaurant_id=1), (None, "coke"))
+
+    def test_exact_names_skip_spelling_correction(self):
+        with mock.patch.object(spelling_registry, "correct", side_effect=AssertionError("corrected")), \
+                mock.patch.object(name_index_registry, "get", return_value=NameIndex([(4, "Dal Fry")])):
+            self.assertEqual(engine.lookup_item_name("dal fry", restaurant_id=1), ((4, "Dal Fry"), "dal fry"))
+
+
+class SearchFiltersTests(MenuSearchTestCase):
+    vectors = {"dinner": query_vector({0: 0.3, 3: 0.1, 5: 0.4, 6: 0.2})}
+
+    def rows(self, filters):
+        mask = filters.mask(self.index.columns)
+        return None if mask is None else np.flatnonzero(mask).tolist()
+
+    def test_no_constraints_means_no_mask(self):
+        self.assertIsNone(self.rows(SearchFilters()))
+        self.assertFalse(SearchFilters())
+
+    def test_diet_price_and_category_masks(self):
+        self.assertEqual(self.rows(SearchFilters(vegan=True)), [3])
+        self.assertEqual(self.rows(SearchFilters(vegetarian=True)), [0, 1, 2, 3, 4, 6])
+        self.assertEqual(self.rows(SearchFilters(non_vegetarian=True)), [5])
+        self.assertEqual(self.rows(SearchFilters(min_price=200, max_price=260)), [0, 1, 2])
+        self.assertEqual(self.rows(SearchFilters(categories=("main",))), [0, 2, 3])
+        self.assertEqual(self.rows(SearchFilters(categories=("bread", "DESSERT"))), [4, 6])
+        self.assertEqual(self.rows(SearchFilters(vegetarian=True, max_price=100)), [4, 6])
+
+    def test_unpriced_items_drop_out_of_price_bounds(self):
+        self.index.columns.prices[4] = np.nan
+        self.assertEqual(self.rows(SearchFilters(max_price=100)), [6])
+
+    def test_unavailable_items_are_always_excluded(self):
+        self.index.set_available(5, False)
+        self.assertEqual(self.rows(SearchFilters()), [0, 1, 2, 3, 5, 6])
+        self.assertEqual(self.rows(SearchFilters(available_only=False)), None)
+
+    def test_filtered_search_returns_only_matching_items(self):
+        results = engine.semantic_search("dinner", top_k=3, filters=SearchFilters(vegetarian=True))
+        self.assertEqual([r["item_id"] for r in results], [1, 7, 4])
+        self.assertEqual(engine.semantic_search("dinner", top_k=3, filters=SearchFilters(max_price=10)), [])
+
+
+class MergeFiltersTests(MenuSearchTestCase):
+    vectors = {
+        "veg": query_vector({0: 0.2, 4: 0.3, 6: 0.25}),
+        "starters": query_vector({1: 0.4}),
+    }
+
+    def test_bounds_and_diet_combine(self):
+        merged = engine.merge_filters(SearchFilters(vegetarian=True, max_price=200), SearchFilters(min_price=50, max_price=150))
+        self.assertEqual((merged.vegetarian, merged.min_price, merged.max_price), (True, 50, 150))
+        self.assertIs(engine.merge_filters(None, merged), merged)
+        self.assertIs(engine.merge_filters(merged, SearchFilters()), merged)
+
+    def test_categories_are_intersected(self):
+        merged = engine.merge_filters(SearchFilters(categories=("main", "bread")), SearchFilters(categories=("Main Course",)))
+        self.assertEqual(merged.categories, ("Main Course",))
+        self.assertEqual(np.flatnonzero(merged.mask(self.index.columns)).tolist(), [0, 2, 3])
+        merged = engine.merge_filters(SearchFilters(categories=("starters",)), SearchFilters(vegan=True))
+        self.assertEqual(merged.categories, ("starters",))
+
+    def test_disjoint_categories_match_nothing(self):
+        merged = engine.merge_filters(SearchFilters(categories=("breads",)), SearchFilters(categories=("desserts",)))
+        self.assertEqual(merged.categories, ())
+        self.assertTrue(merged)
+        self.assertFalse(merged.mask(self.index.columns).any())
+
+    def test_contradictory_diets_match_nothing(self):
+        merged = engine.merge_filters(SearchFilters(vegetarian=True), SearchFilters(non_vegetarian=True))
+        self.assertFalse(merged.mask(self.index.columns).any())
+
+    def test_parsed_constraints_narrow_explicit_filters(self):
+        results = engine.semantic_search("starters", top_k=3, parse_constraints=True,
+                                         filters=SearchFilters(vegetarian=True))
+        self.assertEqual([r["item_id"] for r in results], [2])
+        results = engine.semantic_search("starters", top_k=3, parse_constraints=True,
+                                         filters=SearchFilters(categories=("breads",)))
+        self.assertEqual(results, [])
+
+    def test_search_item_parses_the_query_once(self):
+        with mock.patch.object(QueryParser, "parse", autospec=True, side_effect=QueryParser.parse) as parse:
+            result = self.resolve("SEARCH_ITEM", "veg under 100")
+        self.assertEqual(parse.call_count, 1)
+        self.assertIn("Butter Naan", result.reply)
+
+    def test_search_item_applies_parsed_constraints(self):
+        result = self.resolve("SEARCH_ITEM", "veg under 100")
+        self.assertEqual(result.intent, "SEARCH_ITEM")
+        self.assertIn("Butter Naan", result.reply)
+        self.assertIn("Gulab Jamun", result.reply)
+        self.assertNotIn("Paneer", result.reply)
+
+
+# Excerpt of the bundled menu where spelling correction used to rewrite constraint words
+BREADS_AND_COMBOS = [
+    {"id": 11, "name": "Butter Naan", "category": "Breads", "price": 60, "is_vegetarian": True},
+    {"id": 12, "name": "Mix Chur Chur Naan", "category": "Breads", "price": 60, "is_vegetarian": True},
+    {"id": 13, "name": "Amritsari Chur Chur Naan", "category": "Breads", "price": 210, "is_vegetarian": True},
+    {"id": 14, "name": "Chur Chur Naan Pudina Chaap", "category": "Breads", "price": 250, "is_vegetarian": True},
+    {"id": 15, "name": "Rajma With Rice", "category": "Combos", "price": 130, "is_vegetarian": True},
+    {"id": 16, "name": "Veg Spring Roll", "category": "Starters", "price": 140, "is_vegetarian": True},
+    {"id": 17, "name": "Paneer Tikka", "category": "Starters", "price": 240, "is_vegetarian": True},
+]
+
+
+class SearchSpellingTests(MenuSearchTestCase):
+    """Constraints are parsed from the words as typed; spelling only corrects the rest."""
+
+    vectors = {
+        "breads": query_vector({0: 0.3, 1: 0.3, 2: 0.3, 3: 0.3}),
+        "items within 100": query_vector({0: 0.2, 1: 0.2, 4: 0.2}),
+        "starters": query_vector({5: 0.3, 6: 0.3}),
+        "combos": query_vector({4: 0.3}),
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.index = build_index(BREADS_AND_COMBOS)
+        spelling = SpellingIndex.from_texts([i["name"] for i in BREADS_AND_COMBOS] + [i["category"] for i in BREADS_AND_COMBOS])
+        for patcher in (
+            mock.patch.object(engine._index_registry, "get", return_value=self.index),
+            mock.patch.object(spelling_registry, "get", return_value=spelling),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def search(self, term):
+        calls = []
+
+        def search(query, **options):
+            calls.append((query, options.get("filters")))
+            return engine.semantic_search(query, **options)
+
+        result = engine.resolve_intent(term, {"intent": "SEARCH_ITEM", "item_name": term}, restaurant_id=1, search=search)
+        [call] = calls
+        return result, call
+
+    def test_price_words_survive_spelling_correction(self):
+        result, (query, filters) = self.search("breads max 100")
+        self.assertEqual((query, filters.categories, filters.max_price), ("breads", ("Breads",), 100))
+        self.assertIn("Butter Naan", result.reply)
+        self.assertNotIn("Amritsari", result.reply)
+        self.assertNotIn("Pudina", result.reply)
+
+        result, (query, filters) = self.search("items within 100")
+        self.assertEqual(filters.max_price, 100)
+        self.assertNotIn("Rajma", result.reply)
+
+        result, (query, filters) = self.search("starters priced under 150")
+        self.assertEqual((query, filters.categories, filters.max_price), ("starters", ("Starters",), 150))
+        self.assertIn("Veg Spring Roll", result.reply)
+        self.assertNotIn("Paneer Tikka", result.reply)
+
+    def test_corrected_words_do_not_become_category_filters(self):
+        result, (query, filters) = self.search("momos")
+        self.assertIsNone(filters)
+        self.assertIn("we don't have 'momos'", result.reply)
+
+
+class QueryParserTests(SimpleTestCase):
+    def setUp(self):
+        self.parser = QueryParser(
+            ["Starters", "Main Course", "Breads", "Desserts", "Rice", "Curries"],
+            ["paneer", "tikka", "jeera", "rice", "butter", "naan"],
+        )
+
+    def test_price_bounds(self):
+        for query, bounds in (
+            ("paneer under 200", (None, 200)),
+            ("naan below rs 60", (None, 60)),
+            ("desserts above 100", (100, None)),
+            ("something between 300 and 150", (150, 300)),
+            ("paneer around 200", (160, 240)),
+            ("paneer under 300 above 100", (100, 300)),
+        ):
+            filters = self.parser.parse(query).filters
+            self.assertEqual((filters.min_price, filters.max_price), bounds, query)
+
+    def test_diet_words(self):
+        self.assertTrue(self.parser.parse("non veg starters").filters.non_vegetarian)
+        self.assertFalse(self.parser.parse("non-veg starters").filters.vegetarian)
+        self.assertTrue(self.parser.parse("pure veg thali").filters.vegetarian)
+        self.assertTrue(self.parser.parse("vegan desserts").filters.vegan)
+
+    def test_categories_and_remaining_text(self):
+        parsed = self.parser.parse("veg starters under 150")
+        self.assertEqual(parsed.filters.categories, ("Starters",))
+        self.assertEqual(parsed.text, "")
+        self.assertEqual(parsed.embed_text, "starters veg")
+        parsed = self.parser.parse("spicy paneer dishes under 250")
+        self.assertEqual(parsed.text, "spicy paneer")
+        self.assertEqual(parsed.spice, "spicy")
+        self.assertEqual(self.parser.parse("a curry for dinner").filters.categories, ("Curries",))
+
+    def test_labels_that_are_name_words_stay_text(self):
+        parsed = self.parser.parse("jeera rice")
+        self.assertEqual(parsed.filters.categories, ())
+        self.assertEqual(parsed.text, "jeera rice")
+        self.assertEqual(parsed.matched, [])
+
+    def test_parser_is_built_once_per_index(self):
+        index = build_index()
+        parser = parser_for_index(index)
+        self.assertIs(parser_for_index(index), parser)
+        self.assertIs(index.query_parser, parser)
+        self.assertEqual(parser.parse("main course under 200").filters.categories, ("Main Course",))
+
+
+class RerankerParityTests(SimpleTestCase):
+    """MenuReranker against the old per-candidate _calculate_boost loop (kept in rerank_reference.py)."""
+
+    def setUp(self):
+        self.ids, self.metadatas = rerank_reference.synthetic_menu(300)
+        self.reranker = MenuReranker(MenuFeatures(self.ids, self.metadatas))
+        self.rng = np.random.default_rng(0)
+
+    def check(self, query, max_price=None, candidates=60, top_k=20):
+        picks = self.rng.choice(len(self.ids), size=candidates, replace=False).tolist()
+        distances = np.sort(self.rng.uniform(0.2, 0.9, size=candidates)).tolist()
+        results = rerank_reference.chroma_results(self.ids, self.metadatas, picks, distances)
+        expected = rerank_reference.legacy_rerank(query, results, max_price, top_k, fuzzy=fuzzy_score)
+        got = self.reranker.rerank(query, [self.ids[p] for p in picks], distances, top_k, max_price)
+        self.assertEqual([r["id"] for r in got], [r["id"] for r in expected], query)
+        for field in ("score", "base_similarity", "boost_factor", "fuzzy_match"):
+            np.testing.assert_allclose([r[field] for r in got], [r[field] for r in expected], rtol=1e-6, err_msg=query)
+
+    def test_matches_legacy_boosts(self):
+        for query in rerank_reference.QUERIES:
+            self.check(query)
+
+    def test_matches_legacy_price_cap(self):
+        self.check("cheap veg snacks", max_price=150)
+        self.check("paneer", max_price=250)
+
+    def test_unknown_ids_need_a_rebuild(self):
+        self.assertIsNone(self.reranker.rerank("paneer", ["missing"], [0.5], 5))
+
+
+class FuzzyMatchTests(SimpleTestCase):
+    THRESHOLD = 0.6  # MenuReranker's default fuzzy_threshold
+
+    def test_typos_clear_the_rerank_threshold(self):
+        for typo, word in (("panner", "paneer"), ("biriyani", "biryani"), ("tandori", "tandoori"), ("chiken", "chicken"),
+                           ("daal", "dal"), ("nan", "naan")):
+            self.assertGreater(dice(typo, word), self.THRESHOLD, typo)
+
+    def test_short_unrelated_words_stay_below_it(self):
+        # SequenceMatcher gave egg/veg 0.67, enough for a fuzzy boost
+        self.assertEqual(dice("egg", "veg"), 0.5)
+        for a, b in (("egg", "veg"), ("tea", "pea"), ("rice", "mice"), ("fish", "dish"), ("soup", "soy")):
+            # The reranker boosts only above the threshold
+            self.assertLessEqual(dice(a, b), self.THRESHOLD, (a, b))
+
+    def test_dice_values(self):
+        self.assertEqual(dice("paneer", "paneer"), 1.0)
+        self.assertEqual(dice("abc", "xyz"), 0.0)
+        self.assertAlmostEqual(dice("paneer", "panner"), 12 / 14)
+        self.assertEqual(bigrams("dal"), {" d", "da", "al", "l "})
+
+    def test_fuzzy_score(self):
+        self.assertEqual(fuzzy_score("Paneer", "Paneer Tikka"), 1.0)
+        self.assertAlmostEqual(fuzzy_score("panner tika", "Paneer Tikka"), max(dice("panner", "paneer"), dice("tika", "tikka")))
+        self.assertEqual(fuzzy_score("zzz", ""), 0.0)
+
+    def test_matcher_agrees_with_dice(self):
+        words = ["paneer", "tikka", "butter", "naan", "biryani", "dal", "egg"]
+        matcher = FuzzyMatcher(words)
+        for query in ("panner", "tika", "veg", "qq", "biriyani"):
+            np.testing.assert_allclose(matcher.scores(query), [dice(query, w) for w in words])
+        self.assertEqual(len(FuzzyMatcher([]).scores("paneer")), 0)
+
+
+class KeywordAutomatonTests(SimpleTestCase):
+    KEYWORDS = ["paneer", "south indian", "tea", "steak", "spicy", "rice", "ice", "veg", "veggie"]
+    QUERIES = ["spicy paneer tikka", "south indian thali", "steak and veggie rice", "price under 200", "teatime veg", ""]
+
+    def paths(self):
+        return KeywordAutomaton(self.KEYWORDS, min_keywords=0), KeywordAutomaton(self.KEYWORDS, min_keywords=1000)
+
+    def test_threshold_picks_the_path(self):
+        automaton, loops = self.paths()
+        self.assertTrue(automaton.use_automaton)
+        self.assertFalse(loops.use_automaton)
+
+    def test_paths_match_substring_tests(self):
+        keywords = set(self.KEYWORDS)
+        for automaton in self.paths():
+            for query in self.QUERIES:
+                hits = automaton.scan(query)
+                self.assertEqual(hits.among(keywords), {k for k in keywords if k in query}, query)
+                for keyword in self.KEYWORDS:
+                    self.assertEqual(keyword in hits, keyword in query, (query, keyword))
+
+    def test_words_are_whole_tokens_in_order(self):
+        for automaton in self.paths():
+            self.assertEqual(automaton.scan("steak and veggie rice").words, ["steak", "veggie", "rice"])
+            self.assertEqual(automaton.scan("teatime veg").words, ["veg"])
+            # Multi-word keywords are substring hits only, as with query.split()
+            hits = automaton.scan("south indian thali")
+            self.assertEqual(hits.words, [])
+            self.assertIn("south indian", hits)
+
+
+class NumpyVectorStoreTests(SimpleTestCase):
+    METADATAS = [
+        {"name": "Paneer Tikka", "price": 220, "category": "Starters", "is_veg": True},
+        {"name": "Chicken Biryani", "price": 320, "category": "Mains", "is_veg": False},
+        {"name": "Butter Naan", "price": 50, "category": "Breads", "is_veg": True},
+        {"name": "Masala Chai", "price": 40, "is_veg": True},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((len(self.METADATAS), 8)).astype(np.float32)
+        self.store = NumpyVectorStore(self.tmp.name)
+        self.store.reset()
+        self.store.add([str(i) for i in range(len(self.METADATAS))], self.vectors, self.METADATAS,
+                       [m["name"] for m in self.METADATAS])
+
+    def ids(self, where):
+        return set(np.asarray(self.store.ids)[self.store.where_mask(where)])
+
+    def test_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            VectorStore()
+        self.assertIsInstance(make_vector_store(self.tmp.name, "numpy"), NumpyVectorStore)
+        with self.assertRaises(ValueError):
+            make_vector_store(self.tmp.name, "faiss")
+
+    def test_adding_no_rows_is_a_no_op(self):
+        self.store.add([], np.empty((0, 8), dtype=np.float32), [], [])
+        self.assertEqual(self.store.count(), len(self.METADATAS))
+        empty = NumpyVectorStore(f"{self.tmp.name}/empty")
+        empty.reset()
+        empty.add([], [], [])
+        self.assertEqual(empty.count(), 0)
+
+    def test_query_matches_brute_force_squared_l2(self):
+        query = self.vectors[1] + 0.1
+        result = self.store.query([query], n_results=3)
+        expected = ((self.vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(expected)[:3]
+        self.assertEqual(result["ids"][0], [str(i) for i in order])
+        np.testing.assert_allclose(result["distances"][0], expected[order], rtol=1e-4, atol=1e-4)
+        self.assertEqual(result["documents"][0][0], self.METADATAS[order[0]]["name"])
+
+    def test_where_clauses(self):
+        self.assertEqual(self.ids({"price": {"$lte": 220}}), {"0", "2", "3"})
+        self.assertEqual(self.ids({"category": "Mains"}), {"1"})
+        self.assertEqual(self.ids({"is_veg": True}), {"0", "2", "3"})
+        self.assertEqual(self.ids({"$and": [{"is_veg": True}, {"price": {"$gt": 45}}]}), {"0", "2"})
+        self.assertEqual(self.ids({"$or": [{"category": "Breads"}, {"price": {"$gte": 300}}]}), {"1", "2"})
+        self.assertEqual(self.ids({"category": {"$in": ["Starters", "Breads"]}}), {"0", "2"})
+        # A row without the field never matches, even for $ne / $nin
+        self.assertEqual(self.ids({"category": {"$ne": "Mains"}}), {"0", "2"})
+        self.assertEqual(self.ids({"category": {"$nin": ["Mains"]}}), {"0", "2"})
+        self.assertEqual(self.ids({"category": {"$gt": "A"}}), set())
+        self.assertEqual(self.ids({"spice": "hot"}), set())
+        with self.assertRaises(ValueError):
+            self.store.where_mask({"price": {"$like": 1}})
+
+    def test_filtered_query_and_empty_result(self):
+        result = self.store.query([self.vectors[1]], n_results=10, where={"is_veg": True})
+        self.assertEqual(sorted(result["ids"][0]), ["0", "2", "3"])
+        empty = self.store.query([self.vectors[0]], n_results=5, where={"price": {"$gt": 1000}})
+        self.assertEqual(empty["ids"], [[]])
+
+    def test_reopen_round_trips(self):
+        reopened = NumpyVectorStore(self.tmp.name)
+        self.assertTrue(reopened.open())
+        self.assertEqual(reopened.get(include=["metadatas", "documents"]),
+                         self.store.get(include=["metadatas", "documents"]))
+        np.testing.assert_array_equal(reopened.embeddings, self.vectors)
+        self.assertEqual(np.flatnonzero(reopened.where_mask({"price": {"$lt": 100}})).tolist(), [2, 3])
+
+    def test_duplicate_ids_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.add(["1"], self.vectors[:1], [{}])
+        self.assertEqual(self.store.count(), len(self.METADATAS))
+
+
+class IndexRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.loads = []
+        patcher = mock.patch.object(index_registry, "logger")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def loader(self, restaurant_id):
+        self.loads.append(restaurant_id)
+        index = build_index()
+        index.restaurant_id = restaurant_id
+        index.nbytes = 100 * (restaurant_id or 1)
+        return index
+
+    def registry(self, **kwargs):
+        return IndexRegistry(loader=self.loader, check_interval=3600, **kwargs)
+
+    def test_evicts_least_recently_used_entry(self):
+        registry = self.registry(max_entries=2, max_bytes=10 ** 9)
+        first = registry.get(1)
+        registry.get(2)
+        self.assertIs(registry.get(1), first)  # 1 is now the most recently used
+        registry.get(3)
+        self.assertEqual(list(registry._indexes), [1, 3])
+        self.assertEqual(registry.stats()["evictions"], 1)
+        registry.get(2)
+        self.assertEqual(self.loads, [1, 2, 3, 2])
+
+    def test_byte_budget(self):
+        registry = self.registry(max_entries=10, max_bytes=450)
+        for restaurant_id in (1, 2, 3):
+            registry.get(restaurant_id)  # 100 + 200 + 300 bytes
+        self.assertEqual(list(registry._indexes), [3])
+        self.assertEqual(registry.stats()["bytes"], 300)
+        registry.get(1)
+        self.assertEqual(list(registry._indexes), [3, 1])
+        self.assertEqual(registry.stats()["bytes"], 400)
+
+    def test_index_larger_than_budget_is_still_served(self):
+        registry = self.registry(max_entries=10, max_bytes=50)
+        registry.get(1)
+        index = registry.get(2)
+        self.assertEqual(index.restaurant_id, 2)
+        self.assertEqual(list(registry._indexes), [2])
+        self.assertIs(registry.get(2), index)
+
+    def test_memory_mapped_embeddings_are_not_counted(self):
+        heap = build_index()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/vectors.f16.npy"
+            np.save(path, heap.embeddings.astype(np.float16))
+            mapped = np.load(path, mmap_mode="r")
+            columns = MenuColumns.from_items(MENU)
+            index = MenuIndex(restaurant_id=1, embeddings=mapped, text_chunks=heap.text_chunks, columns=columns)
+            self.assertEqual(heap.nbytes - index.nbytes, heap.embeddings.nbytes)
+            del index, mapped
+
+
+class LegacyIndexTests(SimpleTestCase):
+    """Root-level artifacts from before the per-restaurant layout."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        np.save(root / "vectors.npy", build_index().embeddings)
+        (root / "chunks.json").write_text(json.dumps(build_index().text_chunks))
+        self.metadata = root / "metadata.json"
+        self.logger = mock.MagicMock()
+        for patcher in (
+            mock.patch.object(index_registry, "EMBEDDINGS_DIR", root / "indexes"),
+            mock.patch.object(index_registry, "LEGACY_EMBEDDINGS_PATH", root / "vectors.npy"),
+            mock.patch.object(index_registry, "LEGACY_CHUNKS_PATH", root / "chunks.json"),
+            mock.patch.object(index_registry, "LEGACY_METADATA_PATH", self.metadata),
+            mock.patch.object(index_registry, "logger", self.logger),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def built_for(self, restaurant_id):
+        self.metadata.write_text(json.dumps({"restaurant_id": restaurant_id, "item_ids": []}))
+
+    def test_served_to_the_restaurant_it_was_built_for(self):
+        self.built_for(1)
+        index = index_registry.load_index(1)
+        self.assertEqual(index.restaurant_id, 1)
+        self.logger.warning.assert_not_called()
+
+    def test_other_restaurants_get_no_index(self):
+        self.built_for(1)
+        self.assertIsNone(index_registry.load_index(2))
+        self.logger.warning.assert_called_once()
+
+    def test_combined_index_is_not_served_per_restaurant(self):
+        self.built_for(None)
+        self.assertIsNone(index_registry.load_index(1))
+        self.logger.warning.assert_called_once()
+        self.metadata.unlink()
+        self.assertIsNone(index_registry.load_index(1))
+
+
+class IndexReloadTests(SimpleTestCase):
+    """Manifest-driven hot reload with a fake loader over a temporary index directory."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patcher in (
+            mock.patch.object(index_registry, "EMBEDDINGS_DIR", Path(tmp.name)),
+            mock.patch.object(index_registry, "logger"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.directory = index_registry.index_dir(1)
+        self.directory.mkdir()
+        self.bump()
+        self.fail_with = None
+        self.gate = None
+        self.registry = IndexRegistry(loader=self.loader, check_interval=0)
+
+    def bump(self):
+        """Publish a new version; step the mtime explicitly so coarse clocks still see a change."""
+        index_registry.write_manifest(self.directory)
+        path = self.directory / index_registry.MANIFEST_FILENAME
+        mtime = os.stat(path).st_mtime_ns + 10 ** 9 * int(index_registry.read_manifest(self.directory)["version"])
+        os.utime(path, ns=(mtime, mtime))
+
+    def loader(self, restaurant_id):
+        fingerprint = index_registry.artifact_fingerprint(self.directory)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail_with is not None:
+            raise self.fail_with
+        index = build_index()
+        index.source = self.directory
+        index.fingerprint = fingerprint
+        index.version = index_registry.read_manifest(self.directory)["version"]
+        return index
+
+    def test_unchanged_manifest_keeps_the_index(self):
+        first = self.registry.get(1)
+        self.assertIs(self.registry.get(1), first)
+        self.assertEqual(self.registry.stats()["reloads"], 0)
+
+    def test_changed_manifest_swaps_in_the_new_index(self):
+        first = self.registry.get(1)
+        self.bump()
+        fresh = self.registry.get(1)
+        self.assertIsNot(fresh, first)
+        self.assertEqual((first.version, fresh.version), (1, 2))
+        self.assertIs(self.registry.get(1), fresh)
+        self.assertEqual(self.registry.stats()["reloads"], 1)
+
+    def test_failed_reload_keeps_serving_the_old_index(self):
+        first = self.registry.get(1)
+        self.bump()
+        self.fail_with = ValueError("truncated npy")
+        self.assertIs(self.registry.get(1), first)
+        self.assertEqual(self.registry.stats()["reloads"], 0)
+        # The next check retries and picks up the new version
+        self.fail_with = None
+        self.assertEqual(self.registry.get(1).version, 2)
+
+    def test_callers_keep_the_current_index_while_one_reloads(self):
+        self.registry.check_interval = 3600
+        first = self.registry.get(1)
+        first.checked_at = float("-inf")  # due for a check
+        self.bump()
+        self.gate = threading.Event()
+        reloaded = []
+        worker = threading.Thread(target=lambda: reloaded.append(self.registry.get(1)))
+        worker.start()
+        try:
+            # The worker claimed this check, so other callers are not held up by its load
+            deadline = time.monotonic() + 5
+            while first.checked_at == float("-inf") and time.monotonic() < deadline:
+                time.sleep(0.001)
+            self.assertIs(self.registry.get(1), first)
+        finally:
+            self.gate.set()
+            worker.join(5)
+        self.assertEqual(reloaded[0].version, 2)
+        self.assertIs(self.registry.get(1), reloaded[0])
+
+    def test_invalidated_index_is_not_swapped_back_in(self):
+        first = self.registry.get(1)
+        self.bump()
+
+        def invalidate_then_load(restaurant_id):
+            self.registry.invalidate(restaurant_id)  # e.g. a menu import during the reload
+            return self.loader(restaurant_id)
+
+        with mock.patch.object(self.registry, "_loader", side_effect=invalidate_then_load):
+            self.registry.get(1)
+        self.assertNotIn(1, self.registry._indexes)
+        self.assertIsNot(self.registry.get(1), first)
+
+
+class RecordingModel:
+    """Encodes numeric strings as [float(text), 1] and records each batch size."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=32):
+        self.batch_sizes.append(len(texts))
+        if "boom" in texts:
+            raise RuntimeError("model failed")
+        return np.array([[float(t), 1.0] for t in texts], dtype=np.float32)
+
+
+class BatchingEncoderTests(SimpleTestCase):
+    def setUp(self):
+        self.model = RecordingModel()
+        # A long wait makes the batches depend only on max_batch_size
+        self.encoder = BatchingEncoder(self.model, max_batch_size=4, max_wait_ms=200)
+        self.addCleanup(self.encoder.close)
+
+    def test_queued_requests_are_encoded_in_batches(self):
+        futures = [self.encoder.submit(str(i)) for i in range(10)]
+        vectors = [f.result(5) for f in futures]
+        self.assertEqual(self.model.batch_sizes, [4, 4, 2])
+        self.assertEqual(self.encoder.stats()["batches"], 3)
+        # Every caller gets the vector for its own text
+        self.assertEqual([v[0] for v in vectors], list(range(10)))
+
+    def test_concurrent_callers_get_their_own_vectors(self):
+        results = {}
+
+        def call(i):
+            results[i] = self.encoder.encode(str(i))
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual({i: v[0] for i, v in results.items()}, {i: float(i) for i in range(8)})
+        self.assertLess(len(self.model.batch_sizes), 8)
+
+    def test_encode_list_keeps_input_order(self):
+        np.testing.assert_array_equal(self.encoder.encode(["3", "1", "2"])[:, 0], [3, 1, 2])
+
+    def test_model_error_reaches_every_caller_in_the_batch(self):
+        futures = [self.encoder.submit(t) for t in ("1", "boom", "2")]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "model failed"):
+                future.result(5)
+        self.assertEqual(self.encoder.stats()["batches"], 0)
+        # The worker survives and serves the next request
+        self.assertEqual(self.encoder.encode("7")[0], 7.0)
+
+    def test_close_drains_then_rejects(self):
+        futures = [self.encoder.submit(str(i)) for i in range(3)]
+        self.encoder.close()
+        self.assertEqual([f.result(0)[0] for f in futures], [0, 1, 2])
+        with self.assertRaises(RuntimeError):
+            self.encoder.submit("4")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncChatbotViewTests(TestCase):
+    def setUp(self):
+        for registry in (name_index_registry, spelling_registry):
+            registry.clear()
+            self.addCleanup(registry.clear)
+        self.llm = FakeLLMBackend(latency_ms=0, error_rate=0, malformed_rate=0)
+        for patcher in (
+            mock.patch.object(engine, "get_llm_backend", return_value=self.llm),
+            mock.patch.object(engine, "_intent_cache", IntentCache(cache_alias=None)),
+            mock.patch.object(engine, "SPECULATIVE_SEARCH", False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.restaurant = Restaurant.objects.create(name="Test Kitchen", phone="123")
+        self.naan = MenuItem.objects.create(restaurant=self.restaurant, name="Butter Naan", price=50)
+
+    async def post(self, message, session_id="sess_test", restaurant_id=None):
+        request = RequestFactory().post(
+            "/api/chatbot/async/",
+            data=json.dumps({
+                "restaurant_id": restaurant_id or self.restaurant.id,
+                "session_id": session_id,
+                "message": message,
+            }),
+            content_type="application/json",
+        )
+        response = await AsyncChatbotView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_rule_command_is_applied_to_the_order(self):
+        status_code, payload = await self.post("add 2 butter naan")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(payload["session_id"], "sess_test")
+        self.assertEqual(
+            [(i["id"], i["quantity"]) for i in payload["order"]["items"]], [(self.naan.id, 2)]
+        )
+        self.assertEqual(self.llm.stats()["calls"], 0)
+
+    async def test_llm_classified_intent_is_applied_to_the_order(self):
+        loader_threads = []
+        load = name_index_registry.loader
+
+        def recording_loader(restaurant_id):
+            loader_threads.append(threading.current_thread())
+            return load(restaurant_id)
+
+        with mock.patch.object(name_index_registry, "loader", recording_loader):
+            status_code, payload = await self.post("I would like butter naan please")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(self.llm.stats()["calls"], 1)
+        self.assertEqual([i["name"] for i in payload["order"]["items"]], ["Butter Naan"])
+        # The ORM read ran on the thread-sensitive executor (the test's sync thread), not in a worker
+        self.assertEqual(loader_threads, [threading.main_thread()])
+
+    async def test_confirm_without_a_pending_order(self):
+        status_code, payload = await self.post("confirm", session_id="sess_empty")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(payload["reply"], "No open order found to confirm.")
+
+    async def test_confirm_with_a_pending_order_creates_the_payment(self):
+        order = await Order.objects.acreate(
+            restaurant=self.restaurant, session_id="sess_pay", status=Order.OrderStatus.PENDING
+        )
+        razorpay = mock.Mock(status_code=200)
+        razorpay.json.return_value = {"key": "rzp_test", "razorpay_order_id": "order_1", "amount": 5000, "currency": "INR"}
+        with mock.patch("chatbot.views.requests.post", return_value=razorpay) as post:
+            status_code, payload = await self.post("confirm order", session_id="sess_pay")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(post.call_args.kwargs["json"], {"order_id": order.id})
+        self.assertEqual(payload["payment"]["order_id"], "order_1")
+
+    async def test_unknown_restaurant(self):
+        status_code, _ = await self.post("menu", restaurant_id=999999)
+        self.assertEqual(status_code, 404)
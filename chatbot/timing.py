@@ -0,0 +1,199 @@
+# chatbot/timing.py
+"""
+Per-request stage timing for the chat path.
+
+Wrap a request in trace() and mark the expensive steps with stage():
+
+    with trace() as t:
+        ...
+        with stage("encode"):
+            model.encode(...)
+    t.stages  # {"encode": [total_ms, count], ...}
+
+The active trace lives in a contextvar, so stages recorded in
+asyncio.to_thread() workers and speculative searches land in the request's
+trace. Outside a trace, stage() returns without reading the clock.
+
+With CHATBOT_TIMING=True the chat views run inside a trace (see timed_view):
+each response gets a Server-Timing header and the durations feed the
+process-wide stage_histograms, scraped in Prometheus text format from
+/api/chatbot/metrics/.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+TIMING_ENABLED = os.getenv("CHATBOT_TIMING", "False") == "True"
+
+# Histogram bucket upper bounds in milliseconds (+Inf is implicit)
+HISTOGRAM_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar(
+    "chatbot_timing_trace", default=None
+)
+
+
+class Trace:
+    """Accumulated milliseconds and call counts per stage for one request."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, elapsed_ms: float):
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [elapsed_ms, 1]
+            else:
+                entry[0] += elapsed_ms
+                entry[1] += 1
+
+    def durations(self) -> Dict[str, float]:
+        """Stage name -> total milliseconds."""
+        with self._lock:
+            return {name: total for name, (total, _) in self.stages.items()}
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace():
+    """Collect stage timings for the enclosed block; nested calls share the outer trace."""
+    outer = _current_trace.get()
+    if outer is not None:
+        yield outer
+        return
+    t = Trace()
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage name of the active trace (if any)."""
+    t = _current_trace.get()
+    if t is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        t.add(name, (time.perf_counter() - start) * 1000)
+
+
+class StageHistograms:
+    """Cumulative per-stage latency histograms, exposed in Prometheus text format."""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = HISTOGRAM_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        # stage -> [bucket counts..., +Inf count], sum ms
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+
+    def observe(self, name: str, elapsed_ms: float):
+        slot = bisect.bisect_left(self.buckets_ms, elapsed_ms)
+        with self._lock:
+            counts = self._counts.get(name)
+            if counts is None:
+                counts = self._counts[name] = [0] * (len(self.buckets_ms) + 1)
+                self._sums[name] = 0.0
+            counts[slot] += 1
+            self._sums[name] += elapsed_ms
+
+    def observe_trace(self, t: Trace, total_ms: float):
+        for name, elapsed_ms in t.durations().items():
+            self.observe(name, elapsed_ms)
+        self.observe("total", total_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, any]]:
+        """stage -> {count, sum_ms, buckets: [(le_ms, cumulative count), ...]}"""
+        with self._lock:
+            counts = {name: list(c) for name, c in self._counts.items()}
+            sums = dict(self._sums)
+        out = {}
+        for name, c in counts.items():
+            cumulative, running = [], 0
+            for le, n in zip(self.buckets_ms + (float("inf"),), c):
+                running += n
+                cumulative.append((le, running))
+            out[name] = {"count": running, "sum_ms": sums[name], "buckets": cumulative}
+        return out
+
+    def render_prometheus(self, metric: str = "chatbot_stage_duration_seconds") -> str:
+        lines = [
+            f"# HELP {metric} Chat request time per stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        for name, data in sorted(self.snapshot().items()):
+            for le, count in data["buckets"]:
+                le_label = "+Inf" if le == float("inf") else repr(le / 1000)
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{le_label}"}} {count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {data["sum_ms"] / 1000:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {data["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+
+stage_histograms = StageHistograms()
+
+
+def server_timing_header(t: Trace, total_ms: float) -> str:
+    """Server-Timing value, e.g. 'classify;dur=251.2, encode;dur=15.3, total;dur=270.9'."""
+    parts = [f"{name};dur={elapsed_ms:.1f}" for name, elapsed_ms in t.durations().items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def _finish(t: Trace, start: float, response):
+    total_ms = (time.perf_counter() - start) * 1000
+    stage_histograms.observe_trace(t, total_ms)
+    if response is not None:
+        response["Server-Timing"] = server_timing_header(t, total_ms)
+    return response
+
+
+def timed_view(method):
+    """
+    Decorate a view's post()/get() (sync or async) to trace it when
+    CHATBOT_TIMING=True, add a Server-Timing header and feed stage_histograms.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            if not TIMING_ENABLED or _current_trace.get() is not None:
+                return await method(*args, **kwargs)
+            start = time.perf_counter()
+            with trace() as t:
+                response = await method(*args, **kwargs)
+            return _finish(t, start, response)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not TIMING_ENABLED or _current_trace.get() is not None:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        with trace() as t:
+            response = method(*args, **kwargs)
+        return _finish(t, start, response)
+    return wrapper
@@ -1,9 +1,11 @@
 # chatbot/urls.py
 from django.urls import path
-from .views import SimpleChatbotView,ChatbotWidgetDemoView,PopularItemsView
+from .views import SimpleChatbotView,AsyncChatbotView,ChatbotWidgetDemoView,PopularItemsView,ChatbotMetricsView
 
 urlpatterns = [
     path("simple/", SimpleChatbotView.as_view(), name="chatbot-simple"),
+    path("async/", AsyncChatbotView.as_view(), name="chatbot-async"),
     path("widget-demo/", ChatbotWidgetDemoView.as_view(), name="chatbot-demo-ui"),
     path("popular-items/", PopularItemsView.as_view(), name="chatbot_popular_items"),
+    path("metrics/", ChatbotMetricsView.as_view(), name="chatbot-metrics"),
 ]
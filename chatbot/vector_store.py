@@ -0,0 +1,386 @@
+# chatbot/vector_store.py
+"""
+Pluggable vector stores for menu_search.ImprovedMenuSearchSystem.
+
+Both stores expose the slice of Chroma's Collection API menu_search uses:
+add(), query(query_embeddings, n_results, where), get(include), count().
+They also share a small lifecycle: open() an existing store, reset()
+to a new empty one, close().
+
+    ChromaVectorStore  a chromadb PersistentClient collection; chromadb is
+                       imported on first use
+    NumpyVectorStore   in-process, three files under the store directory:
+                           <name>.embeddings.npy  float32 (rows x dim)
+                           <name>.metadata.json   metadata as columns, plus documents
+                           <name>.ids.json        row -> item id
+
+menu_search's menus are a few hundred rows. For those, NumpyVectorStore's
+exact scan (one matmul, then the rows the where clause keeps) is faster
+than a Chroma query and opens without a database client. Distances are
+squared L2, Chroma's default space, so menu_search's 1 - distance
+similarity means the same for both.
+
+Where clauses follow Chroma's syntax:
+
+    {"price": {"$lte": 150}}   {"category": "Starters"}   (bare value = $eq)
+    {"$and": [...]}  {"$or": [...]}
+    $eq $ne $gt $gte $lt $lte $in $nin
+
+NumpyVectorStore evaluates them as boolean masks over the metadata columns.
+A row without the field never matches, whatever the operator. Ordering
+operators only match numeric fields.
+
+The backend is chosen by CHATBOT_VECTOR_STORE ("chroma" or "numpy").
+"""
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .index_registry import atomic_save_npy, atomic_write_json, top_k_rows
+
+logger = logging.getLogger(__name__)
+
+
+VECTOR_STORE_BACKEND = os.getenv("CHATBOT_VECTOR_STORE", "chroma")
+
+COLLECTION_NAME = "menu_items"
+
+_COMPARISONS = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+_ORDERING = {"$gt", "$gte", "$lt", "$lte"}
+
+
+class VectorStore(ABC):
+    """Interface; see the module docstring."""
+
+    @abstractmethod
+    def open(self) -> bool:
+        """Load the existing store; False when there is none or it is empty."""
+
+    @abstractmethod
+    def reset(self):
+        """Drop any existing data and start an empty store."""
+
+    @abstractmethod
+    def add(self, ids: Sequence[str], embeddings, metadatas: Sequence[Dict], documents: Optional[Sequence[str]] = None):
+        """Append rows; ids must be new."""
+
+    @abstractmethod
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None) -> Dict:
+        """Chroma-shaped result: ids / distances / metadatas / documents, one list per query."""
+
+    @abstractmethod
+    def get(self, include: Optional[List[str]] = None) -> Dict:
+        """Every row's id plus the included fields."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of rows."""
+
+    def close(self):
+        pass
+
+
+class ChromaVectorStore(VectorStore):
+    """A chromadb collection behind the VectorStore interface."""
+
+    def __init__(self, path: str, name: str = COLLECTION_NAME):
+        self.path = path
+        self.name = name
+        self.client = None
+        self.collection = None
+
+    def _client(self):
+        if self.client is None:
+            import chromadb
+
+            os.makedirs(self.path, exist_ok=True)
+            try:
+                self.client = chromadb.PersistentClient(
+                    path=self.path,
+                    settings=chromadb.Settings(anonymized_telemetry=False)
+                )
+            except Exception:
+                self.client = chromadb.Client(
+                    chroma_db_impl="duckdb+parquet",
+                    persist_directory=self.path
+                )
+        return self.client
+
+    def open(self) -> bool:
+        try:
+            self.collection = self._client().get_collection(self.name)
+            return self.collection.count() > 0
+        except Exception:
+            self.collection = None
+            return False
+
+    def reset(self):
+        client = self._client()
+        try:
+            client.delete_collection(self.name)
+        except Exception:
+            pass
+        self.collection = client.create_collection(name=self.name)
+
+    def add(self, ids, embeddings, metadatas, documents=None):
+        if hasattr(embeddings, "tolist"):
+            embeddings = embeddings.tolist()
+        self.collection.add(ids=list(ids), embeddings=embeddings, metadatas=list(metadatas), documents=documents)
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None) -> Dict:
+        if hasattr(query_embeddings, "tolist"):
+            query_embeddings = query_embeddings.tolist()
+        if where:
+            return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results)
+
+    def get(self, include: Optional[List[str]] = None) -> Dict:
+        return self.collection.get(include=include or ["metadatas"])
+
+    def count(self) -> int:
+        return self.collection.count() if self.collection is not None else 0
+
+    def close(self):
+        try:
+            if self.collection is not None and hasattr(self.collection, "persist"):
+                self.collection.persist()
+        except Exception:
+            pass
+        try:
+            if self.client is not None:
+                if hasattr(self.client, "persist"):
+                    self.client.persist()
+                if hasattr(self.client, "close"):
+                    self.client.close()
+        except Exception:
+            pass
+
+
+class _Column:
+    """One metadata field as arrays: values plus a presence mask."""
+
+    def __init__(self, values: List):
+        self.present = np.array([v is not None for v in values], dtype=bool)
+        kept = [v for v in values if v is not None]
+        if kept and all(isinstance(v, bool) for v in kept):
+            self.kind = "bool"
+            self.values = np.array([bool(v) for v in values], dtype=bool)
+        elif kept and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in kept):
+            self.kind = "number"
+            self.values = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        elif kept and all(isinstance(v, str) for v in kept):
+            self.kind = "str"
+            self.values = np.array(["" if v is None else v for v in values], dtype=str)
+        else:
+            self.kind = "object"
+            self.values = np.empty(len(values), dtype=object)
+            self.values[:] = values
+
+    def _comparable(self, value) -> bool:
+        if self.kind == "bool":
+            return isinstance(value, bool)
+        if self.kind == "number":
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+        if self.kind == "str":
+            return isinstance(value, str)
+        return True
+
+    def compare(self, op: str, value) -> np.ndarray:
+        if op in ("$in", "$nin"):
+            values = [v for v in value if self._comparable(v)]
+            if self.kind == "object":
+                # Object isin compares by ==, so True would match 1; keep types apart
+                hit = np.array([any(type(x) is type(v) and x == v for v in values) for x in self.values], dtype=bool)
+            else:
+                hit = np.isin(self.values, values) if values else np.zeros(len(self.values), dtype=bool)
+            return self.present & (hit if op == "$in" else ~hit)
+        if op not in _COMPARISONS:
+            raise ValueError(f"Unsupported where operator: {op}")
+        if not self._comparable(value) or (op in _ORDERING and self.kind != "number"):
+            return np.zeros(len(self.present), dtype=bool)
+        if self.kind == "object":
+            same = np.array([type(x) is type(value) and x == value for x in self.values], dtype=bool)
+            return self.present & (same if op == "$eq" else ~same)
+        return self.present & _COMPARISONS[op](self.values, value)
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact, in-process vector store persisted as .npy + JSON files."""
+
+    def __init__(self, path: str, name: str = COLLECTION_NAME):
+        self.path = Path(path)
+        self.name = name
+        self._clear()
+
+    def _clear(self):
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        self.sq_norms = np.empty(0, dtype=np.float32)
+        self.metadatas: List[Dict] = []
+        self.documents: List[Optional[str]] = []
+        self.columns: Dict[str, _Column] = {}
+
+    def _file(self, kind: str) -> Path:
+        return self.path / f"{self.name}.{kind}"
+
+    def open(self) -> bool:
+        embeddings_path = self._file("embeddings.npy")
+        if not embeddings_path.exists():
+            return False
+        try:
+            with open(self._file("ids.json"), "r", encoding="utf-8") as f:
+                ids = json.load(f)
+            with open(self._file("metadata.json"), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            embeddings = np.load(embeddings_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not open vector store %s: %s", self.path, e)
+            return False
+
+        fields = stored.get("columns", {})
+        metadatas = [
+            {field: values[row] for field, values in fields.items() if values[row] is not None}
+            for row in range(len(ids))
+        ]
+        self._clear()
+        self._set(ids, embeddings, metadatas, stored.get("documents") or [None] * len(ids))
+        return len(self.ids) > 0
+
+    def reset(self):
+        self._clear()
+        self._persist()
+
+    def _set(self, ids, embeddings, metadatas, documents):
+        self.ids = [str(i) for i in ids]
+        self.row_of = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.sq_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings) if len(self.ids) else np.empty(0, dtype=np.float32)
+        self.metadatas = [dict(m or {}) for m in metadatas]
+        self.documents = list(documents)
+        field_names = list(dict.fromkeys(k for m in self.metadatas for k in m))
+        self.columns = {name: _Column([m.get(name) for m in self.metadatas]) for name in field_names}
+
+    def _persist(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        field_names = list(self.columns)
+        atomic_write_json(
+            self._file("metadata.json"),
+            {
+                "columns": {name: [m.get(name) for m in self.metadatas] for name in field_names},
+                "documents": self.documents,
+            },
+            ensure_ascii=False,
+        )
+        atomic_write_json(self._file("ids.json"), self.ids)
+        # Embeddings last: open() treats the .npy as the store's presence marker
+        atomic_save_npy(self._file("embeddings.npy"), self.embeddings)
+
+    def add(self, ids, embeddings, metadatas, documents=None):
+        ids = [str(i) for i in ids]
+        if not ids:
+            return  # e.g. a restaurant with no available items; Chroma accepts it too
+        counts = Counter(self.ids + ids)
+        duplicates = sorted(i for i in set(ids) if counts[i] > 1)
+        if duplicates:
+            raise ValueError(f"Duplicate ids in vector store add: {duplicates[:10]}")
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        if len(self.ids):
+            embeddings = np.vstack([self.embeddings, embeddings])
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        self._set(self.ids + ids, embeddings, self.metadatas + list(metadatas), self.documents + documents)
+        self._persist()
+
+    def where_mask(self, where: Optional[Dict]) -> np.ndarray:
+        """Rows matching a Chroma-style where clause."""
+        n = len(self.ids)
+        if not where:
+            return np.ones(n, dtype=bool)
+        mask = np.ones(n, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self.where_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for clause in condition:
+                    any_mask |= self.where_mask(clause)
+                mask &= any_mask
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported where operator: {key}")
+            else:
+                column = self.columns.get(key)
+                if column is None:
+                    return np.zeros(n, dtype=bool)
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for op, value in condition.items():
+                    mask &= column.compare(op, value)
+        return mask
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None) -> Dict:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        rows = np.flatnonzero(self.where_mask(where))
+        result = {"ids": [], "distances": [], "metadatas": [], "documents": []}
+        if not len(rows):
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        # Squared L2, as Chroma's default space: |q|^2 + |x|^2 - 2 q.x. One
+        # matmul over every row is cheaper than gathering the filtered rows first
+        dots = (queries @ self.embeddings.T)[:, rows]
+        distances = np.einsum("ij,ij->i", queries, queries)[:, None] + self.sq_norms[rows][None, :] - 2.0 * dots
+        np.maximum(distances, 0.0, out=distances)
+        best, best_distances = top_k_rows(-distances, n_results)
+        for positions, negated in zip(best, best_distances):
+            picked = rows[positions]
+            result["ids"].append([self.ids[r] for r in picked])
+            result["distances"].append((-negated).tolist())
+            result["metadatas"].append([dict(self.metadatas[r]) for r in picked])
+            result["documents"].append([self.documents[r] for r in picked])
+        return result
+
+    def get(self, include: Optional[List[str]] = None) -> Dict:
+        include = include or ["metadatas"]
+        result = {"ids": list(self.ids)}
+        if "metadatas" in include:
+            result["metadatas"] = [dict(m) for m in self.metadatas]
+        if "documents" in include:
+            result["documents"] = list(self.documents)
+        if "embeddings" in include:
+            result["embeddings"] = self.embeddings.copy()
+        return result
+
+    def count(self) -> int:
+        return len(self.ids)
+
+
+VECTOR_STORES = {
+    "chroma": ChromaVectorStore,
+    "numpy": NumpyVectorStore,
+}
+
+
+def make_vector_store(path: str, backend: Optional[str] = None, name: str = COLLECTION_NAME) -> VectorStore:
+    """A store of the given backend (default CHATBOT_VECTOR_STORE) rooted at path."""
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    try:
+        return VECTOR_STORES[backend](path, name)
+    except KeyError:
+        raise ValueError(f"Unknown vector store backend {backend!r}; expected one of {sorted(VECTOR_STORES)}") from None
@@ -1,8 +1,16 @@
 # chatbot/views.py
+import asyncio
+import hmac
+import json
+import logging
+import os
 import uuid
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
 from django.views.generic import TemplateView
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -13,10 +21,14 @@ from rest_framework.permissions import AllowAny
 
 from restaurants.models import Restaurant
 from .serializers import ChatRequestSerializer
-from .engine import parse_message
+from .engine import aparse_message, parse_message
 from .services import apply_intent
+from .timing import stage, stage_histograms, timed_view
+from .rules import route_stats
 from orders.models import Order   # ✅ add this
 
+logger = logging.getLogger(__name__)
+
 
 
 class ChatbotWidgetDemoView(TemplateView):
@@ -28,6 +40,7 @@ class SimpleChatbotView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
 
+    @timed_view
     def post(self, request, *args, **kwargs):
         serializer = ChatRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -41,63 +54,169 @@ class SimpleChatbotView(APIView):
             session_id = f"sess_{uuid.uuid4().hex[:16]}"
 
         # 1️⃣ Parse message → intent
-        result = parse_message(message)
+        result = parse_message(message, restaurant_id=restaurant.id)
 
         # 2️⃣ Handle CONFIRM_ORDER intent separately (payment trigger)
         if result.intent == "CONFIRM_ORDER":
-            order = Order.objects.filter(
-                restaurant=restaurant,
-                session_id=session_id,
-                status=Order.OrderStatus.PENDING,
-            ).first()
+            order = _find_pending_order(restaurant, session_id)
+            if not order:
+                return Response(_no_open_order_payload(session_id), status=status.HTTP_200_OK)
+
+            payments_api = request.build_absolute_uri("/api/payments/create/")
+            payload, status_code = _create_payment_payload(payments_api, order, session_id)
+            return Response(payload, status=status_code)
+
+        # 3️⃣ For all other intents → process normally
+        return Response(_apply_intent_payload(restaurant, session_id, result), status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncChatbotView(View):
+    """
+    Same contract as SimpleChatbotView, served as a native async view.
+
+    The Groq calls are awaited on AsyncGroq, encoding/search run in worker
+    threads and ORM work goes through sync_to_async, so a slow LLM response
+    doesn't hold a worker thread. Run under ASGI to benefit:
+        uvicorn restaurant_backend.asgi:application --workers 4
+    """
+
+    @timed_view
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body or b"{}")
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({"detail": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ChatRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        restaurant_id = serializer.validated_data["restaurant_id"]
+        session_id = serializer.validated_data.get("session_id") or ""
+        message = serializer.validated_data["message"]
+
+        restaurant = await Restaurant.objects.filter(id=restaurant_id).afirst()
+        if restaurant is None:
+            return JsonResponse({"detail": "No Restaurant matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        if not session_id:
+            session_id = f"sess_{uuid.uuid4().hex[:16]}"
+
+        result = await aparse_message(message, restaurant_id=restaurant.id)
+
+        if result.intent == "CONFIRM_ORDER":
+            order = await sync_to_async(_find_pending_order)(restaurant, session_id)
             if not order:
-                return Response(
-                    {"reply": "No open order found to confirm.", "session_id": session_id},
-                    status=status.HTTP_200_OK,
-                )
+                return JsonResponse(_no_open_order_payload(session_id), status=status.HTTP_200_OK)
 
+            # Off the thread-sensitive executor: the payments view may need it
+            # to serve this very request when running under ASGI.
             payments_api = request.build_absolute_uri("/api/payments/create/")
-            try:
-                r = requests.post(payments_api, json={"order_id": order.id})
-                if r.status_code != 200:
-                    # Razorpay create failed → reply politely instead of KeyError
-                    msg = r.json().get("detail", "Unable to create payment.")
-                    return Response(
-                        {
-                            "reply": f"⚠️ Cannot process payment — there should be atleast one order.",
-                            "session_id": session_id,
-                        },
-                        status=status.HTTP_200_OK,
-                    )
-
-                data = r.json()
-
-                return Response(
-                    {
-                        "reply": "Please complete your payment to confirm the order.",
-                        "session_id": session_id,
-                        "payment": {
-                            "key": data["key"],
-                            "order_id": data["razorpay_order_id"],
-                            "amount": data["amount"],
-                            "currency": data["currency"],
-                        },
-                    },
-                    status=status.HTTP_200_OK,
-                )
-            except Exception as e:
-                print("Payment creation error:", e)
-                return Response(
-                    {"reply": "Something went wrong creating the payment."},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
+            payload, status_code = await asyncio.to_thread(
+                _create_payment_payload, payments_api, order, session_id
+            )
+            return JsonResponse(payload, status=status_code)
 
+        payload = await sync_to_async(_apply_intent_payload)(restaurant, session_id, result)
+        return JsonResponse(payload, status=status.HTTP_200_OK)
 
-        # 3️⃣ For all other intents → process normally
+
+LOOPBACK_ADDRESSES = {"127.0.0.1", "::1"}
+
+
+class ChatbotMetricsView(View):
+    """
+    Prometheus scrape endpoint: per-stage latency histograms (filled when
+    CHATBOT_TIMING=True) and intent-route counters.
+
+    GET /api/chatbot/metrics/
+    Staff users are always let in. Set CHATBOT_METRICS_TOKEN to also accept
+    "Authorization: Bearer <token>"; without one, everything else is refused.
+    CHATBOT_METRICS_ALLOW_LOOPBACK=True additionally lets in requests whose
+    REMOTE_ADDR is localhost. Leave it off behind a reverse proxy on the same
+    host, where every outside request arrives from loopback.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = os.getenv("CHATBOT_METRICS_TOKEN")
+        allow_loopback = os.getenv("CHATBOT_METRICS_ALLOW_LOOPBACK", "False") == "True"
+        user = getattr(request, "user", None)
+        is_staff = user is not None and user.is_active and user.is_staff
+        is_local = allow_loopback and request.META.get("REMOTE_ADDR") in LOOPBACK_ADDRESSES
+        if not (is_staff or is_local):
+            if not token:
+                return HttpResponse("Forbidden\n", status=403, content_type="text/plain")
+            supplied = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+                return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+
+        lines = [stage_histograms.render_prometheus()]
+        lines.append("# HELP chatbot_route_total Messages resolved per intent route.")
+        lines.append("# TYPE chatbot_route_total counter")
+        for path, count in sorted(route_stats.snapshot()["counts"].items()):
+            if ":" not in path:
+                lines.append(f'chatbot_route_total{{route="{path}"}} {count}')
+        return HttpResponse(
+            "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+def _find_pending_order(restaurant, session_id):
+    return Order.objects.filter(
+        restaurant=restaurant,
+        session_id=session_id,
+        status=Order.OrderStatus.PENDING,
+    ).first()
+
+
+def _no_open_order_payload(session_id):
+    return {"reply": "No open order found to confirm.", "session_id": session_id}
+
+
+def _create_payment_payload(payments_api, order, session_id):
+    """Create the Razorpay order via the payments API; returns (payload, status)."""
+    try:
+        r = requests.post(payments_api, json={"order_id": order.id})
+        if r.status_code != 200:
+            # Razorpay create failed → reply politely instead of KeyError
+            return (
+                {
+                    "reply": f"⚠️ Cannot process payment — there should be atleast one order.",
+                    "session_id": session_id,
+                },
+                status.HTTP_200_OK,
+            )
+
+        data = r.json()
+
+        return (
+            {
+                "reply": "Please complete your payment to confirm the order.",
+                "session_id": session_id,
+                "payment": {
+                    "key": data["key"],
+                    "order_id": data["razorpay_order_id"],
+                    "amount": data["amount"],
+                    "currency": data["currency"],
+                },
+            },
+            status.HTTP_200_OK,
+        )
+    except Exception as e:
+        logger.exception("Payment creation error: %s", e)
+        return (
+            {"reply": "Something went wrong creating the payment."},
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+def _apply_intent_payload(restaurant, session_id, result):
+    """Apply a non-payment intent to the session's order and build the chat response."""
+    with stage("db"):
         reply_text, order = apply_intent(restaurant, session_id, result)
 
-        # 4️⃣ Prepare order snapshot
+    # Prepare order snapshot
+    with stage("serialize"):
         items_data = [
             {
                 "id": item.menu_item.id,
@@ -118,15 +237,11 @@ class SimpleChatbotView(APIView):
             "items": items_data,
         }
 
-        # 5️⃣ Return chat response
-        return Response(
-            {
-                "reply": reply_text,
-                "session_id": session_id,
-                "order": order_data,
-            },
-            status=status.HTTP_200_OK,
-        )
+    return {
+        "reply": reply_text,
+        "session_id": session_id,
+        "order": order_data,
+    }
 
 class PopularItemsView(APIView):
     """
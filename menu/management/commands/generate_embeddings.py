@@ -2,35 +2,51 @@
 """
 Django management command to generate embeddings from MenuItem database.
 
+Each restaurant gets its own index directory (<output-dir>/<restaurant_id>/)
+so the chatbot only searches that restaurant's menu.
+
 Usage:
     python manage.py generate_embeddings
     python manage.py generate_embeddings --restaurant-id 1
     python manage.py generate_embeddings --output-dir /path/to/embeddings
+    python manage.py generate_embeddings --store-dtype float16
 """
 
-import json
-import numpy as np
 from pathlib import Path
+from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
 from sentence_transformers import SentenceTransformer
 
+from chatbot.index_registry import (
+    EMBEDDINGS_DIR,
+    EMBEDDINGS_FILENAME,
+    CHUNKS_FILENAME,
+    COLUMNS_FILENAME,
+    METADATA_FILENAME,
+    MenuColumns,
+    atomic_save_npy,
+    atomic_write_json,
+    index_dir,
+    remove_quantized_stores,
+    write_manifest,
+)
 from menu.models import MenuItem
 
 
 class Command(BaseCommand):
-    help = 'Generate embeddings for menu items for AI-powered chatbot'
+    help = 'Generate per-restaurant embeddings for menu items for AI-powered chatbot'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--restaurant-id',
             type=int,
-            help='Generate embeddings for specific restaurant only',
+            help='Generate embeddings for specific restaurant only (default: every restaurant)',
         )
         parser.add_argument(
             '--output-dir',
             type=str,
-            default='.',
-            help='Directory to save embeddings (default: project root)',
+            default=str(EMBEDDINGS_DIR),
+            help=f'Base directory for per-restaurant indexes (default: {EMBEDDINGS_DIR})',
         )
         parser.add_argument(
             '--model',
@@ -38,83 +54,125 @@ class Command(BaseCommand):
             default='sentence-transformers/all-mpnet-base-v2',
             help='Sentence transformer model to use',
         )
+        parser.add_argument(
+            '--store-dtype',
+            choices=['float32', 'float16', 'int8'],
+            default='float32',
+            help='Also write a memory-mapped float16/int8 store (see quantize_embeddings)',
+        )
 
     def handle(self, *args, **options):
         restaurant_id = options.get('restaurant_id')
         output_dir = Path(options['output_dir'])
         model_name = options['model']
-
-        # Create output directory if needed
-        output_dir.mkdir(parents=True, exist_ok=True)
+        store_dtype = options['store_dtype']
 
         # Build queryset
         qs = MenuItem.objects.filter(available=True)
-        self.stdout.write("yes")
         if restaurant_id:
             qs = qs.filter(restaurant_id=restaurant_id)
             self.stdout.write(f"Filtering by restaurant_id={restaurant_id}")
-            self.stdout.write("yes")
+
+        restaurant_ids = sorted(set(qs.values_list('restaurant_id', flat=True)))
+        if not restaurant_ids:
+            raise CommandError(
+                "No menu items found! "
+                "Make sure you have MenuItem objects with available=True"
+            )
+
+        # Load model once for every restaurant
+        self.stdout.write(f"Loading model: {model_name}...")
+        model = SentenceTransformer(model_name)
+
+        total_items = 0
+        for rid in restaurant_ids:
+            total_items += self._build_index(
+                model, model_name, rid, qs.filter(restaurant_id=rid), output_dir
+            )
+            if store_dtype != 'float32':
+                # Writes the reduced-precision store and bumps the manifest
+                call_command(
+                    'quantize_embeddings',
+                    dtype=store_dtype,
+                    restaurant_id=rid,
+                    output_dir=str(output_dir),
+                    stdout=self.stdout,
+                )
+            else:
+                version = write_manifest(index_dir(rid, output_dir), model=model_name, store='float32')
+                self.stdout.write(self.style.SUCCESS(f"✓ Published index version {version}"))
+
+        # Summary
+        self.stdout.write("\n" + "="*50)
+        self.stdout.write(self.style.SUCCESS("✅ Embeddings generated successfully!"))
+        self.stdout.write("="*50)
+        self.stdout.write(f"Restaurants processed: {len(restaurant_ids)}")
+        self.stdout.write(f"Items processed: {total_items}")
+        self.stdout.write(f"Output directory: {output_dir.absolute()}")
+        self.stdout.write("\nNext steps:")
+        self.stdout.write("1. Make sure GROQ_API_KEY is set in your .env")
+        self.stdout.write("2. Set CHATBOT_EMBEDDINGS_DIR if you used a custom --output-dir")
+        self.stdout.write("3. Test: python manage.py runserver")
+        self.stdout.write("4. Try: curl -X POST http://localhost:8000/api/chatbot/simple/ \\")
+        self.stdout.write('     -H "Content-Type: application/json" \\')
+        self.stdout.write('     -d \'{"restaurant_id": 1, "message": "I want something spicy"}\'')
+
+    def _build_index(self, model, model_name, restaurant_id, qs, output_dir) -> int:
+        """Encode one restaurant's menu and write its index directory."""
+        out_dir = index_dir(restaurant_id, output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
 
         # Extract text chunks
-        self.stdout.write("Extracting menu items...")
+        self.stdout.write(f"\nRestaurant {restaurant_id}: extracting menu items...")
         chunks = []
         item_ids = []
-        
-        for item in qs.select_related('restaurant'):
+        rows = []
+
+        for item in qs.order_by('id'):
             text = f"Category: {item.category}. Item: {item.name}. Price: {item.price}"
             chunks.append(text)
             item_ids.append(item.id)
-
-        if not chunks:
-            raise CommandError(
-                "No menu items found! "
-                "Make sure you have MenuItem objects with is_available=True"
-            )
+            rows.append({
+                "id": item.id,
+                "name": item.name,
+                "category": item.category,
+                "price": item.price,
+                "is_vegetarian": item.is_vegetarian,
+                "is_vegan": item.is_vegan,
+                "ingredients": item.ingredients,
+            })
 
         self.stdout.write(self.style.SUCCESS(f"✓ Extracted {len(chunks)} menu items"))
 
-        # Load model and generate embeddings
-        self.stdout.write(f"Loading model: {model_name}...")
-        model = SentenceTransformer(model_name)
-        
         self.stdout.write("Generating embeddings...")
         embeddings = model.encode(chunks, convert_to_numpy=True, show_progress_bar=True)
 
-        # Save embeddings
-        embeddings_path = output_dir / "menu_embeddings.npy"
-        np.save(embeddings_path, embeddings)
+        # Save embeddings (and drop old reduced-precision copies, which would shadow them)
+        remove_quantized_stores(out_dir)
+        embeddings_path = out_dir / EMBEDDINGS_FILENAME
+        atomic_save_npy(embeddings_path, embeddings)
         self.stdout.write(self.style.SUCCESS(f"✓ Saved: {embeddings_path}"))
         self.stdout.write(f"  Shape: {embeddings.shape}")
 
         # Save text chunks
-        chunks_path = output_dir / "text_chunks.json"
-        with open(chunks_path, "w", encoding="utf-8") as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+        chunks_path = out_dir / CHUNKS_FILENAME
+        atomic_write_json(chunks_path, chunks, indent=2, ensure_ascii=False)
         self.stdout.write(self.style.SUCCESS(f"✓ Saved: {chunks_path}"))
 
+        # Save columnar item metadata (index row → MenuItem id, name, price, ...)
+        columns_path = out_dir / COLUMNS_FILENAME
+        MenuColumns.from_items(rows).save(columns_path)
+        self.stdout.write(self.style.SUCCESS(f"✓ Saved: {columns_path}"))
+
         # Save metadata (mapping chunk index to MenuItem ID)
-        metadata_path = output_dir / "embedding_metadata.json"
+        metadata_path = out_dir / METADATA_FILENAME
         metadata = {
             "model": model_name,
             "total_items": len(chunks),
             "restaurant_id": restaurant_id,
             "item_ids": item_ids,  # Maps index → MenuItem.id
         }
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2)
+        atomic_write_json(metadata_path, metadata, indent=2)
         self.stdout.write(self.style.SUCCESS(f"✓ Saved: {metadata_path}"))
 
-        # Summary
-        self.stdout.write("\n" + "="*50)
-        self.stdout.write(self.style.SUCCESS("✅ Embeddings generated successfully!"))
-        self.stdout.write("="*50)
-        self.stdout.write(f"Items processed: {len(chunks)}")
-        self.stdout.write(f"Embedding dimensions: {embeddings.shape[1]}")
-        self.stdout.write(f"Output directory: {output_dir.absolute()}")
-        self.stdout.write("\nNext steps:")
-        self.stdout.write("1. Make sure GROQ_API_KEY is set in your .env")
-        self.stdout.write("2. Update chatbot/engine.py paths if needed")
-        self.stdout.write("3. Test: python manage.py runserver")
-        self.stdout.write("4. Try: curl -X POST http://localhost:8000/api/chatbot/simple/ \\")
-        self.stdout.write('     -H "Content-Type: application/json" \\')
-        self.stdout.write('     -d \'{"restaurant_id": 1, "message": "I want something spicy"}\'')
+        return len(chunks)
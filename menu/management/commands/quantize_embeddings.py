@@ -0,0 +1,206 @@
+# menu/management/commands/quantize_embeddings.py
+"""
+Django management command to write reduced-precision, memory-mappable copies
+of the per-restaurant embedding indexes and report the recall cost.
+
+Workers open menu_embeddings.f16.npy / menu_embeddings.i8.npy with
+mmap_mode='r', so all processes on a host share one copy via the page cache.
+
+Recall is measured on held-out customer queries (benchmarks/chat_corpus.txt
+by default), encoded with the model each index was built with (its
+embedding_metadata.json), not on the menu's own vectors.
+
+Usage:
+    python manage.py quantize_embeddings --dtype float16
+    python manage.py quantize_embeddings --dtype int8 --restaurant-id 1
+    python manage.py quantize_embeddings --queries my_queries.txt
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.index_registry import (
+    EMBEDDINGS_DIR,
+    EMBEDDINGS_FILENAME,
+    F16_EMBEDDINGS_FILENAME,
+    I8_EMBEDDINGS_FILENAME,
+    I8_SCALES_FILENAME,
+    METADATA_FILENAME,
+    MenuIndex,
+    index_dir,
+    read_manifest,
+    recall_at_k,
+    write_manifest,
+    write_quantized_store,
+)
+from chatbot.rules import match_rules
+
+
+DEFAULT_QUERIES = Path(settings.BASE_DIR) / "benchmarks" / "chat_corpus.txt"
+
+
+def load_search_queries(path: Path):
+    """
+    Search terms from a file of chat messages (one per line, '#' comments),
+    as the chatbot would search them: add/remove commands contribute their
+    item name, other rule-handled commands ("menu", "cart") never search.
+    """
+    queries = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        rule = match_rules(line)
+        if rule is None:
+            queries.append(line)
+        elif rule["item_name"]:
+            queries.append(rule["item_name"])
+    return list(dict.fromkeys(queries))
+
+
+def index_model_name(directory: Path) -> str:
+    """Model an index directory was encoded with (metadata, then manifest, then the chatbot's)."""
+    metadata_path = Path(directory) / METADATA_FILENAME
+    if metadata_path.exists():
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            model_name = json.load(f).get("model")
+        if model_name:
+            return model_name
+    model_name = read_manifest(directory).get("model")
+    if model_name:
+        return model_name
+    from chatbot.engine import MODEL_NAME
+
+    return MODEL_NAME
+
+
+class Command(BaseCommand):
+    help = 'Write float16/int8 memory-mapped embedding stores and report recall@k vs float32'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dtype',
+            choices=['float16', 'int8'],
+            default='float16',
+            help='Reduced-precision format to write (default: float16)',
+        )
+        parser.add_argument(
+            '--restaurant-id',
+            type=int,
+            help='Quantize one restaurant only (default: every index under --output-dir)',
+        )
+        parser.add_argument(
+            '--output-dir',
+            type=str,
+            default=str(EMBEDDINGS_DIR),
+            help=f'Base directory of per-restaurant indexes (default: {EMBEDDINGS_DIR})',
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=5,
+            help='k for the recall@k report (default: 5)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=str,
+            default=str(DEFAULT_QUERIES),
+            help='Chat messages used as recall@k queries, one per line (default: benchmarks/chat_corpus.txt)',
+        )
+
+    def handle(self, *args, **options):
+        dtype = options['dtype']
+        base_dir = Path(options['output_dir'])
+        k = options['k']
+
+        if options.get('restaurant_id'):
+            directories = [index_dir(options['restaurant_id'], base_dir)]
+        else:
+            directories = sorted(p for p in base_dir.iterdir() if p.is_dir()) if base_dir.exists() else []
+        directories = [d for d in directories if (d / EMBEDDINGS_FILENAME).exists()]
+
+        if not directories:
+            raise CommandError(
+                f"No {EMBEDDINGS_FILENAME} found under {base_dir}. Run generate_embeddings first."
+            )
+
+        queries_path = Path(options['queries'])
+        if not queries_path.exists():
+            raise CommandError(f"Query file {queries_path} not found")
+        queries = load_search_queries(queries_path)
+        if not queries:
+            raise CommandError(f"No search queries in {queries_path}")
+
+        # Queries are encoded once per model; indexes built with different models can't share vectors
+        query_vectors = {}
+        for directory in directories:
+            model_name = index_model_name(directory)
+            if model_name not in query_vectors:
+                self.stdout.write(f"Encoding {len(queries)} held-out queries from {queries_path} with {model_name}...")
+                query_vectors[model_name] = self.encode_queries(model_name, queries)
+            self.quantize_directory(directory, dtype, query_vectors[model_name], k, model_name=model_name)
+
+    def encode_queries(self, model_name: str, queries):
+        from chatbot.caches import query_embedding_cache
+        from chatbot.engine import MODEL_NAME, get_embed_model
+
+        if model_name == MODEL_NAME:
+            model = get_embed_model()
+        else:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_name)
+        return query_embedding_cache.encode_many(model, queries, model_name)
+
+    def quantize_directory(
+        self, directory: Path, dtype: str, query_vectors: np.ndarray, k: int = 5, model_name: str = None
+    ):
+        """
+        Write one directory's reduced-precision store and print its size and
+        recall@k over query_vectors (unit-length rows, same model as the index).
+        """
+        embeddings = np.load(directory / EMBEDDINGS_FILENAME)
+        if query_vectors.shape[1] != embeddings.shape[1]:
+            raise CommandError(
+                f"{directory}: index vectors have {embeddings.shape[1]} dimensions but the queries have "
+                f"{query_vectors.shape[1]}; encode them with the model the index was built with"
+            )
+        path = write_quantized_store(directory, dtype, embeddings)
+
+        # Drop the other format so the loader can't pick a stale file
+        other = [I8_EMBEDDINGS_FILENAME, I8_SCALES_FILENAME] if dtype == 'float16' else [F16_EMBEDDINGS_FILENAME]
+        for name in other:
+            if (directory / name).exists():
+                (directory / name).unlink()
+
+        chunks = [""] * len(embeddings)
+        reference = MenuIndex(restaurant_id=None, embeddings=embeddings, text_chunks=chunks)
+        quantized = np.load(path, mmap_mode='r')
+        scales = np.load(directory / I8_SCALES_FILENAME) if dtype == 'int8' else None
+        candidate = MenuIndex(restaurant_id=None, embeddings=quantized, text_chunks=chunks, scales=scales)
+
+        recall = recall_at_k(reference, candidate, query_vectors, k)
+
+        # Vector bytes only: both indexes carry the same columns, BM25 and chunks
+        store_bytes = candidate.embeddings.nbytes + (scales.nbytes if scales is not None else 0)
+        self.stdout.write(self.style.SUCCESS(f"✓ Saved: {path}"))
+        self.stdout.write(
+            f"  {len(embeddings)} vectors, "
+            f"{reference.embeddings.nbytes / 1024:.0f} KiB float32 -> {store_bytes / 1024:.0f} KiB {dtype}"
+        )
+        self.stdout.write(f"  recall@{k} vs float32 over {len(query_vectors)} queries: {recall:.4f}")
+
+        # Publish last: workers swap to the new store when the manifest changes
+        # Keep what generate_embeddings recorded (model, ...) and replace the store fields
+        fields = {
+            key: value for key, value in read_manifest(directory).items() if key not in ("version", "updated_at")
+        }
+        if model_name:
+            fields["model"] = model_name
+        fields.update(store=dtype, recall_at_k={str(k): round(recall, 4)})
+        version = write_manifest(directory, **fields)
+        self.stdout.write(self.style.SUCCESS(f"✓ Published index version {version}"))
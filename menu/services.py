@@ -7,6 +7,7 @@ from django.utils import timezone
 from django.utils.text import slugify
 from django.core.files.base import ContentFile
 from .models import MenuItem
+from chatbot.signals import menu_imported
 from restaurants.menu_extractor import extract_menu_to_json  # <- function import
 
 def _coerce(row: dict):
@@ -57,6 +58,7 @@ def build_menu_from_pdf(restaurant, *, save_json_to_field=True, purge_missing=Fa
                     updated += int(not was_created)
                 except Exception:
                     skipped += 1
+            menu_imported(restaurant.pk)
 
         # 3) Save JSON snapshot (optional)
         if save_json_to_field:
@@ -1,3 +1,86 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from chatbot.index_registry import (
+    EMBEDDINGS_FILENAME,
+    F16_EMBEDDINGS_FILENAME,
+    I8_EMBEDDINGS_FILENAME,
+    METADATA_FILENAME,
+    read_manifest,
+    write_manifest,
+)
+from menu.management.commands.quantize_embeddings import Command, index_model_name, load_search_queries
+
+
+class QuantizeEmbeddingsTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        rng = np.random.default_rng(0)
+        self.embeddings = rng.standard_normal((200, 64)).astype(np.float32)
+        np.save(self.directory / EMBEDDINGS_FILENAME, self.embeddings)
+        self.queries = rng.standard_normal((30, 64)).astype(np.float32)
+        self.queries /= np.linalg.norm(self.queries, axis=1, keepdims=True)
+
+    def quantize(self, dtype):
+        out = StringIO()
+        command = Command(stdout=out)
+        command.quantize_directory(self.directory, dtype, self.queries, k=5)
+        return out.getvalue()
+
+    def test_reports_vector_bytes_and_held_out_recall(self):
+        output = self.quantize("float16")
+        self.assertTrue((self.directory / F16_EMBEDDINGS_FILENAME).exists())
+        # 200 x 64 float32 = 50 KiB, float16 = 25 KiB; columns/BM25/chunks are not counted
+        self.assertIn("50 KiB float32 -> 25 KiB float16", output)
+        self.assertIn("recall@5 vs float32 over 30 queries", output)
+
+    def test_int8_counts_scales_and_drops_other_store(self):
+        self.quantize("float16")
+        output = self.quantize("int8")
+        self.assertTrue((self.directory / I8_EMBEDDINGS_FILENAME).exists())
+        self.assertFalse((self.directory / F16_EMBEDDINGS_FILENAME).exists())
+        # 200 x 64 int8 + 200 float32 scales = 13.3 KiB
+        self.assertIn("-> 13 KiB int8", output)
+
+    def test_load_search_queries_uses_what_the_chatbot_searches(self):
+        path = self.directory / "queries.txt"
+        path.write_text("# comment\nmenu\nadd 2 paneer tikka\n\nspicy veg starters\nspicy veg starters\ncart\n")
+        self.assertEqual(load_search_queries(path), ["paneer tikka", "spicy veg starters"])
+
+    def test_manifest_keeps_generate_embeddings_fields(self):
+        write_manifest(self.directory, model="small-model", store="float32")
+        self.quantize("float16")
+        manifest = read_manifest(self.directory)
+        self.assertEqual(manifest["version"], 2)
+        self.assertEqual((manifest["model"], manifest["store"]), ("small-model", "float16"))
+        self.assertIn("5", manifest["recall_at_k"])
+
+    def test_queries_from_another_model_are_rejected_before_writing(self):
+        with self.assertRaises(CommandError):
+            Command(stdout=StringIO()).quantize_directory(self.directory, "float16", self.queries[:, :32], k=5)
+        self.assertFalse((self.directory / F16_EMBEDDINGS_FILENAME).exists())
+        self.assertEqual(read_manifest(self.directory), {})
+
+    def test_queries_are_encoded_with_the_index_model(self):
+        directory = self.directory / "1"
+        directory.mkdir()
+        np.save(directory / EMBEDDINGS_FILENAME, self.embeddings)
+        (directory / METADATA_FILENAME).write_text(json.dumps({"model": "small-model", "restaurant_id": 1}))
+        queries = self.directory / "queries.txt"
+        queries.write_text("spicy veg starters\n")
+        self.assertEqual(index_model_name(directory), "small-model")
+        with mock.patch.object(Command, "encode_queries", return_value=self.queries) as encode:
+            call_command("quantize_embeddings", output_dir=str(self.directory), queries=str(queries), stdout=StringIO())
+        encode.assert_called_once_with("small-model", ["spicy veg starters"])
+        self.assertEqual(read_manifest(directory)["model"], "small-model")
@@ -4,47 +4,52 @@ Improved semantic search with fuzzy matching and better ranking
 """
 
 import json
+import logging
 import os
 import time
 import gc
 import shutil
-from typing import List, Dict, Optional, Tuple
-import re
-from difflib import SequenceMatcher
+from typing import List, Dict, Optional
 
-import chromadb
 from sentence_transformers import SentenceTransformer
-import numpy as np
+
+from chatbot.automaton import KeywordAutomaton, KeywordHits
+from chatbot.caches import query_embedding_cache
+from chatbot.fuzzy import fuzzy_score
+from chatbot.lexical import tokenize
+from chatbot.query_parser import QueryParser
+from chatbot.rerank import BOOST_KEYWORDS, MenuFeatures, MenuReranker
+from chatbot.vector_store import VectorStore, make_vector_store
+
+logger = logging.getLogger("menu_search")
 
 
 class ImprovedMenuSearchSystem:
     """Enhanced search with better understanding and ranking"""
 
-    def __init__(self, db_path: str = "./chroma_db"):
+    def __init__(self, db_path: str = "./chroma_db", backend: Optional[str] = None):
         """Initialize with improved model and systems"""
         
-        self.client: Optional[object] = None
-        self.collection = None
+        # Vector store: Chroma or the in-process NumPy store (CHATBOT_VECTOR_STORE)
+        self.store: VectorStore = make_vector_store(db_path, backend)
+        self.collection: Optional[VectorStore] = None
         self.db_path = db_path
         
         # Use a better model for embeddings
         self.model_name = "sentence-transformers/all-mpnet-base-v2"
 
-        print(f"Initializing Enhanced Menu Search System...")
-        print(f"  Database: {db_path}")
-        print(f"  Model: {self.model_name}")
+        logger.info("Initializing Enhanced Menu Search System (database %s, model %s)", db_path, self.model_name)
         
         # Load embedding model
-        print("  Loading model...")
         self.model = SentenceTransformer(self.model_name)
         test_embedding = self.model.encode("test", convert_to_numpy=True)
         self.embedding_dim = len(test_embedding)
-        print(f"  Model dimension: {self.embedding_dim}")
+        logger.info("Model dimension: %d", self.embedding_dim)
         
         # Initialize query enhancement system
         self._init_query_system()
         
-        print("✔ Ready\n")
+        logger.info("Menu search ready")
 
     def _init_query_system(self):
         """Initialize comprehensive query enhancement"""
@@ -112,59 +117,55 @@ class ImprovedMenuSearchSystem:
             'salad': 'salad fresh vegetables healthy greens raw',
         }
         
+        # Food terms added when they appear inside a longer query word
+        self.food_terms = ['paneer', 'chicken', 'rice', 'noodles', 'dosa', 'idli', 
+                           'pasta', 'burger', 'sandwich', 'tea', 'coffee']
+        self.food_term_set = frozenset(self.food_terms)
+        
+        # Every expansion, food term and rerank boost keyword, matched in one pass
+        # over the query; replaced by the reranker's (which adds the menu's
+        # ingredients) once the database is loaded
+        self.expansion_keywords = list(self.query_expansions) + self.food_terms
+        self.keyword_automaton = KeywordAutomaton(self.expansion_keywords + BOOST_KEYWORDS)
+        
         # Fuzzy matching threshold
         self.fuzzy_threshold = 0.6
         
-        # Price extraction patterns
-        self.price_patterns = [
-            (r'under\s+(\d+)', lambda x: float(x)),
-            (r'below\s+(\d+)', lambda x: float(x)),
-            (r'less\s+than\s+(\d+)', lambda x: float(x)),
-            (r'cheaper\s+than\s+(\d+)', lambda x: float(x)),
-            (r'within\s+(\d+)', lambda x: float(x)),
-            (r'max\s+(\d+)', lambda x: float(x)),
-            (r'maximum\s+(\d+)', lambda x: float(x)),
-            (r'upto\s+(\d+)', lambda x: float(x)),
-            (r'around\s+(\d+)', lambda x: float(x) * 1.2),
-        ]
-
-    def ensure_client(self):
-        """Create chromadb client if needed"""
-        if self.client is not None:
-            return
-
-        os.makedirs(self.db_path, exist_ok=True)
+        # Price / diet / category constraints in queries ("veg starters under 150");
+        # rebuilt with the menu's categories once the database is loaded
+        self.query_parser = QueryParser()
+        
+        # Per-item ranking features, precomputed from the collection
+        self.reranker: Optional[MenuReranker] = None
 
+    def _load_vocabulary(self):
+        """Teach the query parser this menu's categories and item names; build rerank features"""
+        
         try:
-            self.client = chromadb.PersistentClient(
-                path=self.db_path,
-                settings=chromadb.Settings(anonymized_telemetry=False)
-            )
-        except:
-            self.client = chromadb.Client(
-                chroma_db_impl="duckdb+parquet",
-                persist_directory=self.db_path
-            )
+            stored = self.collection.get(include=["metadatas"])
+        except Exception as e:
+            logger.warning("Could not read menu vocabulary: %s", e)
+            return
+        ids = stored.get("ids") or []
+        metadatas = stored.get("metadatas") or []
+        categories = {m.get("category") for m in metadatas if m.get("category")}
+        name_words = {token for m in metadatas for token in tokenize(m.get("name", ""))}
+        self.query_parser = QueryParser(categories, name_words)
+        self.reranker = MenuReranker(MenuFeatures(ids, metadatas), self.fuzzy_threshold, self.expansion_keywords)
+        self.keyword_automaton = self.reranker.automaton
 
     def create_database(self, menu_json_path: str):
         """Create enhanced database with rich embeddings"""
         
-        self.ensure_client()
-
-        # Delete existing collection
-        try:
-            self.client.delete_collection("menu_items")
-        except:
-            pass
-
-        # Create new collection
-        self.collection = self.client.create_collection(name="menu_items")
+        # Replace any existing collection with an empty one
+        self.store.reset()
+        self.collection = self.store
 
         # Load JSON
         with open(menu_json_path, 'r', encoding='utf-8') as f:
             items = json.load(f)
 
-        print(f"Creating enhanced database with {len(items)} items...")
+        logger.info("Creating enhanced database with %d items", len(items))
 
         ids = []
         metadatas = []
@@ -257,7 +258,7 @@ class ImprovedMenuSearchSystem:
         
         # Generate embeddings in batches
         batch_size = 32
-        print("Generating embeddings...")
+        logger.info("Generating embeddings...")
         
         for i in range(0, len(documents), batch_size):
             batch_docs = documents[i:i+batch_size]
@@ -269,10 +270,10 @@ class ImprovedMenuSearchSystem:
             embeddings.extend(batch_embeddings.tolist())
             
             if (i // batch_size + 1) % 10 == 0:
-                print(f"  Processed {min(i+batch_size, len(documents))}/{len(documents)} items")
+                logger.debug("Processed %d/%d items", min(i + batch_size, len(documents)), len(documents))
         
         # Add to collection
-        print("Adding to database...")
+        logger.info("Adding to database...")
         self.collection.add(
             ids=ids,
             embeddings=embeddings,
@@ -280,43 +281,38 @@ class ImprovedMenuSearchSystem:
             documents=documents
         )
         
-        print(f"✔ Database created with {len(items)} items")
+        logger.info("Database created with %d items", len(items))
+        self._load_vocabulary()
 
     def load_database(self) -> bool:
         """Load existing database"""
         
-        self.ensure_client()
-        
-        try:
-            self.collection = self.client.get_collection("menu_items")
-            count = self.collection.count()
-            
-            if count > 0:
-                print(f"✔ Loaded database with {count} items")
-                return True
-            else:
-                return False
-        except:
+        if not self.store.open():
             return False
+        
+        self.collection = self.store
+        logger.info("Loaded database with %d items", self.collection.count())
+        self._load_vocabulary()
+        return True
 
-    def enhance_query(self, query: str) -> str:
-        """Enhance query with synonyms and expansions"""
+    def enhance_query(self, query: str, hits: Optional[KeywordHits] = None) -> str:
+        """Enhance query with synonyms and expansions (hits: keyword_automaton scan of the query)"""
         
         query_lower = query.lower()
-        words = query_lower.split()
+        if hits is None:
+            hits = self.keyword_automaton.scan(query_lower)
         
         enhanced_terms = [query_lower]  # Keep original
         
-        # Expand known terms
-        for word in words:
+        # Expand known terms (whole query words only)
+        for word in hits.words:
             if word in self.query_expansions:
                 enhanced_terms.append(self.query_expansions[word])
         
         # Add partial matches for common food terms
-        food_terms = ['paneer', 'chicken', 'rice', 'noodles', 'dosa', 'idli', 
-                     'pasta', 'burger', 'sandwich', 'tea', 'coffee']
-        for term in food_terms:
-            if term in query_lower and term not in words:
+        present = hits.among(self.food_term_set)
+        for term in self.food_terms:
+            if term in present and term not in hits.words:
                 enhanced_terms.append(term)
         
         # Combine all enhanced terms
@@ -325,26 +321,9 @@ class ImprovedMenuSearchSystem:
         return enhanced_query
 
     def fuzzy_match_score(self, query: str, text: str) -> float:
-        """Calculate fuzzy matching score between query and text"""
-        
-        query_lower = query.lower()
-        text_lower = text.lower()
-        
-        # Exact substring match
-        if query_lower in text_lower:
-            return 1.0
+        """Calculate fuzzy matching score between query and text (bigram Dice, 0-1)"""
         
-        # Word-level fuzzy matching
-        query_words = query_lower.split()
-        text_words = text_lower.split()
-        
-        max_score = 0.0
-        for q_word in query_words:
-            for t_word in text_words:
-                score = SequenceMatcher(None, q_word, t_word).ratio()
-                max_score = max(max_score, score)
-        
-        return max_score
+        return fuzzy_score(query, text)
 
     def search(
         self,
@@ -357,45 +336,61 @@ class ImprovedMenuSearchSystem:
     ) -> List[Dict]:
         """Enhanced search with multiple strategies"""
         
-        if not self.collection:
+        if self.collection is None:
             if not self.load_database():
                 return []
         
-        # Enhance query
-        enhanced_query = self.enhance_query(query)
-        
-        # Generate query embedding
-        query_embedding = self.model.encode(enhanced_query, convert_to_numpy=True)
+        # Pull price / diet / category constraints out of the text; they become
+        # where filters and only the rest of the query is embedded
+        parsed = self.query_parser.parse(query)
+        search_text = query
+        min_price = None
+        non_vegetarian = False
+        categories = [category] if category else []
+        if parsed.matched:
+            search_text = parsed.embed_text
+            found = parsed.filters
+            if found.max_price is not None:
+                max_price = found.max_price if max_price is None else min(max_price, found.max_price)
+            min_price = found.min_price
+            vegetarian_only = vegetarian_only or found.vegetarian
+            vegan_only = vegan_only or found.vegan
+            non_vegetarian = found.non_vegetarian
+            if not categories:
+                categories = list(found.categories)
+        
+        # One keyword scan serves both the expansion and the rerank boosts
+        # unless constraints were stripped from the embedded text
+        hits = self.keyword_automaton.scan(query.lower())
         
-        # Build filters
-        where_filter = {}
-        
-        if vegetarian_only:
-            where_filter["is_vegetarian"] = True
+        # Enhance query
+        enhanced_query = self.enhance_query(search_text, hits if search_text == query else None)
         
-        if vegan_only:
-            where_filter["is_vegan"] = True
+        # Generate query embedding (memoized across searches and the chatbot engine)
+        query_embedding = query_embedding_cache.encode(self.model, enhanced_query, self.model_name)
         
-        if category:
-            where_filter["category"] = category
+        # Build filters; all of them (price included) are applied by the vector store
+        # before its top-k, so filtered searches still fill the page
+        where_filter = self.build_where(
+            max_price=max_price,
+            vegetarian_only=vegetarian_only,
+            vegan_only=vegan_only,
+            category=categories,
+            min_price=min_price,
+            non_vegetarian=non_vegetarian,
+        )
         
         # Perform semantic search (get more results for reranking)
         search_k = min(top_k * 3, 50)  # Get 3x results for reranking
         
         try:
-            if where_filter:
-                results = self.collection.query(
-                    query_embeddings=[query_embedding.tolist()],
-                    n_results=search_k,
-                    where=where_filter
-                )
-            else:
-                results = self.collection.query(
-                    query_embeddings=[query_embedding.tolist()],
-                    n_results=search_k
-                )
+            results = self.collection.query(
+                query_embeddings=[query_embedding.tolist()],
+                n_results=search_k,
+                where=where_filter
+            )
         except Exception as e:
-            print(f"Search error: {e}")
+            logger.warning("Search error: %s", e)
             return []
         
         # Post-process and rerank results
@@ -403,238 +398,78 @@ class ImprovedMenuSearchSystem:
             query=query,
             results=results,
             max_price=max_price,
-            top_k=top_k
+            top_k=top_k,
+            hits=hits
         )
         
         return reranked_results
 
+    @staticmethod
+    def build_where(
+        max_price: Optional[float] = None,
+        vegetarian_only: bool = False,
+        vegan_only: bool = False,
+        category=None,
+        min_price: Optional[float] = None,
+        non_vegetarian: bool = False,
+    ) -> Optional[Dict]:
+        """Chroma-syntax `where` clause for the search filters (None when unfiltered)"""
+        
+        conditions = []
+        if vegan_only:
+            conditions.append({"is_vegan": {"$eq": True}})
+        elif vegetarian_only:
+            conditions.append({"is_vegetarian": {"$eq": True}})
+        elif non_vegetarian:
+            conditions.append({"is_vegetarian": {"$eq": False}})
+        # category: one name or a list of names
+        categories = [category] if isinstance(category, str) else list(category or [])
+        if len(categories) == 1:
+            conditions.append({"category": {"$eq": categories[0]}})
+        elif categories:
+            conditions.append({"category": {"$in": categories}})
+        if min_price is not None:
+            conditions.append({"price": {"$gte": float(min_price)}})
+        if max_price is not None:
+            conditions.append({"price": {"$lte": float(max_price)}})
+        
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        # Chroma needs an explicit $and for more than one field
+        return {"$and": conditions}
+
     def _rerank_results(
         self,
         query: str,
         results: Dict,
         max_price: Optional[float],
-        top_k: int
+        top_k: int,
+        hits: Optional[KeywordHits] = None
     ) -> List[Dict]:
-        """Advanced reranking with multiple signals"""
+        """Advanced reranking with multiple signals (see chatbot/rerank.py)"""
         
         ids_list = results.get('ids', [[]])[0]
-        metas = results.get('metadatas', [[]])[0]
         distances = results.get('distances', [[]])[0] if 'distances' in results else None
         
         if not ids_list:
             return []
         
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-        
-        formatted = []
+        if self.reranker is not None:
+            reranked = self.reranker.rerank(query, ids_list, distances, top_k, max_price, hits)
+            if reranked is not None:
+                return reranked
         
-        for i, item_id in enumerate(ids_list):
-            metadata = metas[i] if i < len(metas) else {}
-            
-            # Parse JSON fields
-            for field in ['ingredients', 'search_keywords', 'dietary_tags']:
-                if field in metadata and isinstance(metadata[field], str):
-                    try:
-                        metadata[field] = json.loads(metadata[field])
-                    except:
-                        metadata[field] = []
-            
-            # Apply price filter
-            price = metadata.get('price', 0)
-            if max_price and price > max_price:
-                continue
-            
-            # Base similarity score from embedding
-            base_similarity = 1.0
-            if distances and i < len(distances):
-                base_similarity = max(0, 1.0 - distances[i])
-            
-            # Calculate comprehensive boost
-            boost = self._calculate_boost(
-                metadata=metadata,
-                query=query,
-                query_lower=query_lower,
-                query_words=query_words
-            )
-            
-            # Calculate fuzzy match bonus
-            name = metadata.get('name', '')
-            fuzzy_score = self.fuzzy_match_score(query, name)
-            if fuzzy_score > self.fuzzy_threshold:
-                boost *= (1 + fuzzy_score * 0.3)
-            
-            # Final score
-            final_score = base_similarity * boost
-            
-            formatted.append({
-                'id': item_id,
-                'metadata': metadata,
-                'score': final_score,
-                'base_similarity': base_similarity,
-                'boost_factor': boost,
-                'fuzzy_match': fuzzy_score
-            })
-        
-        # Sort by final score
-        formatted.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Return top k
-        return formatted[:top_k]
-
-    def _calculate_boost(
-        self,
-        metadata: Dict,
-        query: str,
-        query_lower: str,
-        query_words: set[str]
-    ) -> float:
-        """Calculate comprehensive boost factor"""
-        
-        boost = 1.0
-        name = metadata.get('name', '')
-        name_lower = name.lower()
-        
-        # 1. Exact name match (very strong)
-        if query_lower == name_lower:
-            boost *= 2.0
-        
-        # 2. Query is substring of name
-        if query_lower in name_lower:
-            boost *= 1.5
-        
-        # 3. Name starts with query
-        if name_lower.startswith(query_lower):
-            boost *= 1.4
-        
-        # 4. Word overlap in name
-        name_words = set(name_lower.split())
-        word_overlap = len(query_words & name_words)
-        if word_overlap > 0:
-            boost *= (1 + 0.2 * word_overlap)
-        
-        # 5. Ingredient matching (strong signal)
-        ingredients = metadata.get('ingredients', [])
-        if ingredients:
-            ingredient_matches = 0
-            for ing in ingredients:
-                ing_lower = ing.lower()
-                # Check if any query word is in ingredient
-                if any(word in ing_lower for word in query_words if len(word) > 2):
-                    ingredient_matches += 1
-                # Check if ingredient is in query
-                if ing_lower in query_lower:
-                    ingredient_matches += 1
-            
-            if ingredient_matches > 0:
-                boost *= (1 + 0.15 * min(ingredient_matches, 3))
-        
-        # 6. Category relevance
-        category = metadata.get('category', '').lower()
-        if category and any(word in category for word in query_words):
-            boost *= 1.25
-        
-        # 7. Cuisine type match
-        cuisine = metadata.get('cuisine_type', '').lower()
-        if cuisine and any(word in cuisine for word in query_words):
-            boost *= 1.2
-        
-        # 8. Price preferences
-        price = metadata.get('price', 0)
-        
-        price_keywords = {
-            'cheap': (0, 50),
-            'budget': (0, 60),
-            'affordable': (0, 80),
-            'moderate': (50, 120),
-            'expensive': (120, 500),
-            'premium': (150, 500)
-        }
-        
-        for keyword, (min_p, max_p) in price_keywords.items():
-            if keyword in query_lower:
-                if min_p <= price <= max_p:
-                    boost *= 1.4
-                    break
-        
-        # 9. Dietary preferences (strong signal)
-        dietary_boosts = {
-            'veg': ('is_vegetarian', True, 1.3),
-            'vegetarian': ('is_vegetarian', True, 1.3),
-            'non-veg': ('is_vegetarian', False, 1.3),
-            'non vegetarian': ('is_vegetarian', False, 1.3),
-            'vegan': ('is_vegan', True, 1.4),
-            'egg': ('contains_egg', True, 1.3),
-        }
-        
-        for keyword, (field, expected_value, boost_factor) in dietary_boosts.items():
-            if keyword in query_lower:
-                if metadata.get(field) == expected_value:
-                    boost *= boost_factor
-                    break
-        
-        # 10. Spice level matching
-        spice_level = metadata.get('spice_level', 'mild')
-        spice_keywords = {
-            'spicy': 'hot',
-            'hot': 'hot',
-            'mild': 'mild',
-            'medium': 'medium'
-        }
-        
-        for keyword, expected_level in spice_keywords.items():
-            if keyword in query_lower and spice_level == expected_level:
-                boost *= 1.25
-                break
-        
-        # 11. Keywords matching
-        keywords = metadata.get('search_keywords', [])
-        if keywords:
-            keyword_matches = sum(1 for kw in keywords 
-                                 if any(word in str(kw).lower() for word in query_words if len(word) > 2))
-            if keyword_matches > 0:
-                boost *= (1 + 0.1 * min(keyword_matches, 3))
-        
-        # 12. Cooking style matching
-        cooking_styles = ['fried', 'grilled', 'steamed', 'baked', 'roasted']
-        for style in cooking_styles:
-            if style in query_lower and style in name_lower:
-                boost *= 1.2
-                break
-        
-        # 13. Meal time relevance
-        meal_times = {
-            'breakfast': ['breakfast', 'morning', 'idli', 'dosa', 'upma', 'poha'],
-            'lunch': ['lunch', 'thali', 'meal', 'rice'],
-            'dinner': ['dinner', 'evening', 'meal'],
-            'snack': ['snack', 'teatime', 'evening']
-        }
-        
-        for meal_keyword, meal_indicators in meal_times.items():
-            if meal_keyword in query_lower:
-                if any(indicator in name_lower or indicator in category 
-                      for indicator in meal_indicators):
-                    boost *= 1.2
-                    break
-        
-        return boost
+        # Collection changed since the features were built: rank from the hits' own metadata
+        metas = results.get('metadatas', [[]])[0]
+        metas = list(metas) + [{}] * (len(ids_list) - len(metas))
+        reranker = MenuReranker(MenuFeatures(ids_list, metas), self.fuzzy_threshold)
+        return reranker.rerank(query, ids_list, distances, top_k, max_price)
 
     def close(self):
         """Clean shutdown"""
-        try:
-            if self.collection and hasattr(self.collection, "persist"):
-                self.collection.persist()
-        except:
-            pass
-        
-        try:
-            if self.client:
-                if hasattr(self.client, "persist"):
-                    self.client.persist()
-                if hasattr(self.client, "close"):
-                    self.client.close()
-        except:
-            pass
+        self.store.close()
         
         gc.collect()
         time.sleep(0.05)
@@ -643,6 +478,7 @@ class ImprovedMenuSearchSystem:
 def main():
     """Test the improved search system"""
     import sys
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     # Find menu JSON
     paths = ["menu_structured.json", "data/menu_structured.json", "./data/menu_structured.json"]
@@ -653,8 +489,9 @@ def main():
         print("Please run menu_extractor first to create menu_structured.json")
         return
     
-    # Database path
-    db_path = os.path.join(os.path.dirname(menu_path) or ".", "chroma_db")
+    # Database path and backend ('--numpy' for the in-process store)
+    backend = "numpy" if '--numpy' in sys.argv else None
+    db_path = os.path.join(os.path.dirname(menu_path) or ".", "vector_db" if backend else "chroma_db")
     
     # Recreate if requested
     if '--recreate' in sys.argv:
@@ -663,7 +500,7 @@ def main():
             shutil.rmtree(db_path)
     
     # Create search system
-    search = ImprovedMenuSearchSystem(db_path=db_path)
+    search = ImprovedMenuSearchSystem(db_path=db_path, backend=backend)
     
     # Load or create database
     if not search.load_database():
@@ -5,6 +5,7 @@ from django.db import transaction
 
 from menu.models import MenuItem
 from restaurants.models import Restaurant
+from chatbot.signals import menu_imported
 
 
 def build_menu_from_json(json_filename: str, restaurant: Union[Restaurant, int]):
@@ -75,4 +76,6 @@ def build_menu_from_json(json_filename: str, restaurant: Union[Restaurant, int])
                 mi.available = True
                 mi.save()
 
+        menu_imported(restaurant.id)
+
     print(f"Menu import done for restaurant {restaurant.id} from {json_filename}")
@@ -10,11 +10,14 @@ from rest_framework.response import Response
 from rest_framework import status
 
 import json
+import logging
 import razorpay
 
 from orders.models import Order
 from .models import Payment
 
+logger = logging.getLogger(__name__)
+
 
 # Initialize Razorpay client
 client = razorpay.Client(
@@ -55,7 +58,7 @@ def create_payment(request):
             {"amount": amount_paise, "currency": "INR", "payment_capture": 1}
         )
     except Exception as e:
-        print("Razorpay create error:", e)
+        logger.exception("Razorpay create error: %s", e)
         return Response(
             {"detail": f"Payment creation failed: {str(e)}"},
             status=status.HTTP_400_BAD_REQUEST,
@@ -160,7 +163,7 @@ def verify_payment(request):
         return JsonResponse({"status": "success"}, status=200)
 
     except Exception as e:
-        print("Verification failed:", e)
+        logger.warning("Verification failed: %s", e)
         return JsonResponse(
             {"status": "failure", "detail": str(e)}, status=400
         )
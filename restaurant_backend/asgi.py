@@ -2,6 +2,8 @@
 ASGI config for restaurant_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with e.g. ``uvicorn restaurant_backend.asgi:application`` so the
+async chatbot endpoint (/api/chatbot/async/) runs on the event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
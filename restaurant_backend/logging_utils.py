@@ -0,0 +1,142 @@
+# restaurant_backend/logging_utils.py
+"""
+Logging helpers for the request hot paths (chatbot engine, menu search,
+payments). Wired up by LOGGING in settings.py.
+
+- JsonFormatter: one JSON object per line, including any `extra=` fields.
+- SamplingFilter: keeps only a fraction of DEBUG/INFO records per logger
+  (CHATBOT_LOG_SAMPLE_RATES="chatbot.engine=0.1,menu_search=0.5");
+  WARNING and above always pass.
+- NonBlockingHandler: a QueueHandler whose QueueListener thread does the
+  formatting and the stdout write, so request threads never block on I/O
+  or on the stream lock.
+
+Call sites use %-style arguments (logger.debug("x=%s", x)) so a disabled
+level costs one isEnabledFor() check and no string formatting.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+# LogRecord attributes that aren't user-supplied `extra=` fields
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[str, float]:
+    """'chatbot.engine=0.1,menu_search=0.5' -> {'chatbot.engine': 0.1, 'menu_search': 0.5}"""
+    rates = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, rate = part.split("=", 1)
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass a fraction of DEBUG/INFO records. The rate for a record is that of the
+    longest configured logger-name prefix ("chatbot" covers "chatbot.engine").
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: float = 1.0):
+        super().__init__()
+        if rates is None:
+            rates = parse_sample_rates(os.getenv("CHATBOT_LOG_SAMPLE_RATES"))
+        self.rates = rates
+        self.default_rate = default_rate
+        self._cache: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = self.default_rate
+            best = -1
+            for prefix, value in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+                    rate, best = value, len(prefix)
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class NonBlockingHandler(logging.handlers.QueueHandler):
+    """
+    Queue records and write them from a background QueueListener thread.
+
+    The caller thread only merges the message arguments (so later mutation of
+    the arguments can't change the log line) and enqueues the record.
+    Formatting and the stream write happen on the listener, with this
+    handler's formatter. When the bounded queue is full, records are dropped
+    rather than blocking the request.
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.dropped = 0
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Copy: other handlers may still see the original record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            # Tracebacks reference frames that may change; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        listener = getattr(self, "listener", None)
+        if listener is not None and listener._thread is not None:
+            listener.stop()  # flushes what's queued
+        super().close()
@@ -82,6 +82,8 @@ TEMPLATES = [
     },
 ]
 WSGI_APPLICATION = 'restaurant_backend.wsgi.application'
+# Serve with an ASGI server (uvicorn/daphne) to get the async chatbot endpoint
+ASGI_APPLICATION = 'restaurant_backend.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -181,6 +183,46 @@ import os
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# Cache backend. Set REDIS_URL so chatbot caches (e.g. LLM intents) are
+# shared across gunicorn workers; otherwise each process has its own LocMem cache.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+
+# Logging for the request hot paths (chatbot, menu_search, payments): records go
+# through a queue and are written by a background thread (see logging_utils).
+# CHATBOT_LOG_LEVEL=DEBUG shows per-message detail; CHATBOT_LOG_SAMPLE_RATES
+# keeps a fraction of DEBUG/INFO lines per logger, e.g. "chatbot.engine=0.1".
+# CHATBOT_LOG_FORMAT=json emits one JSON object per line.
+CHATBOT_LOG_LEVEL = os.getenv("CHATBOT_LOG_LEVEL", "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+        "json": {"()": "restaurant_backend.logging_utils.JsonFormatter"},
+    },
+    "filters": {
+        "sampling": {"()": "restaurant_backend.logging_utils.SamplingFilter"},
+    },
+    "handlers": {
+        "hot_path": {
+            "()": "restaurant_backend.logging_utils.NonBlockingHandler",
+            "formatter": os.getenv("CHATBOT_LOG_FORMAT", "plain"),
+            "filters": ["sampling"],
+        },
+    },
+    "loggers": {
+        name: {"handlers": ["hot_path"], "level": CHATBOT_LOG_LEVEL, "propagate": False}
+        for name in ("chatbot", "menu_search", "payments")
+    },
+}
+
 import os
 from dotenv import load_dotenv
 load_dotenv()
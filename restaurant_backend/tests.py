@@ -0,0 +1,103 @@
+import io
+import itertools
+import json
+import logging
+import sys
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .logging_utils import JsonFormatter, NonBlockingHandler, SamplingFilter, parse_sample_rates
+
+
+def make_record(name, level=logging.INFO, msg="hello %s", args=("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class SamplingFilterTests(SimpleTestCase):
+    def setUp(self):
+        self.filter = SamplingFilter({"chatbot": 0.0, "chatbot.engine": 0.25, "menu_search": 1.0})
+
+    def passed(self, name, level=logging.INFO, records=8):
+        # random() cycles through 0.1, 0.3, 0.6, 0.9: a rate r keeps the draws below r
+        draws = itertools.cycle([0.1, 0.3, 0.6, 0.9])
+        with mock.patch("restaurant_backend.logging_utils.random.random", side_effect=lambda: next(draws)):
+            return sum(self.filter.filter(make_record(name, level)) for _ in range(records))
+
+    def test_longest_prefix_sets_the_rate(self):
+        self.assertEqual(self.filter.rate_for("chatbot.engine"), 0.25)
+        self.assertEqual(self.filter.rate_for("chatbot.engine.cache"), 0.25)
+        self.assertEqual(self.filter.rate_for("chatbot.views"), 0.0)
+        self.assertEqual(self.filter.rate_for("chatbotx"), 1.0)  # a prefix must end at a dot
+        self.assertEqual(self.filter.rate_for("payments"), 1.0)
+
+    def test_rate_per_logger_is_respected(self):
+        self.assertEqual(self.passed("chatbot.engine"), 2)
+        self.assertEqual(self.passed("chatbot.engine", logging.DEBUG), 2)
+        self.assertEqual(self.passed("chatbot.views"), 0)
+        self.assertEqual(self.passed("menu_search"), 8)
+        self.assertEqual(self.passed("payments"), 8)
+
+    def test_warnings_and_above_are_never_sampled_out(self):
+        for level in (logging.WARNING, logging.ERROR, logging.CRITICAL):
+            self.assertEqual(self.passed("chatbot.views", level), 8)
+            self.assertEqual(self.passed("chatbot.engine", level), 8)
+
+    def test_parse_sample_rates(self):
+        self.assertEqual(
+            parse_sample_rates(" chatbot.engine=0.1, menu_search=2,bad,payments=x,chatbot=-1"),
+            {"chatbot.engine": 0.1, "menu_search": 1.0, "chatbot": 0.0},
+        )
+        self.assertEqual(parse_sample_rates(None), {})
+
+
+class NonBlockingHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = NonBlockingHandler(self.stream)
+        self.handler.setFormatter(JsonFormatter())
+        self.addCleanup(self.handler.close)
+
+    def lines(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_queued_records_are_flushed_on_close(self):
+        for i in range(200):
+            self.handler.handle(make_record("chatbot.engine", args=(i,)))
+        self.handler.close()
+        self.assertEqual([line["msg"] for line in self.lines()], [f"hello {i}" for i in range(200)])
+
+    def test_arguments_are_merged_when_logged(self):
+        items = ["naan"]
+        record = make_record("chatbot.engine", args=(items,))
+        record.restaurant_id = 7
+        self.handler.handle(record)
+        items.append("dal")
+        self.handler.close()
+        [line] = self.lines()
+        self.assertEqual(line["msg"], "hello ['naan']")
+        self.assertEqual(line["restaurant_id"], 7)
+        # The caller's record is left alone for other handlers
+        self.assertEqual(record.args, (items,))
+
+    def test_exceptions_are_rendered_before_queueing(self):
+        try:
+            raise ValueError("bad price")
+        except ValueError:
+            record = logging.LogRecord("payments", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+        self.handler.handle(record)
+        self.handler.close()
+        [line] = self.lines()
+        self.assertIn("ValueError: bad price", line["exc"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = NonBlockingHandler(io.StringIO(), maxsize=1)
+        self.addCleanup(handler.close)
+        handler.listener.stop()  # nothing drains the queue
+        handler.handle(make_record("chatbot.engine"))
+        handler.handle(make_record("chatbot.engine"))
+        self.assertEqual(handler.dropped, 1)
+
+    def test_close_is_idempotent(self):
+        self.handler.close()
+        self.handler.close()  # atexit calls it again